@@ -2,18 +2,29 @@ import io
 import csv
 import os
 import datetime
-from decimal import Decimal
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, jsonify, current_app
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, send_file, jsonify, \
+    current_app, stream_with_context
 from werkzeug.utils import secure_filename
 from extensions import db
 from models import User, FeeConfig, FeePayment, College
 from flask_login import login_required, current_user
-from sqlalchemy import distinct
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
+from sqlalchemy import distinct, func
+from payment_service import PaymentError, money, bump_ledgers
+from fee_resolver import resolve_fee, upsert_rule, import_fee_matrix, invalidate_fee_rules
+from fee_receipts import receipt_batch, render_receipts, stream_receipt_zip, load_logo, decode_logo
+from pdf_render import Block, Text, table_row, render_table
 
 admin_fee = Blueprint("admin_fee", __name__, url_prefix="/admin/fees")
 
+PAYMENTS_PAGE_SIZE = 20
+PAYMENTS_MAX_PAGE_SIZE = 100
+
+STUDENT_LIST_TITLE = Block([Text(40, 0, "Students List", font=("Helvetica-Bold", 12))], height=25)
+STUDENT_LIST_ROW, STUDENT_LIST_HEADER = table_row([
+    ("name", "Name", 120), ("email", "Email", 150), ("roll_no", "Roll No", 70),
+    ("program", "Program", 55), ("branch", "Branch", 45), ("year", "Year", 30),
+])
+
 # ============================
 # Admin Fee Dashboard (HTML page)
 # ============================
@@ -23,7 +34,13 @@ def admin_fees():
     if current_user.role != "Admin":
         flash("Unauthorized", "danger")
         return redirect(url_for("student_fee.student_fees"))
-    return render_template("admin_fees.html")
+    # Everything else on the page is fetched from the JSON endpoints below
+    college = current_user.college or College.query.first()
+    return render_template(
+        "admin_fee.html",
+        college_name=college.name if college else None,
+        college_logo=url_for("static", filename=college.logo) if college and college.logo else None,
+    )
 
 
 # ============================
@@ -85,32 +102,56 @@ def save_fee_config():
     if current_user.role != "Admin":
         return jsonify({"error": "Unauthorized"}), 403
 
+    # Blank branch / year / section make a wider rule (e.g. a program-wide default)
     data = request.get_json()
     program = data.get("program")
-    branch = data.get("branch")
-    year = data.get("year")
     amount = data.get("amount")
     last_date = data.get("last_date")
 
-    if not all([program, branch, year, amount]):
-        return jsonify({"error": "All fields required"}), 400
+    if not program or amount in (None, ""):
+        return jsonify({"error": "Program and amount are required"}), 400
+
+    try:
+        amount = money(amount)
+        last_date = datetime.datetime.strptime(last_date, "%Y-%m-%d").date() if last_date else None
+    except (PaymentError, ValueError):
+        return jsonify({"error": "Invalid amount or last date"}), 400
 
     try:
-        fee_config = FeeConfig(
-            program=program,
-            branch=branch,
-            year=year,
-            amount=Decimal(amount),
-            last_date=datetime.datetime.strptime(last_date, "%Y-%m-%d").date() if last_date else None,
-        )
-        db.session.add(fee_config)
+        _, created = upsert_rule(program, data.get("branch"), data.get("year"), data.get("section"),
+                                 amount, last_date)
         db.session.commit()
-        return jsonify({"message": "Fee config saved!"}), 200
+        invalidate_fee_rules()
+        return jsonify({"message": "Fee config saved!" if created else "Fee config updated!"}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 
+# ============================
+# Bulk Fee Matrix Upload API
+# ============================
+@admin_fee.route("/api/fee_matrix", methods=["POST"])
+@login_required
+def upload_fee_matrix():
+    if current_user.role != "Admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    file = request.files.get("file")
+    if not file or not file.filename:
+        return jsonify({"error": "Choose a CSV file"}), 400
+    try:
+        text = file.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return jsonify({"error": "The file must be UTF-8 CSV"}), 400
+
+    stats = import_fee_matrix(text)
+    if stats["errors"]:
+        return jsonify({"error": f"{len(stats['errors'])} error(s); nothing imported", "errors": stats["errors"][:20]}), 400
+    return jsonify({"message": f"{stats['rows']} fee rules imported ({stats['created']} new, {stats['updated']} updated)",
+                    **stats})
+
+
 # ============================
 # Fetch Students API (with fee info)
 # ============================
@@ -132,30 +173,125 @@ def students_api():
     if year:
         query = query.filter_by(year=year)
 
-    students = []
-    for s in query.all():
-        cfg = FeeConfig.query.filter_by(program=s.program, branch=s.branch, year=s.year).order_by(FeeConfig.id.desc()).first()
-        payments = FeePayment.query.filter_by(student_id=s.id).all()
-        paid_amount = sum(float(p.amount) for p in payments if p.status == "Paid")
+    students = query.all()
+    paid = {}
+    ids = [s.id for s in students]
+    for i in range(0, len(ids), 500):
+        paid.update(db.session.query(FeePayment.student_id, func.sum(FeePayment.amount)).filter(
+            FeePayment.student_id.in_(ids[i:i + 500]), FeePayment.status == "Paid"
+        ).group_by(FeePayment.student_id))
+
+    results = []
+    for s in students:
+        cfg = resolve_fee(s)
+        paid_amount = money(paid.get(s.id))
+        dues = max(cfg.amount - paid_amount, 0) if cfg else None
         status = "Unpaid"
-        if paid_amount > 0 and cfg and paid_amount < float(cfg.amount):
+        if paid_amount > 0 and cfg and dues > 0:
             status = "Pending"
-        elif cfg and paid_amount >= float(cfg.amount):
+        elif cfg and dues == 0:
             status = "Paid"
 
-        students.append({
+        results.append({
             "id": s.id,
             "name": s.name,
             "email": s.email,
             "program": s.program,
             "branch": s.branch,
             "year": s.year,
-            "applied_fee": {"amount": float(cfg.amount)} if cfg else None,
-            "paid_amount": paid_amount,
+            # JSON numbers for the dashboard; the arithmetic above stays in Decimal
+            "applied_fee": {"amount": float(money(cfg.amount))} if cfg else None,
+            "paid_amount": float(paid_amount),
             "status": status
         })
 
-    return jsonify(students)
+    return jsonify(results)
+
+
+# ============================
+# Per-student Fee Override API
+# ============================
+@admin_fee.route("/api/update_fee/<int:student_id>", methods=["POST"])
+@login_required
+def update_fee(student_id):
+    if current_user.role != "Admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    student = db.session.query(User.id, User.program, User.branch, User.year, User.section, User.college_id) \
+        .filter(User.id == student_id, User.role == "Student").first()
+    if student is None or student.college_id != current_user.college_id:
+        return jsonify({"error": "Student not found"}), 404
+
+    data = request.get_json(silent=True) or {}
+    try:
+        amount = money(data.get("amount"))
+        last_date = datetime.datetime.strptime(data["last_date"], "%Y-%m-%d").date() if data.get("last_date") else None
+    except (PaymentError, ValueError):
+        return jsonify({"error": "Invalid amount or last date"}), 400
+    if data.get("amount") in (None, "") or amount < 0:
+        return jsonify({"error": "Invalid amount or last date"}), 400
+
+    # One override row per student: update it in place, or create it with the cohort's last date
+    override = FeeConfig.query.filter_by(student_id=student_id).order_by(FeeConfig.id.desc()).first()
+    if override is None:
+        cohort = resolve_fee(student)
+        override = FeeConfig(student_id=student_id, program=student.program, branch=student.branch,
+                             year=student.year, last_date=cohort.last_date if cohort else None)
+        db.session.add(override)
+    override.amount = amount
+    if last_date:
+        override.last_date = last_date
+    bump_ledgers([student_id])  # dues changed; concurrent payment intents must re-read them
+    db.session.commit()
+    invalidate_fee_rules()
+
+    return jsonify({
+        "message": f"Fee for this student set to ₹{amount:,.2f}",
+        "student_id": student_id,
+        "amount": float(amount),
+        "last_date": override.last_date.isoformat() if override.last_date else None,
+    })
+
+
+# ============================
+# Per-student Payment History API (paginated)
+# ============================
+@admin_fee.route("/api/payments/<int:student_id>")
+@login_required
+def payment_history(student_id):
+    if current_user.role != "Admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    college_id = db.session.query(User.college_id).filter(User.id == student_id).scalar()
+    if college_id != current_user.college_id:
+        return jsonify({"error": "Student not found"}), 404
+
+    limit = max(1, min(request.args.get("limit", PAYMENTS_PAGE_SIZE, type=int), PAYMENTS_MAX_PAGE_SIZE))
+    before = request.args.get("before", type=int)
+
+    query = db.session.query(
+        FeePayment.id, FeePayment.amount, FeePayment.status, FeePayment.payment_method, FeePayment.created_at
+    ).filter(FeePayment.student_id == student_id)
+    if before:
+        query = query.filter(FeePayment.id < before)
+    rows = query.order_by(FeePayment.id.desc()).limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    return jsonify({
+        "payments": [
+            {
+                "id": pid,
+                "amount": str(money(amount)),
+                "status": status,
+                "method": method,
+                "created_at": created_at.strftime("%Y-%m-%d %H:%M"),
+                "receipt_url": url_for("student_fee.download_receipt", payment_id=pid) if status == "Paid" else None,
+            }
+            for pid, amount, status, method, created_at in rows
+        ],
+        "next_before": rows[-1].id if more else None,
+    })
 
 
 # ============================
@@ -169,48 +305,47 @@ def generate_receipt(student_id):
 
     student = User.query.get_or_404(student_id)
     college = student.college or College.query.first()
-    payments = FeePayment.query.filter_by(student_id=student.id, status="Paid").all()
-    total_paid = sum(float(p.amount) for p in payments)
-
-    output = io.BytesIO()
-    pdf = canvas.Canvas(output, pagesize=A4)
-    width, height = A4
-
-    y = height - 50
-
-    # College Logo & Name
-    if college and college.logo and os.path.exists(college.logo):
-        pdf.drawImage(college.logo, 40, y - 60, width=80, height=60, preserveAspectRatio=True, mask="auto")
-    if college:
-        pdf.setFont("Helvetica-Bold", 16)
-        pdf.drawString(140, y - 20, college.name)
-
-    # Student info
-    y -= 100
-    pdf.setFont("Helvetica", 12)
-    pdf.drawString(50, y, f"Student Name: {student.name}")
-    pdf.drawString(50, y - 20, f"Roll No: {student.roll_no}")
-    pdf.drawString(50, y - 40, f"Program: {student.program} | Branch: {student.branch} | Year: {student.year}")
-    pdf.drawString(50, y - 60, f"Email: {student.email}")
-
-    # Fee details
-    y -= 100
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawString(50, y, "Fee Payment Summary")
-
-    y -= 30
-    pdf.setFont("Helvetica", 12)
-    for p in payments:
-        pdf.drawString(60, y, f"Payment ID: {p.payment_id} | Amount: {float(p.amount)} | Date: {p.created_at.strftime('%Y-%m-%d')}")
-        y -= 20
-
-    y -= 20
-    pdf.setFont("Helvetica-Bold", 12)
-    pdf.drawString(50, y, f"Total Paid: {total_paid}")
-
-    pdf.save()
-    output.seek(0)
-    return send_file(output, mimetype="application/pdf", as_attachment=True, download_name=f"receipt_{student.roll_no}.pdf")
+    payments = db.session.query(FeePayment.payment_id, FeePayment.amount, FeePayment.created_at).filter(
+        FeePayment.student_id == student.id, FeePayment.status == "Paid"
+    ).order_by(FeePayment.created_at, FeePayment.id).all()
+    info = {"name": student.name, "roll_no": student.roll_no, "program": student.program,
+            "branch": student.branch, "year": student.year, "email": student.email}
+
+    pdf = render_receipts(college.name if college else None, decode_logo(load_logo(college)), [(info, payments)])
+    return send_file(io.BytesIO(pdf), mimetype="application/pdf", as_attachment=True,
+                     download_name=f"receipt_{student.roll_no}.pdf")
+
+
+# ============================
+# Bulk Receipts (one PDF or a ZIP per cohort)
+# ============================
+@admin_fee.route("/receipts/<filetype>")
+@login_required
+def bulk_receipts(filetype):
+    if current_user.role != "Admin":
+        return jsonify({"error": "Unauthorized"}), 403
+    if filetype not in ("pdf", "zip"):
+        return jsonify({"error": "Invalid file type"}), 400
+
+    college = current_user.college or College.query.first()
+    receipts = list(receipt_batch(
+        current_user.college_id,
+        program=request.args.get("program") or None,
+        branch=request.args.get("branch") or None,
+        year=request.args.get("year") or None,
+    ))
+    if not receipts:
+        return jsonify({"error": "No paid fees for these students"}), 404
+
+    college_name = college.name if college else None
+    logo = load_logo(college)
+    if filetype == "pdf":
+        pdf = render_receipts(college_name, decode_logo(logo), receipts)
+        return send_file(io.BytesIO(pdf), mimetype="application/pdf", as_attachment=True,
+                         download_name="fee_receipts.pdf")
+    return Response(stream_with_context(stream_receipt_zip(college_name, logo, receipts)),
+                    mimetype="application/zip",
+                    headers={"Content-Disposition": "attachment; filename=fee_receipts.zip"})
 
 
 # ============================
@@ -247,21 +382,10 @@ def download_students(filetype):
         return send_file(io.BytesIO(output.getvalue().encode()), mimetype="text/csv", as_attachment=True, download_name="students.csv")
 
     elif filetype.lower() == "pdf":
-        output = io.BytesIO()
-        pdf = canvas.Canvas(output, pagesize=A4)
-        pdf.setFont("Helvetica", 10)
-        y = 800
-        pdf.drawString(50, y, "Students List")
-        y -= 20
-        for s in students:
-            pdf.drawString(50, y, f"{s.name} | {s.email} | {s.roll_no} | {s.program} | {s.branch} | {s.year}")
-            y -= 15
-            if y < 50:
-                pdf.showPage()
-                y = 800
-        pdf.save()
-        output.seek(0)
-        return send_file(output, mimetype="application/pdf", as_attachment=True, download_name="students.pdf")
+        rows = ({"name": s.name, "email": s.email, "roll_no": s.roll_no or "-", "program": s.program or "-",
+                 "branch": s.branch or "-", "year": s.year or "-"} for s in students)
+        pdf = render_table(STUDENT_LIST_TITLE, STUDENT_LIST_ROW, STUDENT_LIST_HEADER, rows)
+        return send_file(io.BytesIO(pdf), mimetype="application/pdf", as_attachment=True, download_name="students.pdf")
 
     flash("Invalid file type!", "danger")
     return redirect(url_for("admin_fee.admin_fees"))
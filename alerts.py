@@ -0,0 +1,439 @@
+"""
+Low-attendance alerts.
+
+    flask alerts run [--threshold 75] [--dry-run]    # detect, queue and dispatch
+    flask alerts dispatch                            # only send what is queued
+
+Detection is one grouped query over the attendance window; students already
+alerted for the same course within ALERT_COOLDOWN_DAYS are skipped (0 = at
+most once a day). Queued alerts are sent in batches through the configured
+transport, one digest per student per batch, throttled to ALERT_RATE_PER_MINUTE
+messages and capped at ALERT_MAX_PER_RUN alerts per run; whatever is left stays
+queued for the next run. A batch never exceeds ALERT_RATE_PER_MINUTE, whatever
+ALERT_BATCH_SIZE says.
+
+Runs and dispatches claim the job through analytics.claim_job, and each batch
+is claimed by moving its rows from "queued" to "sending" with a conditional
+UPDATE, so overlapping processes never send the same alert twice. Rows left
+in "sending" by a crashed process are requeued after STALE_RUN_AFTER.
+
+ALERT_TRANSPORT is "file" (JSON lines in ALERT_FILE), "smtp" (ALERT_SMTP_HOST /
+ALERT_SMTP_PORT, e.g. a local `python -m aiosmtpd -n` stand-in), or a
+"module:Class" path to any class with a send_batch(messages) method.
+"""
+import datetime
+import importlib
+import json
+import logging
+import smtplib
+import threading
+import time
+from collections import namedtuple
+from email.message import EmailMessage
+
+import click
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import login_required, current_user
+from sqlalchemy import func, case, insert, update
+from sqlalchemy.exc import IntegrityError
+
+from analytics import claim_job, release_job
+from extensions import db
+from models import User, Course, Attendance, AttendanceAlert, AnalyticsRun, JobLock
+
+alerts_bp = Blueprint("alerts", __name__, cli_group="alerts")
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "attendance_alerts"
+STALE_RUN_AFTER = datetime.timedelta(hours=2)
+ID_BATCH = 500
+
+# Defaults, overridable through app.config
+DEFAULTS = {
+    "ALERT_THRESHOLD": 75.0,        # percent
+    "ALERT_WINDOW_DAYS": 30,
+    "ALERT_MIN_CLASSES": 5,         # ignore students with fewer marked classes in the window
+    "ALERT_COOLDOWN_DAYS": 7,
+    "ALERT_BATCH_SIZE": 100,
+    "ALERT_RATE_PER_MINUTE": 600,
+    "ALERT_MAX_PER_RUN": 5000,
+    "ALERT_MAX_ATTEMPTS": 3,
+    "ALERT_TRANSPORT": "file",
+    "ALERT_FILE": "alerts.jsonl",
+    "ALERT_SMTP_HOST": "localhost",
+    "ALERT_SMTP_PORT": 1025,
+    "ALERT_SENDER": "no-reply@college-erp.local",
+}
+
+
+def _config(key):
+    return current_app.config.get(key, DEFAULTS[key])
+
+
+# One message per student per batch; ``alert_ids`` are the course alerts it covers
+Message = namedtuple("Message", ["alert_ids", "to", "subject", "body"])
+
+
+# ===========================
+# Transports
+# ===========================
+class FileTransport:
+    """Appends one JSON object per message; useful in development and for audits."""
+
+    def __init__(self, config):
+        self.path = config.get("ALERT_FILE", DEFAULTS["ALERT_FILE"])
+
+    def send_batch(self, messages):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for m in messages:
+                f.write(json.dumps({"ts": datetime.datetime.utcnow().isoformat(), **m._asdict()}, ensure_ascii=False) + "\n")
+        return {alert_id: None for m in messages for alert_id in m.alert_ids}
+
+
+class SMTPTransport:
+    """One SMTP connection per batch."""
+
+    def __init__(self, config):
+        self.host = config.get("ALERT_SMTP_HOST", DEFAULTS["ALERT_SMTP_HOST"])
+        self.port = int(config.get("ALERT_SMTP_PORT", DEFAULTS["ALERT_SMTP_PORT"]))
+        self.sender = config.get("ALERT_SENDER", DEFAULTS["ALERT_SENDER"])
+
+    def send_batch(self, messages):
+        results = {}
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+                for m in messages:
+                    email = EmailMessage()
+                    email["From"], email["To"], email["Subject"] = self.sender, m.to, m.subject
+                    email.set_content(m.body)
+                    try:
+                        smtp.send_message(email)
+                        error = None
+                    except smtplib.SMTPException as e:
+                        error = str(e)
+                    results.update(dict.fromkeys(m.alert_ids, error))
+        except (OSError, smtplib.SMTPException) as e:
+            for m in messages:
+                for alert_id in m.alert_ids:
+                    results.setdefault(alert_id, f"SMTP connection failed: {e}")
+        return results
+
+
+TRANSPORTS = {"file": FileTransport, "smtp": SMTPTransport}
+
+
+def get_transport(name=None):
+    name = name or _config("ALERT_TRANSPORT")
+    if name in TRANSPORTS:
+        cls = TRANSPORTS[name]
+    else:
+        module, _, attr = name.partition(":")
+        cls = getattr(importlib.import_module(module), attr)
+    return cls(current_app.config)
+
+
+class RateLimiter:
+    """
+    Token bucket: at most ``per_minute`` sends, refilled continuously. A single
+    acquire can take at most ``burst`` (= per_minute) tokens, so callers size
+    their batches with min(batch_size, limiter.burst).
+    """
+
+    def __init__(self, per_minute):
+        if per_minute < 1:
+            raise ValueError(f"rate must be at least 1 message per minute, got {per_minute}")
+        self.burst = int(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.capacity = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n):
+        if n > self.capacity:
+            raise ValueError(f"cannot acquire {n} tokens from a bucket of {self.capacity:g}")
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                time.sleep((n - self.tokens) / self.rate)
+
+
+# ===========================
+# Detection
+# ===========================
+def find_low_attendance(threshold, start, end, min_classes):
+    """
+    [(student_id, course_id, total, present)] below ``threshold`` percent over
+    [start, end], from one grouped query (course_id None = day sheets).
+    """
+    total = func.count(Attendance.id)
+    present = func.sum(case((func.lower(Attendance.status) == "present", 1), else_=0))
+    return db.session.query(Attendance.student_id, Attendance.course_id, total, present).filter(
+        Attendance.date.between(start, end)
+    ).group_by(Attendance.student_id, Attendance.course_id).having(
+        total >= min_classes, present * 100 < threshold * total
+    ).all()
+
+
+def queue_alerts(threshold=None, today=None, dry_run=False):
+    """Detect low attendance and queue one alert per new (student, course). Returns (candidates, queued)."""
+    threshold = float(threshold if threshold is not None else _config("ALERT_THRESHOLD"))
+    today = today or datetime.date.today()
+    start = today - datetime.timedelta(days=_config("ALERT_WINDOW_DAYS"))
+    cooldown = _config("ALERT_COOLDOWN_DAYS")
+    if cooldown < 0:
+        raise ValueError(f"ALERT_COOLDOWN_DAYS must be 0 or more, got {cooldown}")
+
+    candidates = find_low_attendance(threshold, start, today, _config("ALERT_MIN_CLASSES"))
+    recent = set(db.session.query(AttendanceAlert.student_id, AttendanceAlert.course_id).filter(
+        AttendanceAlert.created_at >= datetime.datetime.utcnow() - datetime.timedelta(days=cooldown)
+    )) if cooldown else set()
+    # One key per cooldown period (per day with no cooldown); guards overlapping runs
+    bucket = today.toordinal() // max(cooldown, 1)
+    now = datetime.datetime.utcnow()
+    rows = [
+        {
+            "student_id": sid, "course_id": cid, "total": total, "present": present or 0,
+            "percentage": round((present or 0) * 100 / total, 2), "threshold": threshold,
+            "window_start": start, "window_end": today, "status": "queued", "attempts": 0,
+            "dedupe_key": f"{sid}:{cid or 0}:{bucket}", "created_at": now,
+        }
+        for sid, cid, total, present in candidates if (sid, cid) not in recent
+    ]
+    if rows:
+        taken = set()
+        keys = [r["dedupe_key"] for r in rows]
+        for i in range(0, len(keys), ID_BATCH):
+            taken.update(k for (k,) in db.session.query(AttendanceAlert.dedupe_key).filter(
+                AttendanceAlert.dedupe_key.in_(keys[i:i + ID_BATCH])))
+        rows = [r for r in rows if r["dedupe_key"] not in taken]
+    if rows and not dry_run:
+        queued = _insert_alerts(rows)
+        db.session.commit()
+        return len(candidates), queued
+    return len(candidates), len(rows)
+
+
+def _insert_alerts(rows):
+    """
+    Insert ``rows``, skipping any whose dedupe_key an overlapping run inserted
+    after the check above. Returns how many were inserted.
+    """
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(AttendanceAlert.__table__), rows)
+        return len(rows)
+    except IntegrityError:
+        pass
+    inserted = 0
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(AttendanceAlert.__table__), row)
+            inserted += 1
+        except IntegrityError:
+            pass  # already queued by the other run
+    return inserted
+
+
+# ===========================
+# Dispatch
+# ===========================
+def _messages(alerts):
+    """Fold each student's course alerts into a single digest message."""
+    by_student = {}
+    for alert, name, email, course_name in alerts:
+        by_student.setdefault(alert.student_id, (name, email, []))[2].append((alert, course_name or "Overall attendance"))
+
+    messages = []
+    for name, email, items in by_student.values():
+        first = items[0][0]
+        lines = [f"  - {course}: {a.percentage:.1f}% ({a.present} of {a.total} classes)" for a, course in items]
+        subject = (f"Low attendance warning: {items[0][1]} ({first.percentage:.1f}%)" if len(items) == 1
+                   else f"Low attendance warning: {len(items)} courses")
+        messages.append(Message(
+            [a.id for a, _ in items], email, subject,
+            f"Dear {name},\n\n"
+            f"Between {first.window_start:%d-%m-%Y} and {first.window_end:%d-%m-%Y} your attendance is below "
+            f"the required {first.threshold:.0f}% in:\n\n" + "\n".join(lines) +
+            "\n\nPlease contact your faculty advisor.\n",
+        ))
+    return messages
+
+
+def _claim_alerts(ids, now):
+    """Move the still-queued ``ids`` to "sending"; returns the ids this caller claimed. Commits."""
+    claimed = db.session.execute(
+        update(AttendanceAlert)
+        .where(AttendanceAlert.id.in_(ids), AttendanceAlert.status == "queued")
+        .values(status="sending", sent_at=now)
+        .returning(AttendanceAlert.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.session.commit()
+    return claimed
+
+
+def dispatch_alerts(transport=None, max_alerts=None):
+    """
+    Send queued alerts in rate-limited batches, claiming each batch before it is
+    sent. Returns (sent, failed).
+    """
+    transport = transport or get_transport()
+    batch_size = _config("ALERT_BATCH_SIZE")
+    max_alerts = max_alerts if max_alerts is not None else _config("ALERT_MAX_PER_RUN")
+    max_attempts = _config("ALERT_MAX_ATTEMPTS")
+    limiter = RateLimiter(_config("ALERT_RATE_PER_MINUTE"))
+    batch_size = min(batch_size, limiter.burst)  # a batch is at most one bucket of messages
+    sent = failed = 0
+    last_id = 0
+
+    # Requeue batches whose sender died between claiming and recording results
+    db.session.query(AttendanceAlert).filter(
+        AttendanceAlert.status == "sending",
+        AttendanceAlert.sent_at < datetime.datetime.utcnow() - STALE_RUN_AFTER,
+    ).update({AttendanceAlert.status: "queued", AttendanceAlert.sent_at: None}, synchronize_session=False)
+    db.session.commit()
+
+    while sent + failed < max_alerts:
+        ids = [alert_id for (alert_id,) in db.session.query(AttendanceAlert.id)
+               .filter(AttendanceAlert.status == "queued", AttendanceAlert.id > last_id)
+               .order_by(AttendanceAlert.id).limit(min(batch_size, max_alerts - sent - failed))]
+        if not ids:
+            break
+        last_id = ids[-1]
+        claimed = _claim_alerts(ids, datetime.datetime.utcnow())
+        if not claimed:
+            continue  # another dispatcher took the whole batch
+
+        alerts = db.session.query(AttendanceAlert, User.name, User.email, Course.course_name) \
+            .join(User, User.id == AttendanceAlert.student_id) \
+            .outerjoin(Course, Course.id == AttendanceAlert.course_id) \
+            .filter(AttendanceAlert.id.in_(claimed)) \
+            .order_by(AttendanceAlert.id).all()
+
+        messages = _messages(alerts)
+        limiter.acquire(len(messages))
+        try:
+            results = transport.send_batch(messages)
+        except Exception as e:  # a broken transport must not lose the queue
+            logger.exception("alert transport failed")
+            results = {alert.id: str(e) for alert, *_ in alerts}
+
+        now = datetime.datetime.utcnow()
+        changes = []
+        for alert, *_ in alerts:
+            error = results.get(alert.id, "no result from transport")
+            attempts = alert.attempts + 1
+            if error is None:
+                changes.append({"id": alert.id, "status": "sent", "attempts": attempts, "sent_at": now, "error": None})
+                sent += 1
+            else:
+                status = "failed" if attempts >= max_attempts else "queued"
+                changes.append({"id": alert.id, "status": status, "attempts": attempts, "sent_at": None,
+                                "error": error[:1000]})
+                failed += 1
+        db.session.execute(update(AttendanceAlert), changes)
+        db.session.commit()
+    return sent, failed
+
+
+def _claim_run():
+    """claim_job for the alert job; raises RuntimeError if another run or dispatch holds it."""
+    stamp = claim_job(JOB_NAME, STALE_RUN_AFTER)
+    if stamp is None:
+        lock = db.session.get(JobLock, JOB_NAME)
+        raise RuntimeError(f"Alert run {lock.run_id} is still in progress (started {lock.locked_at})")
+    return stamp
+
+
+def run_alerts(threshold=None, dry_run=False):
+    """Queue and dispatch, recorded as an AnalyticsRun. Raises RuntimeError if a run is in progress."""
+    stamp = _claim_run()
+    run = AnalyticsRun(job=JOB_NAME, status="running", started_at=stamp)
+    db.session.add(run)
+    db.session.flush()
+    db.session.query(JobLock).filter_by(job=JOB_NAME, locked_at=stamp).update(
+        {JobLock.run_id: run.id}, synchronize_session=False)
+    db.session.commit()
+
+    started = time.perf_counter()
+    try:
+        candidates, queued = queue_alerts(threshold, dry_run=dry_run)
+        sent, failed = (0, 0) if dry_run else dispatch_alerts()
+        run.timings = {"candidates": candidates, "queued": queued, "sent": sent, "failed": failed,
+                       "dry_run": dry_run}
+        run.status = "success"
+    except Exception as e:
+        db.session.rollback()
+        run.status = "failed"
+        run.error = str(e)
+        raise
+    finally:
+        run.finished_at = datetime.datetime.utcnow()
+        run.duration_ms = int((time.perf_counter() - started) * 1000)
+        db.session.commit()
+        release_job(JOB_NAME, stamp)
+    return run
+
+
+# ===========================
+# CLI: flask alerts run / dispatch
+# ===========================
+@alerts_bp.cli.command("run")
+@click.option("--threshold", type=float, help="Percent below which students are alerted (default ALERT_THRESHOLD).")
+@click.option("--dry-run", is_flag=True, help="Only count who would be alerted.")
+def run_command(threshold, dry_run):
+    """Find low-attendance students, queue alerts and send them."""
+    try:
+        run = run_alerts(threshold, dry_run=dry_run)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    t = run.timings
+    click.echo(f"✅ {t['candidates']} below threshold, {t['queued']} new alerts"
+               f"{' (dry run)' if dry_run else ''}, {t['sent']} sent, {t['failed']} failed in {run.duration_ms} ms")
+
+
+@alerts_bp.cli.command("dispatch")
+def dispatch_command():
+    """Send alerts that are still queued."""
+    try:
+        stamp = _claim_run()
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    try:
+        sent, failed = dispatch_alerts()
+    finally:
+        db.session.rollback()
+        release_job(JOB_NAME, stamp)
+    click.echo(f"✅ {sent} sent, {failed} failed")
+
+
+# ===========================
+# Admin API
+# ===========================
+@alerts_bp.route("/admin/recent")
+@login_required
+def admin_recent_alerts():
+    if current_user.role != "Admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    limit = min(request.args.get("limit", 100, type=int), 500)
+    rows = db.session.query(AttendanceAlert, User.name, User.roll_no, Course.course_name) \
+        .join(User, User.id == AttendanceAlert.student_id) \
+        .outerjoin(Course, Course.id == AttendanceAlert.course_id) \
+        .filter(User.college_id == current_user.college_id) \
+        .order_by(AttendanceAlert.id.desc()).limit(limit).all()
+    return jsonify([
+        {
+            "id": a.id, "student": name, "roll_no": roll_no, "course": course_name,
+            "percentage": a.percentage, "threshold": a.threshold, "status": a.status,
+            "created_at": a.created_at.isoformat(), "sent_at": a.sent_at.isoformat() if a.sent_at else None,
+        }
+        for a, name, roll_no, course_name in rows
+    ])
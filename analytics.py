@@ -0,0 +1,315 @@
+import datetime
+import time
+
+import click
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy import func, case, insert, or_
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import (
+    User, Attendance, FeePayment, Result, AnalyticsWatermark, AnalyticsRun, JobLock,
+    DailyAttendanceSummary, DailyFeeSummary, ResultSummary,
+)
+
+analytics_bp = Blueprint("analytics", __name__, cli_group="analytics")
+
+JOB_NAME = "nightly_summaries"
+# Re-read rows updated this long before the previous high-water mark so that
+# transactions still in flight during the last run are picked up. Buckets are
+# recomputed from raw rows, so reprocessing the overlap is harmless.
+SAFETY_LAG = datetime.timedelta(minutes=5)
+# A "running" run older than this is assumed to have crashed and may be superseded
+STALE_RUN_AFTER = datetime.timedelta(hours=2)
+# Number of bucket keys recomputed per statement (keeps IN lists small)
+KEY_BATCH = 500
+
+
+def _as_date(value):
+    """func.date() returns text on SQLite and a date elsewhere."""
+    if value is None or isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+# ===========================
+# Bucket Recompute (one per summary table)
+# ===========================
+def _recompute_attendance(dates):
+    db.session.query(DailyAttendanceSummary).filter(
+        DailyAttendanceSummary.date.in_(dates)
+    ).delete(synchronize_session=False)
+
+    present = func.sum(case((func.lower(Attendance.status) == "present", 1), else_=0))
+    rows = db.session.query(
+        User.college_id, Attendance.date, Attendance.branch, Attendance.class_name,
+        func.count(Attendance.id), present,
+    ).join(User, User.id == Attendance.student_id).filter(
+        Attendance.date.in_(dates)
+    ).group_by(User.college_id, Attendance.date, Attendance.branch, Attendance.class_name).all()
+
+    if rows:
+        db.session.execute(insert(DailyAttendanceSummary), [
+            {"college_id": c, "date": d, "branch": b, "class_name": k, "total": t, "present": p or 0}
+            for c, d, b, k, t, p in rows
+        ])
+
+
+def _recompute_fees(days):
+    db.session.query(DailyFeeSummary).filter(
+        DailyFeeSummary.date.in_(days)
+    ).delete(synchronize_session=False)
+
+    day = func.date(FeePayment.created_at)
+    # NULL and "Unpaid" are one bucket (uq_daily_fee_bucket), so group on the stored value
+    status = func.coalesce(FeePayment.status, "Unpaid")
+    rows = db.session.query(
+        FeePayment.college_id, day, status,
+        func.count(FeePayment.id), func.sum(FeePayment.amount),
+    ).filter(
+        FeePayment.created_at >= datetime.datetime.combine(min(days), datetime.time.min),
+        FeePayment.created_at < datetime.datetime.combine(max(days) + datetime.timedelta(days=1), datetime.time.min),
+        day.in_([d.isoformat() for d in days]),
+    ).group_by(FeePayment.college_id, day, status).all()
+
+    if rows:
+        db.session.execute(insert(DailyFeeSummary), [
+            {"college_id": c, "date": _as_date(d), "status": s, "payment_count": n, "amount": a or 0}
+            for c, d, s, n, a in rows
+        ])
+
+
+def _recompute_results(course_ids):
+    db.session.query(ResultSummary).filter(
+        ResultSummary.course_id.in_(course_ids)
+    ).delete(synchronize_session=False)
+
+    rows = db.session.query(
+        User.college_id, Result.course_id, Result.semester,
+        func.count(Result.id),
+        func.sum(case((Result.grade != "F", 1), else_=0)),
+        func.sum(case((Result.approved_by_admin.is_(True), 1), else_=0)),
+        func.sum(Result.marks),
+    ).join(User, User.id == Result.student_id).filter(
+        Result.course_id.in_(course_ids)
+    ).group_by(User.college_id, Result.course_id, Result.semester).all()
+
+    if rows:
+        db.session.execute(insert(ResultSummary), [
+            {"college_id": c, "course_id": cid, "semester": sem, "total": t,
+             "passed": p or 0, "approved": a or 0, "marks_sum": m or 0}
+            for c, cid, sem, t, p, a, m in rows
+        ])
+
+
+# (watermark name, source model, bucket key expression, key normaliser, recompute fn)
+FOLDS = [
+    ("attendance", Attendance, Attendance.date, _as_date, _recompute_attendance),
+    ("fee_payments", FeePayment, func.date(FeePayment.created_at), _as_date, _recompute_fees),
+    ("results", Result, Result.course_id, int, _recompute_results),
+]
+
+
+# ===========================
+# Incremental Fold
+# ===========================
+def _watermark(table_name):
+    wm = AnalyticsWatermark.query.filter_by(table_name=table_name).first()
+    if not wm:
+        wm = AnalyticsWatermark(table_name=table_name, last_id=0)
+        db.session.add(wm)
+    return wm
+
+
+def fold_table(table_name, model, key_expr, normalise, recompute, full=False):
+    """
+    Recompute only the summary buckets touched by rows inserted (id above the
+    watermark) or updated (updated_at above the watermark) since the last run.
+    The buckets and the new watermark are committed together, so an interrupted
+    run simply repeats the same work next time.
+    """
+    wm = _watermark(table_name)
+    if full:
+        wm.last_id, wm.last_updated_at = 0, None
+
+    hi_id, hi_ts = db.session.query(func.max(model.id), func.max(model.updated_at)).one()
+    if hi_id is None:
+        db.session.commit()
+        return {"keys": 0}
+
+    keys = {k for (k,) in db.session.query(key_expr).filter(
+        model.id > wm.last_id, model.id <= hi_id
+    ).distinct()}
+    if wm.last_updated_at is not None and hi_ts is not None:
+        keys.update(k for (k,) in db.session.query(key_expr).filter(
+            model.updated_at > wm.last_updated_at, model.updated_at <= hi_ts
+        ).distinct())
+    keys = sorted({normalise(k) for k in keys if k is not None})
+
+    for i in range(0, len(keys), KEY_BATCH):
+        recompute(keys[i:i + KEY_BATCH])
+
+    wm.last_id = hi_id
+    if hi_ts is not None:
+        wm.last_updated_at = hi_ts - SAFETY_LAG
+    db.session.commit()
+    return {"keys": len(keys), "high_id": hi_id}
+
+
+# ===========================
+# Job claims
+# ===========================
+def claim_job(job, stale_after, now=None):
+    """
+    Atomically claim ``job`` for one run: a conditional UPDATE of its JobLock
+    row that only matches when the job is unlocked or its lock is older than
+    ``stale_after``. Concurrent claimers serialise on the row, so only one
+    sees rowcount 1. Returns the lock stamp, or None if the job is held.
+    Commits.
+    """
+    now = now or datetime.datetime.utcnow()
+    if db.session.get(JobLock, job) is None:
+        try:
+            with db.session.begin_nested():
+                db.session.add(JobLock(job=job))
+        except IntegrityError:
+            pass  # created concurrently
+    claimed = db.session.query(JobLock).filter(
+        JobLock.job == job,
+        or_(JobLock.locked_at.is_(None), JobLock.locked_at < now - stale_after),
+    ).update({JobLock.locked_at: now}, synchronize_session=False)
+    db.session.commit()
+    return now if claimed else None
+
+
+def release_job(job, stamp):
+    """Release a claim taken by claim_job (a no-op if it was since superseded). Commits."""
+    db.session.query(JobLock).filter(JobLock.job == job, JobLock.locked_at == stamp).update(
+        {JobLock.locked_at: None}, synchronize_session=False)
+    db.session.commit()
+
+
+def run_analytics(full=False):
+    """
+    Fold every source table into its summary table and record the run.
+    Raises RuntimeError if another run is still in progress.
+    """
+    stamp = claim_job(JOB_NAME, STALE_RUN_AFTER)
+    if stamp is None:
+        lock = db.session.get(JobLock, JOB_NAME)
+        raise RuntimeError(f"Analytics run {lock.run_id} is still in progress (started {lock.locked_at})")
+
+    run = AnalyticsRun(job=JOB_NAME, status="running", started_at=stamp)
+    db.session.add(run)
+    db.session.flush()
+    db.session.query(JobLock).filter_by(job=JOB_NAME, locked_at=stamp).update(
+        {JobLock.run_id: run.id}, synchronize_session=False)
+    db.session.commit()
+
+    started = time.perf_counter()
+    timings = {}
+    try:
+        for table_name, model, key_expr, normalise, recompute in FOLDS:
+            t0 = time.perf_counter()
+            info = fold_table(table_name, model, key_expr, normalise, recompute, full=full)
+            info["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            timings[table_name] = info
+        run.status = "success"
+    except Exception as e:
+        db.session.rollback()
+        run.status = "failed"
+        run.error = str(e)
+        raise
+    finally:
+        run.finished_at = datetime.datetime.utcnow()
+        run.duration_ms = int((time.perf_counter() - started) * 1000)
+        run.timings = timings
+        db.session.commit()
+        release_job(JOB_NAME, stamp)
+    return run
+
+
+# ===========================
+# CLI: flask analytics run / status
+# ===========================
+@analytics_bp.cli.command("run")
+@click.option("--full", is_flag=True, help="Ignore watermarks and rebuild every summary bucket.")
+def run_command(full):
+    """Fold new and changed rows into the daily summary tables."""
+    try:
+        run = run_analytics(full=full)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"✅ Analytics run {run.id} finished in {run.duration_ms} ms")
+    for table_name, info in run.timings.items():
+        click.echo(f"  {table_name}: {info['keys']} buckets in {info['ms']} ms")
+
+
+@analytics_bp.cli.command("status")
+@click.option("--limit", default=5, show_default=True)
+def status_command(limit):
+    """Show watermarks and the most recent runs."""
+    for wm in AnalyticsWatermark.query.order_by(AnalyticsWatermark.table_name).all():
+        click.echo(f"{wm.table_name}: id>{wm.last_id} updated_at>{wm.last_updated_at}")
+    for run in AnalyticsRun.query.filter_by(job=JOB_NAME).order_by(AnalyticsRun.id.desc()).limit(limit):
+        click.echo(f"#{run.id} {run.status} {run.started_at:%Y-%m-%d %H:%M:%S} {run.duration_ms} ms {run.timings or ''}")
+
+
+# ===========================
+# Admin Summary API (reads summaries only)
+# ===========================
+@analytics_bp.route("/admin/summary")
+@login_required
+def admin_summary():
+    if current_user.role != "Admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    college_id = current_user.college_id
+    today = datetime.date.today()
+    try:
+        start = datetime.datetime.strptime(request.args.get("start_date", ""), "%Y-%m-%d").date()
+    except ValueError:
+        start = today - datetime.timedelta(days=30)
+    try:
+        end = datetime.datetime.strptime(request.args.get("end_date", ""), "%Y-%m-%d").date()
+    except ValueError:
+        end = today
+
+    att = db.session.query(
+        DailyAttendanceSummary.branch, DailyAttendanceSummary.class_name,
+        func.sum(DailyAttendanceSummary.total), func.sum(DailyAttendanceSummary.present),
+    ).filter(
+        DailyAttendanceSummary.college_id == college_id,
+        DailyAttendanceSummary.date.between(start, end),
+    ).group_by(DailyAttendanceSummary.branch, DailyAttendanceSummary.class_name).all()
+
+    fees = db.session.query(
+        DailyFeeSummary.status, func.sum(DailyFeeSummary.payment_count), func.sum(DailyFeeSummary.amount),
+    ).filter(
+        DailyFeeSummary.college_id == college_id,
+        DailyFeeSummary.date.between(start, end),
+    ).group_by(DailyFeeSummary.status).all()
+
+    results = db.session.query(
+        ResultSummary.course_id, ResultSummary.semester, ResultSummary.total, ResultSummary.passed,
+    ).filter(ResultSummary.college_id == college_id).all()
+
+    last_run = AnalyticsRun.query.filter_by(job=JOB_NAME, status="success").order_by(AnalyticsRun.id.desc()).first()
+
+    return jsonify({
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "refreshed_at": last_run.finished_at.isoformat() if last_run else None,
+        "attendance": [
+            {"branch": b, "class": k, "total": t, "present": p,
+             "percentage": round(p * 100 / t, 2) if t else 0}
+            for b, k, t, p in att
+        ],
+        "fees": [{"status": s, "count": n, "amount": float(a or 0)} for s, n, a in fees],
+        "results": [
+            {"course_id": c, "semester": sem, "total": t, "passed": p,
+             "pass_rate": round(p * 100 / t, 2) if t else 0}
+            for c, sem, t, p in results
+        ],
+    })
@@ -13,6 +13,12 @@ from functools import wraps
 from extensions import db
 from models import User, Attendance, FeePayment, FeeConfig, College
 from utils import save_uploaded_file, role_required
+from instrumentation import init_instrumentation, metrics_bp
+from logging_config import init_logging
+from attendance_service import apply_attendance_changes, sheet_records
+from roster_service import get_roster, roster_options, invalidate_rosters
+from student_search import ensure_search_index, student_search_bp
+from student_import import student_import_bp
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
 
 # ------------------ App Setup ------------------ #
@@ -25,17 +31,24 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # ------------------ App Config ------------------ #
 app.config["SECRET_KEY"] = os.environ.get("FLASK_SECRET_KEY", "supersecretkey")
-app.config["SQLALCHEMY_DATABASE_URI"] = 'sqlite:///db.sqlite3'  # main database
+app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", 'sqlite:///db.sqlite3')  # main database
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16 MB
+app.config["LOG_FILE"] = os.path.join(BASE_DIR, "app.log")  # JSON lines, rotated
+app.config["ATTENDANCE_BITMAP"] = os.getenv("ATTENDANCE_BITMAP") == "1"  # also keep the compact attendance store
+app.config["ALERT_FILE"] = os.path.join(BASE_DIR, "alerts.jsonl")  # file transport for low-attendance alerts
+app.config["PAYMENT_GATEWAY_URL"] = os.getenv("PAYMENT_GATEWAY_URL", "http://127.0.0.1:5055")  # fake_gateway.py
+app.config["PAYMENT_WEBHOOK_SECRET"] = os.getenv("PAYMENT_WEBHOOK_SECRET", "dev-webhook-secret")
 
 # Allowed extensions for uploads
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "svg"}
 
 # ------------------ Initialize Extensions ------------------ #
+init_logging(app)
 db.init_app(app)
 migrate = Migrate(app, db)
+init_instrumentation(app)
 
 # ------------------ Flask-Login ------------------ #
 login_manager = LoginManager()
@@ -50,6 +63,7 @@ def load_user(user_id):
 # ------------------ Ensure DB Tables Exist ------------------ #
 with app.app_context():
     db.create_all()
+    ensure_search_index()
     print("✅ All tables created or already exist")
     print("✅ All database tables ensured!")
 
@@ -62,18 +76,41 @@ from dropdowns import dropdowns_bp
 from grades_bp import grades_bp
 from superadmin_routes import superadmin_bp
 from course_routes import course_bp
-from profile import profile_bp
+from course_catalog import course_catalog_bp
+from profile_routes import profile_bp
+from student_profile import profile_bp as self_profile_bp
+from dropout_risk import risk_bp
+from analytics import analytics_bp
+from attendance_import import attendance_import_bp
+from attendance_bitmap import attendance_bitmap_bp
+from alerts import alerts_bp
+from fee_defaulters import fee_defaulters_bp
+from payment_gateway import payments_bp
+from fee_resolver import fee_rules_bp
 
 # ------------------ Register Blueprints ------------------ #
 app.register_blueprint(student_bp, url_prefix="/student")
 app.register_blueprint(faculty_stud_bp, url_prefix="/faculty")
 app.register_blueprint(student_fee_bp, url_prefix="/student")
-app.register_blueprint(admin_fee, url_prefix="/admin")
+app.register_blueprint(admin_fee, url_prefix="/admin/fees")
 app.register_blueprint(dropdowns_bp, url_prefix="/api")
 app.register_blueprint(grades_bp, url_prefix="/grades")
 app.register_blueprint(superadmin_bp, url_prefix="/superadmin")
 app.register_blueprint(course_bp, url_prefix="/courses")
+app.register_blueprint(course_catalog_bp)
 app.register_blueprint(profile_bp, url_prefix="/profile")
+app.register_blueprint(self_profile_bp)
+app.register_blueprint(risk_bp, url_prefix="/risk")
+app.register_blueprint(analytics_bp, url_prefix="/analytics")
+app.register_blueprint(attendance_import_bp, url_prefix="/attendance")
+app.register_blueprint(attendance_bitmap_bp)
+app.register_blueprint(alerts_bp, url_prefix="/alerts")
+app.register_blueprint(fee_defaulters_bp, url_prefix="/fees")
+app.register_blueprint(payments_bp, url_prefix="/payments")
+app.register_blueprint(fee_rules_bp)
+app.register_blueprint(student_search_bp)
+app.register_blueprint(student_import_bp, url_prefix="/students")
+app.register_blueprint(metrics_bp)
 
 # ------------------ Routes ------------------ #
 @app.route("/")
@@ -138,6 +175,7 @@ def register():
         )
         db.session.add(user)
         db.session.commit()
+        invalidate_rosters()
 
         otp = str(random.randint(1000, 9999))
         session["otp"] = otp
@@ -235,22 +273,6 @@ def logout():
     flash("Logged out.", "info")
     return redirect(url_for("login"))
 
-# ----------- Profile ----------- #
-@app.route("/profile", methods=["GET", "POST"])
-@login_required
-def profile():
-    if request.method == "POST":
-        for field in ["dob","contact","program","year","branch","roll_no","admission_date"]:
-            setattr(current_user, field, request.form.get(field))
-        owner = f"user{current_user.id}"
-        for field in ["photo","id_card","certificate","transcript"]:
-            saved = save_uploaded_file(field, owner_prefix=owner)
-            if saved: setattr(current_user, field, saved)
-        db.session.commit()
-        flash("Profile updated successfully!", "success")
-        return redirect(url_for("profile"))
-    return render_template("profile.html", user=current_user)
-
 # ----------- Forgot / Reset ----------- #
 @app.route("/forgot", methods=["GET","POST"])
 def forgot_password():
@@ -368,10 +390,7 @@ def faculty_attendance():
     selected_date = request.args.get("date", datetime.datetime.today().strftime("%Y-%m-%d"))
 
     # Build lists for dropdowns
-    classes_query = db.session.query(User.year).filter_by(role="Student").distinct().all()
-    classes = [c[0] for c in classes_query if c[0]]
-    branches_query = db.session.query(User.branch).filter_by(role="Student").distinct().all()
-    branches = [b[0] for b in branches_query if b[0]]
+    classes, branches = roster_options()
 
     if request.method == "POST":
         selected_class = request.form.get("class")
@@ -383,56 +402,29 @@ def faculty_attendance():
             flash("Invalid date!", "danger")
             return redirect(url_for("faculty_attendance"))
 
-        # fetch students for the chosen class+branch
-        students = User.query.filter_by(role="Student", year=selected_class, branch=selected_branch).order_by(User.roll_no).all()
-
-        # remove existing attendance rows for same date/class/branch (for those students) to avoid duplicates
-        student_ids = [s.id for s in students]
-        if student_ids:
-            db.session.query(Attendance).filter(
-                Attendance.student_id.in_(student_ids),
-                Attendance.date == selected_date_obj,
-                Attendance.branch == selected_branch,
-                Attendance.class_name == selected_class
-            ).delete(synchronize_session=False)
-
-        # create records from submitted form
-        for s in students:
-            present = request.form.get(f"attendance_{s.id}") == "on"
-            rec = Attendance(
-                student_id=s.id,
-                date=selected_date_obj,
-                branch=selected_branch,
-                class_name=selected_class,
-                status="Present" if present else "Absent"
-            )
-            db.session.add(rec)
+        # only students whose status actually changed are written; bumps the sheet version
+        changes = {
+            s.id: ("Present" if request.form.get(f"attendance_{s.id}") == "on" else "Absent", None)
+            for s in get_roster(selected_class, selected_branch)
+        }
+        apply_attendance_changes(selected_date_obj, selected_branch, selected_class, changes, user_id=current_user.id)
 
-        db.session.commit()
         flash("Attendance saved!", "success")
         # redirect with query params to show the selected list
         return redirect(url_for("faculty_attendance", branch=selected_branch, class_=selected_class, date=selected_date))
 
     # if it's a GET with query params, show students for the selected class/branch
     if selected_class and selected_branch:
-        students = User.query.filter_by(role="Student", year=selected_class, branch=selected_branch).order_by(User.roll_no).all()
+        students = get_roster(selected_class, selected_branch)
 
-    # fetch existing attendance for display (if any)
-    existing_attendance = []
+    # fetch existing attendance for display (if any) as a quick lookup for status per student
+    attendance_map = {}
     try:
         date_obj = datetime.datetime.strptime(selected_date, "%Y-%m-%d").date()
         if students:
-            existing_attendance = Attendance.query.filter(
-                Attendance.student_id.in_([s.id for s in students]),
-                Attendance.date == date_obj,
-                Attendance.branch == selected_branch,
-                Attendance.class_name == selected_class
-            ).all()
+            attendance_map = {sid: status for sid, (status, _) in sheet_records(date_obj, selected_branch, selected_class).items()}
     except Exception:
-        existing_attendance = []
-
-    # build a quick lookup for status per student
-    attendance_map = {a.student_id: a.status for a in existing_attendance}
+        attendance_map = {}
 
     return render_template(
         "faculty_stud.html",
@@ -0,0 +1,216 @@
+"""
+Optional compact attendance store: one AttendanceBitmap row per
+(student, course, term) instead of one Attendance row per student per day.
+
+Bit n of ``marked`` / ``present`` is day n after the term start, so a
+percentage over any date range is two masked popcounts. The store has day
+granularity: when a course meets several times on one day, the latest mark
+for that day wins.
+
+    flask attendance-bitmap migrate      # rebuild from the Attendance table
+
+Day-sheet marks are stored under course_id None, course-session marks under
+their course. Set ATTENDANCE_BITMAP = True to keep the store in step with
+Attendance: every write path (attendance_service.apply_attendance_changes and
+mark_session, which the forms and the JSON API go through, and the CSV
+importer) passes its marks to record_marks() after committing. Turning the
+flag on for an existing database needs one migrate first, as does any write
+that bypasses those paths.
+"""
+import datetime
+import time
+
+import click
+from flask import Blueprint
+from sqlalchemy import insert
+
+from extensions import db
+from models import Attendance, AttendanceBitmap
+
+attendance_bitmap_bp = Blueprint("attendance_bitmap", __name__, cli_group="attendance-bitmap")
+
+MIGRATE_BATCH = 50_000
+ID_BATCH = 500
+
+
+# ===========================
+# Bit Helpers
+# ===========================
+def term_start_for(date):
+    """Terms run January–June and July–December."""
+    return datetime.date(date.year, 7 if date.month >= 7 else 1, 1)
+
+
+def _terms_between(start, end):
+    term = term_start_for(start)
+    while term <= end:
+        yield term
+        term = datetime.date(term.year + (term.month == 7), 1 if term.month == 7 else 7, 1)
+
+
+def to_int(blob):
+    return int.from_bytes(blob or b"", "little")
+
+
+def to_bytes(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+def _range_mask(term, start, end):
+    """Bits for the days of ``term`` that fall inside [start, end]."""
+    lo = max(0, (start - term).days)
+    hi = (end - term).days
+    if hi < lo:
+        return 0
+    return ((1 << (hi - lo + 1)) - 1) << lo
+
+
+def _course_filter(course_id):
+    return AttendanceBitmap.course_id.is_(None) if course_id is None else AttendanceBitmap.course_id == course_id
+
+
+# ===========================
+# Writes
+# ===========================
+def record_marks(marks):
+    """
+    Set/clear one day per mark: ``marks`` is an iterable of (student_id,
+    course_id, date, status, remarks), where remarks None leaves the stored
+    remark alone and "" clears it. A later mark for the same day wins. Commits.
+    """
+    groups = {}  # (course_id, term) -> {student_id: [(offset, present?, remarks)]}
+    for student_id, course_id, date, status, remarks in marks:
+        term = term_start_for(date)
+        groups.setdefault((course_id, term), {}).setdefault(student_id, []).append(
+            ((date - term).days, status.lower() == "present", remarks))
+
+    for (course_id, term), by_student in groups.items():
+        ids = list(by_student)
+        rows = {}
+        for i in range(0, len(ids), ID_BATCH):
+            for row in AttendanceBitmap.query.filter(
+                AttendanceBitmap.student_id.in_(ids[i:i + ID_BATCH]),
+                _course_filter(course_id),
+                AttendanceBitmap.term_start == term,
+            ):
+                rows[row.student_id] = row
+
+        for student_id, days in by_student.items():
+            row = rows.get(student_id)
+            if row is None:
+                row = AttendanceBitmap(student_id=student_id, course_id=course_id, term_start=term,
+                                       marked=b"", present=b"", remarks=None)
+                db.session.add(row)
+            marked, present, notes = to_int(row.marked), to_int(row.present), dict(row.remarks or {})
+            for offset, is_present, remark in days:
+                bit = 1 << offset
+                marked |= bit
+                present = present | bit if is_present else present & ~bit
+                if remark:
+                    notes[str(offset)] = remark
+                elif remark is not None:
+                    notes.pop(str(offset), None)
+            row.marked, row.present, row.remarks = to_bytes(marked), to_bytes(present), notes or None
+    db.session.commit()
+
+
+# ===========================
+# Reads
+# ===========================
+def attendance_counts(student_ids, course_id, start, end):
+    """{student_id: (classes marked, present)} over [start, end] via popcount."""
+    terms = list(_terms_between(start, end))
+    masks = {term: _range_mask(term, start, end) for term in terms}
+    counts = {}
+    ids = list(student_ids)
+    for i in range(0, len(ids), ID_BATCH):
+        rows = db.session.query(
+            AttendanceBitmap.student_id, AttendanceBitmap.term_start, AttendanceBitmap.marked, AttendanceBitmap.present
+        ).filter(
+            AttendanceBitmap.student_id.in_(ids[i:i + ID_BATCH]),
+            _course_filter(course_id),
+            AttendanceBitmap.term_start.in_(terms),
+        )
+        for student_id, term, marked, present in rows:
+            mask = masks[term]
+            total, hits = counts.get(student_id, (0, 0))
+            counts[student_id] = (total + (to_int(marked) & mask).bit_count(),
+                                  hits + (to_int(present) & mask).bit_count())
+    return counts
+
+
+def attendance_percentage(student_id, course_id, start, end):
+    """(total, present, percentage) for one student and course over [start, end]."""
+    total, present = attendance_counts([student_id], course_id, start, end).get(student_id, (0, 0))
+    return total, present, round(present / total * 100, 2) if total else 0
+
+
+def day_status(row, date):
+    """'Present' / 'Absent' / None for one day of a bitmap row, plus its remark."""
+    offset = (date - row.term_start).days
+    if offset < 0 or not (to_int(row.marked) >> offset) & 1:
+        return None, None
+    status = "Present" if (to_int(row.present) >> offset) & 1 else "Absent"
+    return status, (row.remarks or {}).get(str(offset))
+
+
+# ===========================
+# Migration from Attendance
+# ===========================
+def migrate_from_attendance(progress=None):
+    """
+    Rebuild every bitmap from the Attendance table in one streaming pass (rowid
+    order, so the latest mark for a day wins). Returns (rows read, bitmaps written).
+    """
+    acc = {}  # (student_id, course_id, term) -> [marked, present, remarks]
+    read = 0
+    query = db.session.query(
+        Attendance.student_id, Attendance.course_id, Attendance.date, Attendance.status, Attendance.remarks
+    ).order_by(Attendance.id).execution_options(yield_per=MIGRATE_BATCH)
+    for student_id, course_id, date, status, remark in query:
+        term = term_start_for(date)
+        offset = (date - term).days
+        bit = 1 << offset
+        entry = acc.get((student_id, course_id, term))
+        if entry is None:
+            entry = acc[(student_id, course_id, term)] = [0, 0, None]
+        entry[0] |= bit
+        if status.lower() == "present":
+            entry[1] |= bit
+        else:
+            entry[1] &= ~bit
+        if remark:
+            if entry[2] is None:
+                entry[2] = {}
+            entry[2][str(offset)] = remark
+        elif entry[2]:
+            entry[2].pop(str(offset), None)
+        read += 1
+        if progress and read % MIGRATE_BATCH == 0:
+            progress(read, len(acc))
+
+    db.session.query(AttendanceBitmap).delete(synchronize_session=False)
+    now = datetime.datetime.utcnow()
+    batch = []
+    for (student_id, course_id, term), (marked, present, remarks) in acc.items():
+        batch.append({
+            "student_id": student_id, "course_id": course_id, "term_start": term,
+            "marked": to_bytes(marked), "present": to_bytes(present), "remarks": remarks or None, "updated_at": now,
+        })
+        if len(batch) >= MIGRATE_BATCH:
+            db.session.execute(insert(AttendanceBitmap.__table__), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(AttendanceBitmap.__table__), batch)
+    db.session.commit()
+    return read, len(acc)
+
+
+@attendance_bitmap_bp.cli.command("migrate")
+def migrate_command():
+    """Rebuild the compact attendance store from the Attendance table."""
+    started = time.perf_counter()
+    read, written = migrate_from_attendance(
+        progress=lambda n, keys: click.echo(f"  … {n:,} attendance rows read, {keys:,} bitmaps")
+    )
+    click.echo(f"✅ {read:,} attendance rows → {written:,} bitmaps in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,304 @@
+"""
+Bulk attendance import from biometric / register CSV exports.
+
+    flask attendance import export.csv [--college-id 1] [--update] [--batch-size 50000]
+
+or upload the same file at /attendance/import. One row per student per day:
+
+    roll_no,date,status[,remarks][,course_code]
+    R0000001,2025-09-01,P,,CS101
+
+The student column may be named roll_no, enrollment_no, scholar_no or student;
+it is matched against roll, enrollment and scholar numbers. Status accepts
+P/A, Present/Absent, 1/0, Y/N.
+"""
+import csv
+import datetime
+import io
+import logging
+import time
+
+import click
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+from sqlalchemy import insert, update
+
+from extensions import db
+from attendance_service import sync_bitmaps
+from models import User, Course, Attendance, AttendanceSheet
+from utils import parse_date
+
+attendance_import_bp = Blueprint("attendance_import", __name__, cli_group="attendance")
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50_000
+MAX_ERRORS = 50  # row errors kept for the report; the rest are only counted
+
+STUDENT_COLUMNS = ("roll_no", "enrollment_no", "scholar_no", "student")
+STATUS_VALUES = {
+    "p": "Present", "present": "Present", "1": "Present", "y": "Present", "yes": "Present",
+    "a": "Absent", "absent": "Absent", "0": "Absent", "n": "Absent", "no": "Absent",
+}
+
+
+class ImportStats:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.errors = 0
+        self.error_samples = []
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def error(self, line_no, message):
+        self.errors += 1
+        if len(self.error_samples) < MAX_ERRORS:
+            self.error_samples.append(f"line {line_no}: {message}")
+
+    def summary(self):
+        return (f"{self.rows:,} rows: {self.inserted:,} inserted, {self.updated:,} updated, "
+                f"{self.skipped:,} already present, {self.errors:,} errors in {self.elapsed:.1f}s")
+
+
+# ===========================
+# Lookups (loaded once per import)
+# ===========================
+def load_student_index(college_id=None):
+    """{roll/enrollment/scholar number: (id, branch, year)} for every student."""
+    query = db.session.query(
+        User.id, User.roll_no, User.enrollment_no, User.scholar_no, User.branch, User.year
+    ).filter(User.role == "Student")
+    if college_id:
+        query = query.filter(User.college_id == college_id)
+    index = {}
+    for sid, roll_no, enrollment_no, scholar_no, branch, year in query:
+        for key in (scholar_no, enrollment_no, roll_no):  # roll_no wins on collisions
+            if key:
+                index[key.strip().upper()] = (sid, branch or "", year or "")
+    return index
+
+
+def load_course_index():
+    return {code.strip().upper(): cid for cid, code in db.session.query(Course.id, Course.course_code) if code}
+
+
+class _ExistingKeys:
+    """
+    Existing attendance keyed by (student_id, date, course_id), loaded lazily one
+    date at a time as the file references it. Rows inserted by this import are
+    added too, so duplicates inside the file are skipped as well.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self._dates = set()
+
+    def load(self, dates):
+        missing = [d for d in dates if d not in self._dates]
+        for i in range(0, len(missing), 500):
+            part = missing[i:i + 500]
+            for aid, sid, date, course_id, status in db.session.query(
+                Attendance.id, Attendance.student_id, Attendance.date, Attendance.course_id, Attendance.status
+            ).filter(Attendance.date.in_(part)):
+                self.rows[(sid, date, course_id)] = (aid, status)
+        self._dates.update(missing)
+
+
+# ===========================
+# Import
+# ===========================
+def _column(header, *names):
+    """Index of the first header matching one of ``names`` (case-insensitive), or None."""
+    normalised = [h.strip().lower() for h in header]
+    for name in names:
+        if name in normalised:
+            return normalised.index(name)
+    return None
+
+
+def import_attendance(stream, college_id=None, update_existing=False, batch_size=BATCH_SIZE, progress=None):
+    """
+    Import attendance rows from a text stream. Each batch is written and committed
+    in its own transaction; ``progress(stats)`` is called after every batch.
+    Returns ImportStats.
+    """
+    # Plain csv.reader: DictReader builds a dict per line, which dominates at 1M rows
+    reader = csv.reader(stream)
+    header = next(reader, [])
+    student_col = _column(header, *STUDENT_COLUMNS)
+    if student_col is None:
+        raise ValueError(f"CSV needs one of these columns: {', '.join(STUDENT_COLUMNS)}")
+    date_col = _column(header, "date")
+    status_col = _column(header, "status")
+    if date_col is None or status_col is None:
+        raise ValueError("CSV needs 'date' and 'status' columns")
+    remarks_col = _column(header, "remarks")
+    course_col = _column(header, "course_code")
+    width = max(c for c in (student_col, date_col, status_col, remarks_col, course_col) if c is not None) + 1
+
+    students = load_student_index(college_id)
+    courses = load_course_index() if course_col else {}
+    existing = _ExistingKeys()
+    dates = {}  # raw string -> date; exports repeat the same few dates on every line
+    touched_sheets = set()
+    stats = ImportStats()
+    now = datetime.datetime.utcnow()
+
+    batch = []
+    for line_no, row in enumerate(reader, start=2):
+        stats.rows += 1
+        if len(row) < width:
+            if not any(row):
+                stats.rows -= 1  # blank line
+            else:
+                stats.error(line_no, f"expected {width} columns, got {len(row)}")
+            continue
+        key = row[student_col].strip().upper()
+        student = students.get(key)
+        if student is None:
+            stats.error(line_no, f"unknown student {key or '(blank)'}")
+            continue
+        raw_date = row[date_col]
+        if raw_date not in dates:
+            dates[raw_date] = parse_date(raw_date)
+        date = dates[raw_date]
+        if date is None:
+            stats.error(line_no, f"invalid date {raw_date!r}")
+            continue
+        status = STATUS_VALUES.get(row[status_col].strip().lower())
+        if status is None:
+            stats.error(line_no, f"invalid status {row[status_col]!r}")
+            continue
+        course_id = None
+        if course_col is not None and row[course_col].strip():
+            course_id = courses.get(row[course_col].strip().upper())
+            if course_id is None:
+                stats.error(line_no, f"unknown course {row[course_col]!r}")
+                continue
+        remarks = (row[remarks_col].strip()[:255] or None) if remarks_col is not None else None
+        batch.append((student, date, course_id, status, remarks))
+        if len(batch) >= batch_size:
+            _write_batch(batch, existing, update_existing, touched_sheets, stats, now)
+            batch = []
+            if progress:
+                progress(stats)
+    if batch:
+        _write_batch(batch, existing, update_existing, touched_sheets, stats, now)
+        if progress:
+            progress(stats)
+
+    _bump_sheet_versions(touched_sheets)
+    return stats
+
+
+def _write_batch(batch, existing, update_existing, touched_sheets, stats, now):
+    existing.load({date for _, date, _, _, _ in batch})
+    inserts, updates, marks = [], [], []
+    for (sid, branch, year), date, course_id, status, remarks in batch:
+        key = (sid, date, course_id)
+        current = existing.rows.get(key)
+        if current is None:
+            inserts.append({
+                "student_id": sid, "course_id": course_id, "branch": branch, "class_name": year,
+                "date": date, "status": status, "remarks": remarks, "created_at": now, "updated_at": now,
+            })
+            existing.rows[key] = (None, status)
+        elif update_existing and current[0] is not None and current[1] != status:
+            updates.append({"id": current[0], "status": status, "updated_at": now})
+            existing.rows[key] = (current[0], status)
+        else:
+            stats.skipped += 1
+            continue
+        touched_sheets.add((date, branch, year))
+        marks.append((sid, course_id, date, status, (remarks or "") if current is None else None))
+
+    if inserts:
+        # Core insert on the table skips the ORM bulk layer's per-row bookkeeping
+        db.session.execute(insert(Attendance.__table__), inserts)
+    if updates:
+        db.session.execute(update(Attendance), updates)
+    db.session.commit()
+    sync_bitmaps(marks)
+    stats.inserted += len(inserts)
+    stats.updated += len(updates)
+
+
+def _bump_sheet_versions(touched_sheets):
+    """Existing sheets changed underneath API clients; make their next save re-read."""
+    if not touched_sheets:
+        return
+    dates = {d for d, _, _ in touched_sheets}
+    sheet_ids = [
+        sheet_id for sheet_id, date, branch, class_name in db.session.query(
+            AttendanceSheet.id, AttendanceSheet.date, AttendanceSheet.branch, AttendanceSheet.class_name
+        ).filter(AttendanceSheet.date.between(min(dates), max(dates)))
+        if (date, branch, class_name) in touched_sheets
+    ]
+    for i in range(0, len(sheet_ids), 500):
+        db.session.query(AttendanceSheet).filter(AttendanceSheet.id.in_(sheet_ids[i:i + 500])).update(
+            {AttendanceSheet.version: AttendanceSheet.version + 1, AttendanceSheet.last_op_id: None},
+            synchronize_session=False,
+        )
+    db.session.commit()
+
+
+# ===========================
+# CLI: flask attendance import
+# ===========================
+@attendance_import_bp.cli.command("import")
+@click.argument("csv_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--college-id", type=int, help="Only match students of this college.")
+@click.option("--update", "update_existing", is_flag=True, help="Overwrite the status of rows that already exist.")
+@click.option("--batch-size", default=BATCH_SIZE, show_default=True)
+def import_command(csv_file, college_id, update_existing, batch_size):
+    """Import attendance rows from a CSV export."""
+    def report(stats):
+        click.echo(f"  … {stats.rows:,} rows read, {stats.inserted:,} inserted ({stats.elapsed:.1f}s)")
+
+    with open(csv_file, newline="", encoding="utf-8-sig") as f:
+        try:
+            stats = import_attendance(f, college_id, update_existing, batch_size, progress=report)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    click.echo(f"✅ {stats.summary()}")
+    for message in stats.error_samples:
+        click.echo(f"  ⚠ {message}")
+
+
+# ===========================
+# Upload
+# ===========================
+@attendance_import_bp.route("/import", methods=["GET", "POST"])
+@login_required
+def upload_attendance():
+    if current_user.role not in ("Admin", "Faculty"):
+        flash("⛔ Access Denied.", "danger")
+        return redirect(url_for("dashboard"))
+
+    stats = None
+    if request.method == "POST":
+        file = request.files.get("file")
+        if not file or not file.filename.lower().endswith(".csv"):
+            flash("Please choose a .csv file.", "warning")
+            return redirect(url_for("attendance_import.upload_attendance"))
+
+        # Decode while reading so the upload is never held in memory as one string
+        stream = io.TextIOWrapper(file.stream, encoding="utf-8-sig", newline="")
+        try:
+            stats = import_attendance(
+                stream, current_user.college_id, update_existing=bool(request.form.get("update")),
+                progress=lambda s: logger.info("attendance import: %s", s.summary()),
+            )
+        except (ValueError, UnicodeDecodeError) as e:
+            db.session.rollback()
+            flash(f"❌ Import failed: {e}", "danger")
+            return redirect(url_for("attendance_import.upload_attendance"))
+        logger.info("attendance import by user %s finished: %s", current_user.id, stats.summary())
+        flash(f"✅ {stats.summary()}", "success" if not stats.errors else "warning")
+
+    return render_template("attendance_import.html", stats=stats)
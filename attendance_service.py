@@ -0,0 +1,275 @@
+import datetime
+
+from flask import current_app
+from sqlalchemy import func, case
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Attendance, AttendanceSheet, ClassSession
+from roster_service import get_roster
+
+# Compact status codes used on the wire
+STATUS_CODES = {"P": "Present", "A": "Absent"}
+CODE_FOR_STATUS = {v: k for k, v in STATUS_CODES.items()}
+
+# Form saves (no expected version) that lose the version race are re-read and retried
+SHEET_WRITE_ATTEMPTS = 3
+
+
+class VersionConflict(Exception):
+    """The sheet changed since the client last read it."""
+
+    def __init__(self, current_version):
+        super().__init__(f"attendance sheet is at version {current_version}")
+        self.current_version = current_version
+
+
+# ===========================
+# Sheets / Rosters
+# ===========================
+def get_sheet(date, branch, class_name, create=False):
+    sheet = AttendanceSheet.query.filter_by(date=date, branch=branch, class_name=class_name).first()
+    if sheet or not create:
+        return sheet
+    try:
+        with db.session.begin_nested():
+            sheet = AttendanceSheet(date=date, branch=branch, class_name=class_name, version=0)
+            db.session.add(sheet)
+    except IntegrityError:
+        # Created concurrently by another request
+        sheet = AttendanceSheet.query.filter_by(date=date, branch=branch, class_name=class_name).one()
+    return sheet
+
+
+def roster_students(branch, class_name):
+    """Cached RosterEntry tuples for the roster, ordered by roll number."""
+    return get_roster(class_name, branch)
+
+
+def sheet_records(date, branch, class_name):
+    """{student_id: (status, remarks)} for everything already marked on this sheet."""
+    return {
+        sid: (status, remarks)
+        for sid, status, remarks in db.session.query(
+            Attendance.student_id, Attendance.status, Attendance.remarks
+        ).filter_by(date=date, branch=branch, class_name=class_name, session_id=None)
+    }
+
+
+def sync_bitmaps(marks):
+    """Pass committed (student_id, course_id, date, status, remarks) marks on to the compact store, if enabled."""
+    if current_app.config.get("ATTENDANCE_BITMAP"):
+        from attendance_bitmap import record_marks
+        record_marks(marks)
+
+
+# ===========================
+# Applying Changes
+# ===========================
+def apply_attendance_changes(date, branch, class_name, changes, expected_version=None, op_id=None, user_id=None):
+    """
+    Apply ``changes`` ({student_id: (status, remarks)}) to one attendance sheet.
+    ``remarks`` of None leaves the stored remark untouched. Only rows whose
+    status/remarks actually differ are written.
+
+    Every write compares-and-swaps AttendanceSheet.version, so two saves of the
+    same sheet can never both insert a student's row. With ``expected_version``
+    the save is refused with VersionConflict unless the sheet is still at that
+    version. Without it (the form path) the version read at the start is used,
+    and a lost race is retried against the fresh rows up to
+    SHEET_WRITE_ATTEMPTS times. Replaying the same ``op_id`` is a no-op, so a
+    client can safely retry after a lost reply.
+
+    Returns (version, students_written). Commits on success.
+    """
+    for attempt in range(1, SHEET_WRITE_ATTEMPTS + 1):
+        try:
+            version, written = _apply_once(date, branch, class_name, changes, expected_version, op_id, user_id)
+            break
+        except VersionConflict:
+            if expected_version is not None or attempt == SHEET_WRITE_ATTEMPTS:
+                raise
+
+    if written:
+        sync_bitmaps((sid, None, date, status, remarks) for sid, (status, remarks) in changes.items())
+    return version, written
+
+
+def _apply_once(date, branch, class_name, changes, expected_version, op_id, user_id):
+    sheet = get_sheet(date, branch, class_name, create=True)
+    if op_id and sheet.last_op_id == op_id:
+        return sheet.version, 0
+    read_version = sheet.version if expected_version is None else expected_version
+
+    existing = {
+        a.student_id: a
+        for a in Attendance.query.filter_by(date=date, branch=branch, class_name=class_name, session_id=None).all()
+    }
+    written = 0
+    for student_id, (status, remarks) in changes.items():
+        record = existing.get(student_id)
+        if record is None:
+            db.session.add(Attendance(
+                student_id=student_id, date=date, branch=branch, class_name=class_name,
+                status=status, remarks=remarks or None,
+            ))
+            written += 1
+            continue
+        changed = False
+        if record.status != status:
+            record.status = status
+            changed = True
+        if remarks is not None and (record.remarks or "") != remarks:
+            record.remarks = remarks or None
+            changed = True
+        written += changed
+
+    if not written and read_version == sheet.version:
+        db.session.commit()
+        return sheet.version, 0
+
+    # Compare-and-swap on the sheet version; concurrent writers serialise here
+    swapped = db.session.query(AttendanceSheet).filter(
+        AttendanceSheet.id == sheet.id, AttendanceSheet.version == read_version,
+    ).update({
+        AttendanceSheet.version: AttendanceSheet.version + 1,
+        AttendanceSheet.last_op_id: op_id,
+        AttendanceSheet.updated_by: user_id,
+        AttendanceSheet.updated_at: datetime.datetime.utcnow(),
+    }, synchronize_session=False)
+    if not swapped:
+        db.session.rollback()
+        current = db.session.query(AttendanceSheet.version).filter_by(id=sheet.id).scalar()
+        raise VersionConflict(current)
+
+    db.session.commit()
+    version = db.session.query(AttendanceSheet.version).filter_by(id=sheet.id).scalar()
+    return version, written
+
+
+# ===========================
+# Course Sessions
+# ===========================
+def get_or_create_session(faculty_course, date, slot="1", topic=None, user_id=None):
+    session = ClassSession.query.filter_by(faculty_course_id=faculty_course.id, date=date, slot=slot).first()
+    if session:
+        return session
+    try:
+        with db.session.begin_nested():
+            session = ClassSession(
+                faculty_course_id=faculty_course.id, course_id=faculty_course.course_id,
+                date=date, slot=slot, topic=topic, created_by=user_id,
+            )
+            db.session.add(session)
+    except IntegrityError:
+        session = ClassSession.query.filter_by(faculty_course_id=faculty_course.id, date=date, slot=slot).one()
+    db.session.commit()
+    return session
+
+
+def session_records(session_id):
+    """{student_id: (status, remarks)} for one class session."""
+    return {
+        sid: (status, remarks)
+        for sid, status, remarks in db.session.query(
+            Attendance.student_id, Attendance.status, Attendance.remarks
+        ).filter(Attendance.session_id == session_id)
+    }
+
+
+def mark_session(session, changes, expected_version=None, op_id=None):
+    """
+    Apply ``changes`` ({student_id: (status, remarks)}) to a class session,
+    writing only rows whose status/remarks differ.
+
+    Concurrency works as in apply_attendance_changes: every write
+    compares-and-swaps ClassSession.version (backed by the unique
+    (session_id, student_id) index), ``expected_version`` refuses a stale save
+    with VersionConflict, a form save without it is retried up to
+    SHEET_WRITE_ATTEMPTS times, and a replayed ``op_id`` is a no-op.
+
+    Returns (version, students_written). Commits on success.
+    """
+    for attempt in range(1, SHEET_WRITE_ATTEMPTS + 1):
+        try:
+            version, written = _mark_session_once(session.id, changes, expected_version, op_id)
+            break
+        except VersionConflict:
+            if expected_version is not None or attempt == SHEET_WRITE_ATTEMPTS:
+                raise
+
+    if written:
+        sync_bitmaps((sid, session.course_id, session.date, status, remarks)
+                     for sid, (status, remarks) in changes.items())
+    return version, written
+
+
+def _mark_session_once(session_id, changes, expected_version, op_id):
+    session = db.session.get(ClassSession, session_id)
+    if op_id and session.last_op_id == op_id:
+        return session.version, 0
+    read_version = session.version if expected_version is None else expected_version
+
+    faculty_course = session.faculty_course
+    existing = {a.student_id: a for a in Attendance.query.filter_by(session_id=session.id).all()}
+    written = 0
+    for student_id, (status, remarks) in changes.items():
+        record = existing.get(student_id)
+        if record is None:
+            db.session.add(Attendance(
+                student_id=student_id, course_id=session.course_id, session_id=session.id,
+                date=session.date, branch=faculty_course.branch, class_name=faculty_course.year,
+                status=status, remarks=remarks or None,
+            ))
+            written += 1
+        elif record.status != status or (remarks is not None and (record.remarks or "") != remarks):
+            record.status = status
+            if remarks is not None:
+                record.remarks = remarks or None
+            written += 1
+
+    if not written and read_version == session.version:
+        db.session.commit()
+        return session.version, 0
+
+    # Compare-and-swap on the session version; concurrent writers serialise here
+    try:
+        swapped = db.session.query(ClassSession).filter(
+            ClassSession.id == session.id, ClassSession.version == read_version,
+        ).update({
+            ClassSession.version: ClassSession.version + 1,
+            ClassSession.last_op_id: op_id,
+            ClassSession.updated_at: datetime.datetime.utcnow(),
+        }, synchronize_session=False)
+    except IntegrityError:
+        swapped = 0  # another save inserted one of these students first
+    if not swapped:
+        db.session.rollback()
+        current = db.session.query(ClassSession.version).filter_by(id=session.id).scalar()
+        raise VersionConflict(current)
+
+    db.session.commit()
+    version = db.session.query(ClassSession.version).filter_by(id=session.id).scalar()
+    return version, written
+
+
+def _present():
+    return func.sum(case((func.lower(Attendance.status) == "present", 1), else_=0))
+
+
+def session_summaries(session_ids):
+    """{session_id: (total, present)} from one grouped query on ix_attendance_session."""
+    if not session_ids:
+        return {}
+    rows = db.session.query(Attendance.session_id, func.count(Attendance.id), _present()).filter(
+        Attendance.session_id.in_(session_ids)
+    ).group_by(Attendance.session_id)
+    return {sid: (total, present or 0) for sid, total, present in rows}
+
+
+def student_course_summary(student_id):
+    """{course_id: (total, present)} for one student, served by ix_attendance_student_course."""
+    rows = db.session.query(Attendance.course_id, func.count(Attendance.id), _present()).filter(
+        Attendance.student_id == student_id, Attendance.course_id.isnot(None)
+    ).group_by(Attendance.course_id)
+    return {cid: (total, present or 0) for cid, total, present in rows}
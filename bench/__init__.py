@@ -0,0 +1,28 @@
+"""
+Benchmark / load-test helpers.
+
+    python -m bench.seed --students 50000 --attendance 5000000
+    python -m bench.run                       # Flask test client
+    python -m bench.run --http http://127.0.0.1:5000 --concurrency 16
+    python -m bench.run --save-baseline       # record bench/baseline.json
+
+All commands use bench/bench.sqlite3 unless --db is given.
+"""
+import logging
+import os
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.path.join(BENCH_DIR, "bench.sqlite3")
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+
+# Every seeded user gets this password
+PASSWORD = "bench-pass"
+
+
+def load_app(db_path=DEFAULT_DB):
+    """Import the Flask app bound to the benchmark database instead of db.sqlite3."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(db_path)}"
+    from app import app
+    # Per-request access lines would swamp the report; warnings (N+1, slow queries) still show
+    logging.getLogger("access").setLevel(logging.WARNING)
+    return app
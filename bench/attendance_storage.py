@@ -0,0 +1,124 @@
+"""
+Compare the row-per-day Attendance table with the AttendanceBitmap store on
+disk size and percentage-query latency.
+
+    python -m bench.seed --students 10000 --attendance 2000000
+    python -m bench.attendance_storage [--samples 500] [--skip-migrate]
+"""
+import argparse
+import datetime
+import random
+import time
+
+from sqlalchemy import func, case, text
+
+from bench import DEFAULT_DB, load_app
+from bench.run import percentile
+
+
+def _table_bytes(db, table):
+    """Bytes used by a table and its indexes (dbstat), or None if SQLite lacks it."""
+    try:
+        return db.session.execute(text(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name = :t OR name IN "
+            "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t)"
+        ), {"t": table}).scalar()
+    except Exception:
+        db.session.rollback()
+        return None
+
+
+def _timed(fn, cases):
+    samples = []
+    for case_args in cases:
+        started = time.perf_counter()
+        fn(*case_args)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return percentile(samples, 50), percentile(samples, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--days", type=int, default=90, help="width of the percentage window")
+    parser.add_argument("--skip-migrate", action="store_true", help="reuse bitmaps already in the database")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    app = load_app(args.db)
+    from extensions import db
+    from models import Attendance, AttendanceBitmap
+    from attendance_bitmap import migrate_from_attendance, attendance_counts
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        if not args.skip_migrate:
+            started = time.perf_counter()
+            read, written = migrate_from_attendance()
+            print(f"Migrated {read:,} attendance rows → {written:,} bitmaps in {time.perf_counter() - started:.1f}s")
+        db.session.execute(text("ANALYZE"))
+
+        rows = db.session.query(func.count(Attendance.id)).scalar()
+        bitmaps = db.session.query(func.count(AttendanceBitmap.id)).scalar()
+        row_bytes, bitmap_bytes = _table_bytes(db, "attendance"), _table_bytes(db, "attendance_bitmaps")
+        print(f"\n{'store':<20}{'rows':>12}{'bytes (incl. indexes)':>24}")
+        print(f"{'attendance':<20}{rows:>12,}{str(row_bytes or 'n/a'):>24}")
+        print(f"{'attendance_bitmaps':<20}{bitmaps:>12,}{str(bitmap_bytes or 'n/a'):>24}")
+        if row_bytes and bitmap_bytes:
+            print(f"→ bitmap store is {row_bytes / bitmap_bytes:.1f}x smaller")
+
+        end = db.session.query(func.max(Attendance.date)).scalar()
+        if end is None:
+            raise SystemExit("No attendance rows - run `python -m bench.seed` first.")
+        start = end - datetime.timedelta(days=args.days)
+        pairs = db.session.query(Attendance.student_id, Attendance.course_id).filter(
+            Attendance.course_id.isnot(None)).distinct().limit(20_000).all()
+        student_cases = [(sid, cid) for sid, cid in rng.sample(pairs, min(args.samples, len(pairs)))]
+        course_ids = sorted({cid for _, cid in pairs})
+        course_students = {}
+        for sid, cid in pairs:
+            course_students.setdefault(cid, []).append(sid)
+
+        present = func.sum(case((Attendance.status == "Present", 1), else_=0))
+
+        def sql_student(sid, cid):
+            db.session.query(func.count(Attendance.id), present).filter(
+                Attendance.student_id == sid, Attendance.course_id == cid, Attendance.date.between(start, end)
+            ).one()
+
+        def bitmap_student(sid, cid):
+            attendance_counts([sid], cid, start, end)
+
+        def sql_course(cid):
+            db.session.query(Attendance.student_id, func.count(Attendance.id), present).filter(
+                Attendance.course_id == cid, Attendance.date.between(start, end)
+            ).group_by(Attendance.student_id).all()
+
+        def bitmap_course(cid):
+            attendance_counts(course_students[cid], cid, start, end)
+
+        # Sanity check: both stores agree
+        for sid, cid in student_cases[:20]:
+            t, p = db.session.query(func.count(Attendance.id), present).filter(
+                Attendance.student_id == sid, Attendance.course_id == cid, Attendance.date.between(start, end)).one()
+            got = attendance_counts([sid], cid, start, end).get(sid, (0, 0))
+            if got != (t, p or 0):
+                print(f"⚠ mismatch for student {sid} course {cid}: rows {(t, p)} bitmap {got} (same-day duplicates?)")
+
+        print(f"\nLatency over a {args.days}-day window (ms)")
+        print(f"{'query':<34}{'p50':>10}{'p95':>10}")
+        course_cases = [(cid,) for cid in course_ids[:50]]
+        for label, fn, cases in [
+            ("student %  – attendance rows", sql_student, student_cases),
+            ("student %  – bitmap popcount", bitmap_student, student_cases),
+            ("course roster % – attendance rows", sql_course, course_cases),
+            ("course roster % – bitmap popcount", bitmap_course, course_cases),
+        ]:
+            p50, p95 = _timed(fn, cases)
+            print(f"{label:<34}{p50:>10.2f}{p95:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Values/second of the parsing helpers against the strptime loop and
+parse_decimal they replaced, on synthetic form / spreadsheet columns.
+
+    python -m bench.parsing [-n 1000000] [--repeat 3]
+
+No database is needed. The "legacy" parsers below are verbatim copies of the
+old utils code, kept only as the comparison baseline; the column cases run the
+legacy scalar parser once per value, as the import paths used to. Date columns
+draw from ~25 years of days (a realistic DOB / admission spread); the "x500"
+columns repeat only 500 distinct values.
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+
+# ===========================
+# Legacy (pre-parsing) code
+# ===========================
+def legacy_parse_decimal(value, default=None):
+    if value is None:
+        return default
+    s = str(value).strip()
+    if s == "":
+        return default
+    try:
+        s = s.replace(",", "")
+        return Decimal(s)
+    except (InvalidOperation, ValueError):
+        return default
+
+
+def legacy_parse_date(value):
+    if not value:
+        return None
+    s = str(value).strip()
+    if s == "":
+        return None
+    formats = ["%Y-%m-%d", "%d-%b-%Y", "%d-%m-%Y", "%d/%m/%Y"]
+    for fmt in formats:
+        try:
+            return datetime.strptime(s, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _dates(n, fmt, distinct, rng):
+    start = date(2000, 1, 1)
+    pool = [(start + timedelta(days=rng.randrange(9000))).strftime(fmt) for _ in range(min(n, distinct))]
+    return [pool[i % len(pool)] for i in range(n)] if distinct < n else pool
+
+
+def _decimals(n, distinct, rng):
+    pool = [f"{rng.randint(0, 9_99_999):,}.{rng.randint(0, 99):02d}" for _ in range(min(n, distinct))]
+    return [pool[i % len(pool)] for i in range(n)]
+
+
+def _best(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    import parsing
+
+    rng = random.Random(args.seed)
+    n = args.n
+    columns = {
+        "iso": _dates(n, "%Y-%m-%d", n, rng),
+        "dd/mm/yyyy": _dates(n, "%d/%m/%Y", n, rng),
+        "dd-Mon-yyyy": _dates(n, "%d-%b-%Y", n, rng),
+        "dd/mm/yyyy x500": _dates(n, "%d/%m/%Y", 500, rng),
+    }
+    amounts = _decimals(n, n, rng)
+    repeated_amounts = _decimals(n, 500, rng)
+
+    cases = [(f"dates {name}", lambda v=values: [legacy_parse_date(s) for s in v],
+              lambda v=values: parsing.parse_dates(v))
+             for name, values in columns.items()]
+    cases += [
+        ("parse_date dd/mm/yyyy", lambda: [legacy_parse_date(s) for s in columns["dd/mm/yyyy"]],
+         lambda: [parsing.parse_date(s) for s in columns["dd/mm/yyyy"]]),
+        ("decimals", lambda: [legacy_parse_decimal(s) for s in amounts],
+         lambda: parsing.parse_decimals(amounts)),
+        ("decimals x500", lambda: [legacy_parse_decimal(s) for s in repeated_amounts],
+         lambda: parsing.parse_decimals(repeated_amounts)),
+    ]
+    print(f"{'case':<24}{'legacy values/s':>17}{'parsing values/s':>18}{'ratio':>8}")
+    for name, legacy, fast in cases:
+        legacy_s, fast_s = _best(legacy, args.repeat), _best(fast, args.repeat)
+        print(f"{name:<24}{n / legacy_s:>17,.0f}{n / fast_s:>18,.0f}{legacy_s / fast_s:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
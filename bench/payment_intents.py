@@ -0,0 +1,108 @@
+"""
+Concurrency check for /student/create: fire simultaneous payment-intent
+requests for one student and verify no duplicate intents are opened.
+
+    python -m bench.payment_intents [--requests 100] [--db bench/intents.sqlite3]
+
+Scenarios (each starts from a clean slate for the student):
+  same-key      every request carries the same Idempotency-Key
+  distinct-keys every request has its own key (parallel tabs)
+Both must end with exactly one Pending intent, and every response must name it.
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from bench import BENCH_DIR, PASSWORD, load_app
+
+
+def _setup(db, student_email):
+    from werkzeug.security import generate_password_hash
+    from models import User, College, FeeConfig, FeePayment, FeeLedger
+    import datetime
+
+    db.create_all()
+    college = College.query.first() or College(name="Bench College", domain="bench.local")
+    db.session.add(college)
+    student = User.query.filter_by(email=student_email).first()
+    if student is None:
+        student = User(name="Intent Student", email=student_email, password=generate_password_hash(PASSWORD),
+                       role="Student", verified=True, program="BTECH", branch="CSE", year="1")
+        db.session.add(student)
+    student.college = college
+    if not FeeConfig.query.filter_by(program="BTECH", branch="CSE", year="1").first():
+        db.session.add(FeeConfig(program="BTECH", branch="CSE", year="1", amount=Decimal("50000.00"),
+                                 last_date=datetime.date.today() + datetime.timedelta(days=30)))
+    db.session.commit()
+    FeePayment.query.filter_by(student_id=student.id).delete()
+    FeeLedger.query.filter_by(student_id=student.id).delete()
+    db.session.commit()
+    return student.id, college.id
+
+
+def _fire(app, student_email, college_id, keys):
+    """
+    Log in one client per key, then POST from all of them at once.
+    Returns ([(status, json)], seconds from release to the last response).
+    """
+    barrier = threading.Barrier(len(keys))
+    released = []
+
+    def one(key):
+        client = app.test_client()
+        client.post("/login", data={"email": student_email, "password": PASSWORD, "college_id": college_id})
+        if barrier.wait() == 0:
+            released.append(time.perf_counter())
+        res = client.post("/student/create", data={"method": "UPI"}, headers={"Idempotency-Key": key})
+        return res.status_code, res.get_json()
+
+    with ThreadPoolExecutor(max_workers=len(keys)) as pool:
+        results = list(pool.map(one, keys))
+    return results, time.perf_counter() - released[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.path.join(BENCH_DIR, "intents.sqlite3"))
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    app = load_app(args.db)
+    # 100 simultaneous logins trip the slow-request warnings; they are expected here
+    logging.getLogger("instrumentation").setLevel(logging.ERROR)
+    from extensions import db
+    from models import FeePayment
+
+    email = "intent-student@bench.local"
+    failed = False
+    for scenario in ("same-key", "distinct-keys"):
+        with app.app_context():
+            student_id, college_id = _setup(db, email)
+        shared = str(uuid.uuid4())
+        keys = [shared if scenario == "same-key" else str(uuid.uuid4()) for _ in range(args.requests)]
+
+        results, elapsed = _fire(app, email, college_id, keys)
+
+        with app.app_context():
+            intents = FeePayment.query.filter_by(student_id=student_id).all()
+        statuses = sorted({code for code, _ in results})
+        ids = {body.get("payment_id") for _, body in results if body}
+        ok = (len(intents) == 1 and intents[0].status == "Pending"
+              and ids == {intents[0].id} and all(code in (200, 201) for code, _ in results)
+              and sum(code == 201 for code, _ in results) == 1)
+        failed |= not ok
+        print(f"{scenario:<14} {args.requests} requests in {elapsed:.2f}s → {len(intents)} intent(s), "
+              f"HTTP {statuses}, {'OK' if ok else 'FAIL'}")
+        if not ok:
+            print("  responses:", sorted({(code, (body or {}).get('error')) for code, body in results}))
+
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Pages/second of the pdf_render templates against the hand-positioned
+drawString code they replaced, on synthetic receipts and a student list.
+
+    python -m bench.pdf_render [--receipts 2000] [--students 20000] [--repeat 3]
+
+No database is needed. The "legacy" renderers below are verbatim copies of the
+old route code, kept only as the comparison baseline.
+"""
+import argparse
+import datetime
+import io
+import random
+import re
+import time
+from decimal import Decimal
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+_PAGE = re.compile(rb"/Type /Page\b(?!s)")
+
+
+def _students(n, rng):
+    return [{"name": f"Student {i}", "email": f"student{i}@bench.local", "roll_no": f"R{i:06d}",
+             "program": "BTECH", "branch": rng.choice(["CSE", "ECE", "ME"]), "year": str(rng.randint(1, 4))}
+            for i in range(n)]
+
+
+def _receipts(n, rng):
+    today = datetime.datetime(2026, 1, 1)
+    return [(student, [(f"PAY{i}-{k}", Decimal(rng.randint(1000, 50000)), today + datetime.timedelta(days=k))
+                       for k in range(rng.randint(1, 4))])
+            for i, student in enumerate(_students(n, rng))]
+
+
+# ===========================
+# Legacy (pre-pdf_render) code
+# ===========================
+def legacy_receipts(college_name, receipts):
+    output = io.BytesIO()
+    pdf = canvas.Canvas(output, pagesize=A4)
+    width, height = A4
+    for student, payments in receipts:
+        y = height - 50
+        pdf.setFont("Helvetica-Bold", 16)
+        pdf.drawString(140, y - 20, college_name)
+        y -= 100
+        pdf.setFont("Helvetica", 12)
+        pdf.drawString(50, y, f"Student Name: {student['name']}")
+        pdf.drawString(50, y - 20, f"Roll No: {student['roll_no']}")
+        pdf.drawString(50, y - 40, f"Program: {student['program']} | Branch: {student['branch']} | Year: {student['year']}")
+        pdf.drawString(50, y - 60, f"Email: {student['email']}")
+        y -= 100
+        pdf.setFont("Helvetica-Bold", 14)
+        pdf.drawString(50, y, "Fee Payment Summary")
+        y -= 30
+        pdf.setFont("Helvetica", 12)
+        total = Decimal(0)
+        for payment_id, amount, created_at in payments:
+            if y < 80:
+                pdf.showPage()
+                y = height - 50
+                pdf.setFont("Helvetica", 12)
+            pdf.drawString(60, y, f"Payment ID: {payment_id} | Amount: {amount} | Date: {created_at.strftime('%Y-%m-%d')}")
+            total += amount
+            y -= 20
+        y -= 20
+        pdf.setFont("Helvetica-Bold", 12)
+        pdf.drawString(50, y, f"Total Paid: {total}")
+        pdf.showPage()
+    pdf.save()
+    return output.getvalue()
+
+
+def legacy_student_list(students):
+    output = io.BytesIO()
+    pdf = canvas.Canvas(output, pagesize=A4)
+    pdf.setFont("Helvetica", 10)
+    y = 800
+    pdf.drawString(50, y, "Students List")
+    y -= 20
+    for s in students:
+        pdf.drawString(50, y, f"{s['name']} | {s['email']} | {s['roll_no']} | {s['program']} | {s['branch']} | {s['year']}")
+        y -= 15
+        if y < 50:
+            pdf.showPage()
+            y = 800
+    pdf.save()
+    return output.getvalue()
+
+
+def _best(fn, repeat):
+    """(best seconds, pages) over ``repeat`` runs."""
+    best, pages = None, 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        data = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+        pages = len(_PAGE.findall(data))
+    return best, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--receipts", type=int, default=2000)
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from pdf_render import render_table
+    from fee_receipts import render_receipts
+    from admin_fee import STUDENT_LIST_TITLE, STUDENT_LIST_ROW, STUDENT_LIST_HEADER
+
+    rng = random.Random(args.seed)
+    receipts = _receipts(args.receipts, rng)
+    students = _students(args.students, rng)
+
+    cases = [
+        ("receipts", lambda: legacy_receipts("Bench College", receipts),
+         lambda: render_receipts("Bench College", None, receipts)),
+        ("student_list", lambda: legacy_student_list(students),
+         lambda: render_table(STUDENT_LIST_TITLE, STUDENT_LIST_ROW, STUDENT_LIST_HEADER, students)),
+    ]
+    print(f"{'document':<14}{'legacy pages/s':>16}{'pdf_render pages/s':>20}{'ratio':>8}")
+    for name, legacy, engine in cases:
+        legacy_s, legacy_pages = _best(legacy, args.repeat)
+        engine_s, engine_pages = _best(engine, args.repeat)
+        legacy_rate, engine_rate = legacy_pages / legacy_s, engine_pages / engine_s
+        print(f"{name:<14}{legacy_rate:>16,.0f}{engine_rate:>20,.0f}{engine_rate / legacy_rate:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Drive the hot endpoints and report latency percentiles, SQL statement counts
+and memory, then compare against bench/baseline.json.
+
+    python -m bench.run                                   # in-process Flask test client
+    python -m bench.run --http http://127.0.0.1:5000 -c 16  # concurrent HTTP load
+    python -m bench.run --save-baseline
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+
+from bench import BASELINE_FILE, DEFAULT_DB, PASSWORD, load_app
+
+# (name, role that must be logged in, path template). {student_id}/{payment_id}
+# are filled from the seeded data.
+ENDPOINTS = [
+    ("student_attendance", "Student", "/student/attendance"),
+    ("student_grades", "Student", "/grades/student/grades"),
+    ("student_receipt", "Student", "/student/receipt/{payment_id}"),
+    ("admin_fee_students", "Admin", "/admin/fees/api/students"),
+    ("admin_fee_receipt", "Admin", "/admin/fees/receipt/{student_id}"),
+    ("dropdowns", None, "/api/dropdowns"),
+    ("admin_student_search", "Admin", "/profile/profile/admin/students/search?q=stu"),
+]
+
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def rss_mb(pid="self"):
+    """Current resident set size from /proc, falling back to peak RSS."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _query_count(server_timing):
+    match = _QUERIES.search(server_timing or "")
+    return int(match.group(1)) if match else None
+
+
+def summarize(name, samples):
+    latencies = sorted(ms for ms, _, _ in samples)
+    queries = [q for _, q, _ in samples if q is not None]
+    errors = sum(1 for _, _, status in samples if status >= 400)
+    return {
+        "endpoint": name,
+        "requests": len(samples),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "queries": round(sum(queries) / len(queries), 1) if queries else None,
+    }
+
+
+def pick_fixtures(app):
+    """Find a student with payments and that student's college admin."""
+    from extensions import db
+    from models import User, FeePayment
+
+    with app.app_context():
+        row = db.session.query(FeePayment.id, User.id, User.email, User.college_id) \
+            .join(User, User.id == FeePayment.student_id) \
+            .filter(FeePayment.status == "Paid").order_by(FeePayment.id).first()
+        if row is None:
+            sys.exit("No paid fee payments found - run `python -m bench.seed` first.")
+        payment_id, student_id, email, college_id = row
+        admin = User.query.filter_by(role="Admin", college_id=college_id).first()
+        return {
+            "payment_id": payment_id,
+            "student_id": student_id,
+            "college_id": college_id,
+            "logins": {"Student": email, "Admin": admin.email},
+        }
+
+
+# ===========================
+# In-process (Flask test client)
+# ===========================
+def run_test_client(app, fixtures, iterations, warmup):
+    results = []
+    clients = {}
+    for role, email in fixtures["logins"].items():
+        client = app.test_client()
+        client.post("/login", data={"email": email, "password": PASSWORD, "college_id": fixtures["college_id"]})
+        clients[role] = client
+    clients[None] = app.test_client()
+
+    for name, role, template in ENDPOINTS:
+        path = template.format(**fixtures)
+        client = clients[role]
+        for _ in range(warmup):
+            client.get(path)
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            response = client.get(path)
+            elapsed = (time.perf_counter() - started) * 1000
+            samples.append((elapsed, _query_count(response.headers.get("Server-Timing")), response.status_code))
+        results.append(summarize(name, samples))
+    return results
+
+
+# ===========================
+# Concurrent HTTP load
+# ===========================
+def _opener(base_url, role, fixtures):
+    jar = CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    if role:
+        body = urllib.parse.urlencode({
+            "email": fixtures["logins"][role], "password": PASSWORD, "college_id": fixtures["college_id"],
+        }).encode()
+        opener.open(base_url + "/login", data=body).read()
+    return opener
+
+
+def run_http(base_url, fixtures, iterations, concurrency, warmup):
+    results = []
+    local = threading.local()
+
+    for name, role, template in ENDPOINTS:
+        url = base_url + template.format(**fixtures)
+
+        def hit(_):
+            openers = getattr(local, "openers", None)
+            if openers is None:
+                openers = local.openers = {}
+            if role not in openers:
+                openers[role] = _opener(base_url, role, fixtures)
+            started = time.perf_counter()
+            try:
+                with openers[role].open(url) as response:
+                    response.read()
+                    status, timing = response.status, response.headers.get("Server-Timing")
+            except urllib.error.HTTPError as e:
+                status, timing = e.code, e.headers.get("Server-Timing")
+            return (time.perf_counter() - started) * 1000, _query_count(timing), status
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(hit, range(warmup)))
+            started = time.perf_counter()
+            samples = list(pool.map(hit, range(iterations)))
+            wall = time.perf_counter() - started
+        summary = summarize(name, samples)
+        summary["rps"] = round(iterations / wall, 1) if wall else None
+        results.append(summary)
+    return results
+
+
+# ===========================
+# Reporting / Baseline
+# ===========================
+def compare(results, rss, baseline, tolerance):
+    """Return a list of human-readable regressions against the baseline."""
+    previous = {r["endpoint"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = previous.get(r["endpoint"])
+        if not old:
+            continue
+        if old["p95_ms"] and r["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{r['endpoint']}: p95 {old['p95_ms']} -> {r['p95_ms']} ms")
+        if old.get("queries") is not None and r["queries"] is not None and r["queries"] > old["queries"]:
+            regressions.append(f"{r['endpoint']}: queries {old['queries']} -> {r['queries']}")
+    if baseline.get("rss_mb") and rss and rss > baseline["rss_mb"] * (1 + tolerance):
+        regressions.append(f"rss {baseline['rss_mb']} -> {rss:.1f} MB")
+    return regressions
+
+
+def print_table(results, rss):
+    header = f"{'endpoint':<22}{'n':>7}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'rps':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['endpoint']:<22}{r['requests']:>7}{r['errors']:>6}{r['p50_ms']:>10}{r['p95_ms']:>10}"
+              f"{r['p99_ms']:>10}{str(r['queries']):>9}{str(r.get('rps', '-')):>9}")
+    if rss is not None:
+        print(f"\nRSS: {rss:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--http", metavar="BASE_URL", help="load a running server instead of the test client")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("-n", "--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--server-pid", help="read RSS of this process (HTTP mode)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95/RSS growth before flagging")
+    parser.add_argument("--out", help="also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    app = load_app(args.db)
+    fixtures = pick_fixtures(app)
+
+    if args.http:
+        results = run_http(args.http.rstrip("/"), fixtures, args.iterations, args.concurrency, args.warmup)
+        rss = rss_mb(args.server_pid) if args.server_pid else None
+    else:
+        results = run_test_client(app, fixtures, args.iterations, args.warmup)
+        rss = rss_mb()
+
+    print_table(results, rss)
+    report = {
+        "mode": "http" if args.http else "test_client",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "iterations": args.iterations,
+        "concurrency": args.concurrency if args.http else 1,
+        "rss_mb": round(rss, 1) if rss is not None else None,
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, rss, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Regressions vs baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\n✅ No regressions vs baseline")
+
+
+if __name__ == "__main__":
+    main()
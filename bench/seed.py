@@ -0,0 +1,204 @@
+"""
+Seed a synthetic multi-college dataset with bulk inserts.
+
+    python -m bench.seed --colleges 2 --students 50000 --attendance 5000000
+"""
+import argparse
+import datetime
+import os
+import random
+import time
+
+from sqlalchemy import insert, text
+from werkzeug.security import generate_password_hash
+
+from bench import DEFAULT_DB, PASSWORD, load_app
+
+PROGRAMS = {"BTECH": ["CSE", "ECE", "ME", "CE"], "MBA": ["FIN", "HR"], "BCA": ["GEN"]}
+YEARS = ["1", "2", "3", "4"]
+CHUNK = 50_000
+
+
+def _chunks(rows, size=CHUNK):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _bulk(db, model, rows, label):
+    started = time.perf_counter()
+    n = 0
+    for batch in _chunks(rows):
+        db.session.execute(insert(model), batch)
+        n += len(batch)
+    db.session.commit()
+    print(f"  {label:<16} {n:>10,} rows  {time.perf_counter() - started:6.1f}s")
+    return n
+
+
+def seed(args):
+    if args.reset and os.path.exists(args.db):
+        os.remove(args.db)
+
+    app = load_app(args.db)
+    from extensions import db
+    from models import (
+        College, User, Course, StudentCourse, FacultyCourse, Attendance,
+        FeeConfig, FeePayment, Result, DropdownValue,
+    )
+
+    rng = random.Random(args.seed)
+    password = generate_password_hash(PASSWORD, method="pbkdf2:sha256")
+    today = datetime.date.today()
+    now = datetime.datetime.utcnow()
+    cohorts = [(p, b, y) for p, branches in PROGRAMS.items() for b in branches for y in YEARS]
+
+    with app.app_context():
+        db.session.execute(text("PRAGMA synchronous=OFF"))
+        db.session.execute(text("PRAGMA journal_mode=WAL"))
+        print(f"Seeding {args.db}")
+
+        db.session.execute(insert(College), [
+            {"name": f"Bench College {c}", "domain": f"college{c}.edu", "created_at": now, "updated_at": now}
+            for c in range(1, args.colleges + 1)
+        ])
+        db.session.execute(insert(DropdownValue), [
+            {"field": field, "value": value, "created_at": now}
+            for field, values in [("program", PROGRAMS), ("branch", sorted({b for v in PROGRAMS.values() for b in v})),
+                                  ("year", YEARS), ("semester", [str(s) for s in range(1, 9)])]
+            for value in values
+        ])
+        db.session.execute(insert(Course), [
+            {"course_name": f"Course {i}", "course_code": f"C{i:04d}", "created_at": now, "updated_at": now}
+            for i in range(1, args.courses + 1)
+        ])
+        db.session.execute(insert(FeeConfig), [
+            {"program": p, "branch": b, "year": y, "amount": rng.choice([45000, 60000, 85000]),
+             "last_date": today + datetime.timedelta(days=rng.randint(-60, 60)), "created_at": now, "updated_at": now}
+            for p, b, y in cohorts
+        ])
+        db.session.commit()
+
+        # ---- Users: one admin per college, faculty, students ----
+        def users():
+            for c in range(1, args.colleges + 1):
+                yield {"name": f"Admin {c}", "email": f"admin@college{c}.edu", "password": password,
+                       "role": "Admin", "college_id": c, "verified": True}
+                for f in range(args.faculty):
+                    yield {"name": f"Faculty {c}-{f}", "email": f"faculty{f}@college{c}.edu", "password": password,
+                           "role": "Faculty", "college_id": c, "verified": True}
+            for s in range(args.students):
+                c = s % args.colleges + 1
+                program, branch, year = cohorts[s % len(cohorts)]
+                yield {
+                    "name": f"Student {s}", "email": f"student{s}@college{c}.edu", "password": password,
+                    "role": "Student", "college_id": c, "verified": True,
+                    "roll_no": f"R{s:07d}", "enrollment_no": f"EN{s:07d}", "scholar_no": f"SC{s:07d}",
+                    "program": program, "branch": branch, "year": year, "semester": str(int(year) * 2 - 1),
+                    "section": rng.choice("AB"), "class_name": year,
+                    "admission_date": today - datetime.timedelta(days=365 * int(year)),
+                }
+        _bulk(db, User, users(), "users")
+
+        students = db.session.query(User.id, User.program, User.branch, User.year, User.semester, User.college_id) \
+            .filter(User.role == "Student").order_by(User.id).all()
+        faculty = [fid for (fid,) in db.session.query(User.id).filter(User.role == "Faculty")]
+        course_ids = list(range(1, args.courses + 1))
+        enrolled = {s.id: rng.sample(course_ids, min(args.courses_per_student, len(course_ids))) for s in students}
+
+        _bulk(db, StudentCourse, (
+            {"student_id": s.id, "course_id": cid, "program": s.program, "branch": s.branch,
+             "year": s.year, "semester": s.semester}
+            for s in students for cid in enrolled[s.id]
+        ), "student_courses")
+
+        _bulk(db, FacultyCourse, (
+            {"faculty_id": rng.choice(faculty), "course_id": cid, "program": p, "branch": b, "year": y,
+             "semester": str(int(y) * 2 - 1), "course_type": rng.choice(["Theory", "Lab"])}
+            for p, b, y in cohorts for cid in rng.sample(course_ids, min(3, len(course_ids)))
+        ), "faculty_courses")
+
+        # ---- Attendance: one row per student per school day, going back from today ----
+        days = max(1, -(-args.attendance // max(1, len(students))))
+        dates = [today - datetime.timedelta(days=d) for d in range(days * 7 // 5 + 7) if (today - datetime.timedelta(days=d)).weekday() < 5][:days]
+        rates = {s.id: rng.uniform(0.5, 0.98) for s in students}
+
+        def attendance():
+            remaining = args.attendance
+            for d in dates:
+                for s in students:
+                    if remaining <= 0:
+                        return
+                    remaining -= 1
+                    yield {"student_id": s.id, "course_id": rng.choice(enrolled[s.id]) if enrolled[s.id] else None,
+                           "branch": s.branch, "class_name": s.year, "date": d,
+                           "status": "Present" if rng.random() < rates[s.id] else "Absent",
+                           "created_at": now, "updated_at": now}
+        _bulk(db, Attendance, attendance(), "attendance")
+
+        # ---- Fees ----
+        def payments():
+            for s in students:
+                for _ in range(rng.randint(0, args.max_payments)):
+                    created = now - datetime.timedelta(days=rng.randint(0, 300))
+                    yield {"student_id": s.id, "college_id": s.college_id,
+                           "amount": rng.choice([5000, 10000, 15000, 20000]),
+                           "status": rng.choices(["Paid", "Pending", "Failed"], [0.8, 0.15, 0.05])[0],
+                           "payment_method": rng.choice(["UPI", "NetBanking"]),
+                           "payment_id": f"PAY{rng.getrandbits(40):x}",
+                           "created_at": created, "updated_at": created}
+        _bulk(db, FeePayment, payments(), "fee_payments")
+
+        # ---- Results ----
+        grades = [(90, "A+"), (80, "A"), (70, "B+"), (60, "B"), (50, "C"), (40, "D"), (0, "F")]
+
+        def results():
+            for s in students:
+                for sem in range(1, int(s.semester or 1) + 1):
+                    for cid in enrolled[s.id]:
+                        marks = max(0, min(100, int(rng.gauss(65, 15))))
+                        yield {"student_id": s.id, "course_id": cid, "semester": str(sem), "marks": marks,
+                               "grade": next(g for floor, g in grades if marks >= floor),
+                               "approved_by_admin": rng.random() < 0.9, "created_at": now, "updated_at": now}
+        _bulk(db, Result, results(), "results")
+
+        # Core inserts bypass the ORM hook that maintains the search index
+        from student_search import rebuild_index
+        started = time.perf_counter()
+        print(f"  {'student_search':<16} {rebuild_index():>10,} rows  {time.perf_counter() - started:6.1f}s")
+
+        # ...and the StudentCourse events that maintain Course.enrollment_count
+        from course_catalog import recount_enrollments
+        started = time.perf_counter()
+        print(f"  {'enrollment_count':<16} {recount_enrollments():>10,} rows  {time.perf_counter() - started:6.1f}s")
+
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--colleges", type=int, default=2)
+    parser.add_argument("--students", type=int, default=50_000)
+    parser.add_argument("--faculty", type=int, default=50, help="faculty per college")
+    parser.add_argument("--courses", type=int, default=40)
+    parser.add_argument("--courses-per-student", type=int, default=5)
+    parser.add_argument("--attendance", type=int, default=5_000_000, help="total attendance rows")
+    parser.add_argument("--max-payments", type=int, default=3, help="max fee payments per student")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-reset", dest="reset", action="store_false", help="append to an existing database")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    seed(args)
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Course catalog: cached per-cohort course lists with enrollment counts, and
+eager-loaded enrollment / assignment views for the course pages.
+
+A course is scoped to a cohort by its program / branch / year / semester
+columns, where NULL means "any", so an unscoped course is offered to
+everyone. get_catalog(program, branch, year, semester) returns the courses
+offered to that cohort as CatalogEntry tuples, and get_catalog() returns the
+whole catalog. Snapshots are kept in process memory per cohort. Code that
+adds, edits or deletes a course, or enrolls a student, must call
+invalidate_catalog() after committing. Entries also expire after
+CATALOG_CACHE_TTL seconds, which bounds staleness for other worker
+processes (as in roster_service).
+
+Course.enrollment_count is kept equal to the number of StudentCourse rows by
+mapper events on StudentCourse insert/delete. The UPDATE runs in the same
+flush as the enrollment, so a course page reads the count instead of
+counting. Core bulk inserts bypass the events and must be followed by:
+
+    flask courses recount
+"""
+import threading
+import time
+from collections import namedtuple
+
+import click
+from flask import Blueprint
+from sqlalchemy import event, func, or_, select, update
+from sqlalchemy.orm import joinedload
+
+from extensions import db
+from models import Course, StudentCourse, FacultyCourse
+
+course_catalog_bp = Blueprint("course_catalog", __name__, cli_group="courses")
+
+CATALOG_CACHE_TTL = 300
+COHORT_COLUMNS = ("program", "branch", "year", "semester")
+
+CatalogEntry = namedtuple("CatalogEntry", [
+    "id", "course_name", "course_code", "program", "branch", "year", "semester", "enrollment_count",
+])
+
+_cache = {}
+_lock = threading.Lock()
+_select = [getattr(Course, c) for c in CatalogEntry._fields]
+
+
+def invalidate_catalog():
+    """Drop every cached catalog snapshot; call after any course or enrollment change."""
+    with _lock:
+        _cache.clear()
+
+
+# ===========================
+# Catalog
+# ===========================
+def get_catalog(program=None, branch=None, year=None, semester=None):
+    """
+    Courses offered to a cohort, ordered by name, as CatalogEntry tuples. A
+    None argument matches every course on that column. The returned tuple is
+    shared; do not mutate it.
+    """
+    key = (program, branch, year, semester)
+    now = time.monotonic()
+    with _lock:
+        hit = _cache.get(key)
+        if hit and hit[0] > now:
+            return hit[1]
+
+    query = db.session.query(*_select)
+    for column, value in zip(COHORT_COLUMNS, key):
+        if value is not None:
+            column = getattr(Course, column)
+            query = query.filter(or_(column.is_(None), column == value))
+    value = tuple(CatalogEntry(*row) for row in query.order_by(Course.course_name))
+
+    with _lock:
+        _cache[key] = (now + CATALOG_CACHE_TTL, value)
+    return value
+
+
+def cohort_catalog(user):
+    """get_catalog for a student's own program / branch / year / semester."""
+    return get_catalog(*(getattr(user, c) or None for c in COHORT_COLUMNS))
+
+
+def catalog_offers(entries, course_id):
+    """True if ``course_id`` is one of the catalog ``entries``."""
+    return any(entry.id == course_id for entry in entries)
+
+
+# ===========================
+# Enrollment views
+# ===========================
+def student_enrollments(student_id):
+    """A student's StudentCourse rows with their Course loaded in the same query."""
+    return (StudentCourse.query.options(joinedload(StudentCourse.course))
+            .filter_by(student_id=student_id).order_by(StudentCourse.id).all())
+
+
+def faculty_assignments(faculty_id):
+    """A faculty member's FacultyCourse rows with their Course loaded in the same query."""
+    return (FacultyCourse.query.options(joinedload(FacultyCourse.course))
+            .filter_by(faculty_id=faculty_id).order_by(FacultyCourse.id).all())
+
+
+# ===========================
+# Enrollment counts
+# ===========================
+def _bump(connection, course_id, delta):
+    connection.execute(
+        update(Course.__table__)
+        .where(Course.__table__.c.id == course_id)
+        .values(enrollment_count=Course.__table__.c.enrollment_count + delta)
+    )
+
+
+@event.listens_for(StudentCourse, "after_insert")
+def _count_insert(mapper, connection, target):
+    _bump(connection, target.course_id, 1)
+
+
+@event.listens_for(StudentCourse, "after_delete")
+def _count_delete(mapper, connection, target):
+    _bump(connection, target.course_id, -1)
+
+
+def recount_enrollments():
+    """Recompute every Course.enrollment_count from student_courses. Caller commits."""
+    courses = Course.__table__
+    counts = (select(func.count(StudentCourse.id))
+              .where(StudentCourse.course_id == courses.c.id)
+              .scalar_subquery())
+    result = db.session.execute(update(courses).values(enrollment_count=counts))
+    return result.rowcount
+
+
+@course_catalog_bp.cli.command("recount")
+def recount_command():
+    """Recompute course enrollment counts (after Core bulk enrollment inserts)."""
+    started = time.perf_counter()
+    count = recount_enrollments()
+    db.session.commit()
+    invalidate_catalog()
+    click.echo(f"Recounted {count:,} courses in {time.perf_counter() - started:.2f}s")
@@ -1,10 +1,22 @@
-from flask import Blueprint, request, redirect, url_for, flash, render_template
+import io
+
+from flask import Blueprint, request, redirect, url_for, flash, render_template, send_file
 from flask_login import login_required, current_user
 from extensions import db
 from models import Course, StudentCourse, FacultyCourse, User  # ✅ use singular consistently
+from roster_service import invalidate_rosters
+from course_catalog import (get_catalog, cohort_catalog, catalog_offers, invalidate_catalog,
+                            student_enrollments, faculty_assignments)
+from utils import parse_string
+from pdf_render import Block, Text, table_row, render_table
 
 course_bp = Blueprint("course_bp", __name__)
 
+COURSE_LIST_TITLE = Block([Text(40, 0, "Courses List", font=("Helvetica-Bold", 12))], height=25)
+COURSE_LIST_ROW, COURSE_LIST_HEADER = table_row([
+    ("n", "#", 30), ("course_name", "Course Name", 330), ("course_code", "Course Code", 120),
+], font=("Helvetica", 11), header_font=("Helvetica-Bold", 11), height=18)
+
 # -------------------- Admin: Add Course -------------------- #
 @course_bp.route("/add_course", methods=["POST"])
 @login_required
@@ -13,12 +25,12 @@ def add_course():
         flash("⛔ Access Denied.", "danger")
         return redirect(url_for("course_bp.admin_courses"))
 
-    course_name = request.form.get("course_name")
-    course_code = request.form.get("course_code")
-    program = request.form.get("program")
-    branch = request.form.get("branch")
-    year = request.form.get("year")
-    semester = request.form.get("semester")
+    course_name = parse_string(request.form.get("course_name"))
+    course_code = parse_string(request.form.get("course_code"))
+    program = parse_string(request.form.get("program"))
+    branch = parse_string(request.form.get("branch"))
+    year = parse_string(request.form.get("year"))
+    semester = parse_string(request.form.get("semester"))
 
     if not course_name or not course_code:
         flash("❌ Course Name and Code are required.", "danger")
@@ -42,6 +54,7 @@ def add_course():
     )
     db.session.add(new_course)
     db.session.commit()
+    invalidate_catalog()
 
     flash(f"✅ Course '{course_name}' added successfully!", "success")
     return redirect(url_for("course_bp.admin_courses"))
@@ -55,10 +68,31 @@ def admin_courses():
         flash("⛔ Access Denied.", "danger")
         return redirect(url_for("dashboard"))
 
-    courses = Course.query.all()
+    courses = get_catalog()
     return render_template("admin_course.html", courses=courses)
 
 
+# -------------------- Admin: Course List PDF -------------------- #
+@course_bp.route("/admin/course/export/pdf")
+@login_required
+def export_courses_pdf():
+    if current_user.role != "Admin":
+        flash("⛔ Access Denied.", "danger")
+        return redirect(url_for("dashboard"))
+
+    # Same filter as the search box on the page
+    query = Course.query.order_by(Course.course_name)
+    search = (request.args.get("q") or "").strip()
+    if search:
+        pattern = f"%{search}%"
+        query = query.filter(Course.course_name.ilike(pattern) | Course.course_code.ilike(pattern))
+
+    rows = ({"n": n, "course_name": c.course_name, "course_code": c.course_code}
+            for n, c in enumerate(query, start=1))
+    pdf = render_table(COURSE_LIST_TITLE, COURSE_LIST_ROW, COURSE_LIST_HEADER, rows)
+    return send_file(io.BytesIO(pdf), mimetype="application/pdf", as_attachment=True, download_name="courses.pdf")
+
+
 # -------------------- Student: View & Enroll in Courses -------------------- #
 @course_bp.route("/student/courses", methods=["GET", "POST"])
 @login_required
@@ -67,10 +101,10 @@ def student_courses():
         flash("⛔ Access Denied.", "danger")
         return redirect(url_for("dashboard"))
 
-    courses = Course.query.all()
+    courses = cohort_catalog(current_user)
 
     if request.method == "POST":
-        course_id = request.form.get("course_id")
+        course_id = request.form.get("course_id", type=int)
         if not course_id:
             flash("❌ Please select a course.", "danger")
             return redirect(url_for("course_bp.student_courses"))
@@ -83,6 +117,9 @@ def student_courses():
         if existing:
             flash("⚠️ You are already enrolled in this course.", "warning")
             return redirect(url_for("course_bp.student_courses"))
+        if not catalog_offers(courses, course_id):
+            flash("❌ This course is not offered to your program / branch / year.", "danger")
+            return redirect(url_for("course_bp.student_courses"))
 
         # Auto-fill from User profile
         enrollment = StudentCourse(
@@ -94,12 +131,14 @@ def student_courses():
             semester=current_user.semester
         )
         db.session.add(enrollment)
-        db.session.commit()
+        db.session.commit()  # Course.enrollment_count is bumped in the same flush
+        invalidate_rosters()
+        invalidate_catalog()
 
         flash("✅ Successfully enrolled in course!", "success")
         return redirect(url_for("course_bp.student_courses"))
 
-    enrolled_courses = StudentCourse.query.filter_by(student_id=current_user.id).all()
+    enrolled_courses = student_enrollments(current_user.id)
 
     student_info = {
         "name": current_user.name or "N/A",
@@ -129,7 +168,7 @@ def faculty_courses():
         flash("⛔ Access Denied.", "danger")
         return redirect(url_for("dashboard"))
 
-    courses = Course.query.all()
+    courses = get_catalog()
 
     if request.method == "POST":
         course_id = request.form.get("course_id")
@@ -172,5 +211,5 @@ def faculty_courses():
         flash("✅ Course assigned successfully!", "success")
         return redirect(url_for("course_bp.faculty_courses"))
 
-    assigned_courses = FacultyCourse.query.filter_by(faculty_id=current_user.id).all()
+    assigned_courses = faculty_assignments(current_user.id)
     return render_template("faculty_courses.html", courses=courses, assigned=assigned_courses)
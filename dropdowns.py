@@ -2,6 +2,7 @@ from flask import Blueprint, jsonify, request, render_template, flash, redirect,
 from flask_login import login_required, current_user
 from extensions import db
 from models import DropdownValue, Course
+from course_catalog import invalidate_catalog
 
 dropdowns_bp = Blueprint("dropdowns_bp", __name__)
 
@@ -73,6 +74,8 @@ def add_dropdown_value():
             db.session.add(DropdownValue(field=field, value=value))
 
         db.session.commit()
+        if field == "courses":
+            invalidate_catalog()
         return jsonify({"message": f"Value '{value}' added to {field}."}), 201
     except Exception as e:
         db.session.rollback()
@@ -106,6 +109,8 @@ def delete_dropdown_value():
             db.session.delete(record)
 
         db.session.commit()
+        if field == "courses":
+            invalidate_catalog()
         return jsonify({"message": f"Value '{value}' deleted from {field}."}), 200
     except Exception as e:
         db.session.rollback()
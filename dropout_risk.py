@@ -0,0 +1,340 @@
+import datetime
+import time
+from decimal import Decimal
+
+import numpy as np
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy import func, case, and_, insert
+
+from extensions import db
+from fee_resolver import compiled_rules, match_rule, normalize_cohort
+from models import User, Attendance, Result, FeePayment, DropoutRiskScore
+
+risk_bp = Blueprint("risk_bp", __name__)
+
+# Attendance in the last RECENT_WINDOW_DAYS is compared against everything before it
+RECENT_WINDOW_DAYS = 30
+# Average marks below this count as a deficit
+MARKS_REFERENCE = 60.0
+# A drop of this many marks per semester saturates the "marks decline" feature
+MARKS_DECLINE_SCALE = 10.0
+# Days without a payment (while dues are outstanding) that saturate "payment staleness"
+PAYMENT_STALENESS_DAYS = 180.0
+
+# Lightweight logistic model over features scaled to [0, 1]
+FEATURES = [
+    "absence",
+    "attendance_decline",
+    "marks_deficit",
+    "marks_decline",
+    "dues_ratio",
+    "payment_staleness",
+]
+MODEL_WEIGHTS = np.array([3.0, 2.0, 2.5, 1.5, 1.0, 1.0])
+MODEL_BIAS = -3.0
+
+RISK_LEVELS = [(0.7, "High"), (0.4, "Medium"), (0.0, "Low")]
+
+ID_BATCH = 500
+NO_COLLEGE = "⛔ Your account is not linked to a college."
+
+
+# ===========================
+# Feature Extraction
+# ===========================
+def _align(rows, ids, width):
+    """
+    Scatter grouped rows of (student_id, v1..vN) onto the sorted ``ids`` array.
+    Students missing from ``rows`` get zeros; NULL aggregates become NaN.
+    """
+    out = np.zeros((len(ids), width), dtype=np.float64)
+    if not rows or not len(ids):
+        return out
+    data = np.array(rows, dtype=np.float64)
+    sids = data[:, 0].astype(np.int64)
+    pos = np.minimum(np.searchsorted(ids, sids), len(ids) - 1)
+    hit = ids[pos] == sids
+    out[pos[hit]] = data[hit, 1:]
+    return out
+
+
+def _ratio(num, den):
+    """Element-wise num / den with 0 where den is 0."""
+    return np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+
+
+def _cohort_fees(students, rules):
+    """Cohort fee per student row: the rows are grouped by cohort and each cohort matched once."""
+    if not students:
+        return np.zeros(0, dtype=np.float64)
+    columns = list(zip(*students))
+    sep = "\x1f"
+    cohort = np.array(columns[1], dtype=str)
+    for i in (2, 3, 5):  # branch, year, section
+        cohort = np.char.add(np.char.add(cohort, sep), np.array(columns[i], dtype=str))
+    keys, inverse = np.unique(cohort, return_inverse=True)
+    amounts = np.zeros(len(keys), dtype=np.float64)
+    for i, key in enumerate(keys.tolist()):
+        rule = match_rule(rules, normalize_cohort(*key.split(sep)))
+        if rule is not None:
+            amounts[i] = float(rule.amount)
+    return amounts[inverse]
+
+
+def extract_features(college_id=None, today=None):
+    """
+    Build the per-student feature matrix with one grouped query per source table.
+    Returns (ids, raw, X) where ``raw`` holds the human-readable features that are
+    stored with the score and ``X`` is the scaled model input (len(ids) x len(FEATURES)).
+    """
+    today = today or datetime.date.today()
+
+    students = db.session.query(
+        User.id, func.coalesce(User.program, ""), func.coalesce(User.branch, ""), func.coalesce(User.year, ""),
+        User.college_id, func.coalesce(User.section, ""),
+    ).filter(User.role == "Student")
+    if college_id:
+        students = students.filter(User.college_id == college_id)
+    students = students.order_by(User.id).all()
+
+    ids = np.fromiter((s[0] for s in students), dtype=np.int64, count=len(students))
+    scope = db.select(User.id).where(User.role == "Student")
+    if college_id:
+        scope = scope.where(User.college_id == college_id)
+
+    # ---- Attendance: overall rate and recent-vs-earlier trend ----
+    cutoff = today - datetime.timedelta(days=RECENT_WINDOW_DAYS)
+    is_present = func.lower(Attendance.status) == "present"
+    is_recent = Attendance.date >= cutoff
+    att = _align(
+        db.session.query(
+            Attendance.student_id,
+            func.count(Attendance.id),
+            func.sum(case((is_present, 1), else_=0)),
+            func.sum(case((is_recent, 1), else_=0)),
+            func.sum(case((and_(is_recent, is_present), 1), else_=0)),
+        ).filter(Attendance.student_id.in_(scope)).group_by(Attendance.student_id).all(),
+        ids, 4,
+    )
+    total, present, recent_total, recent_present = att.T
+    attendance_rate = _ratio(present, total)
+    recent_rate = _ratio(recent_present, recent_total)
+    earlier_rate = _ratio(present - recent_present, total - recent_total)
+    has_both = (recent_total > 0) & (total - recent_total > 0)
+    attendance_trend = np.where(has_both, recent_rate - earlier_rate, 0.0)
+
+    # ---- Results: mean marks and least-squares slope of marks over semester ----
+    sem = db.cast(Result.semester, db.Integer)
+    res = np.nan_to_num(_align(
+        db.session.query(
+            Result.student_id,
+            func.count(Result.id),
+            func.sum(sem),
+            func.sum(Result.marks),
+            func.sum(sem * Result.marks),
+            func.sum(sem * sem),
+        ).filter(Result.student_id.in_(scope)).group_by(Result.student_id).all(),
+        ids, 5,
+    ))
+    n, sx, sy, sxy, sxx = res.T
+    marks_avg = _ratio(sy, n)
+    marks_trend = _ratio(n * sxy - sx * sy, n * sxx - sx * sx)
+
+    # ---- Fees: outstanding dues against the fee that applies to each student ----
+    # Same rules as the fee pages and defaulters report (wildcard, program-wide and
+    # section rules, per-student overrides), matched once per distinct cohort
+    rules, overrides = compiled_rules()
+    fee_due = _cohort_fees(students, rules)
+    if overrides and len(ids):
+        oid = np.fromiter(overrides, dtype=np.int64, count=len(overrides))
+        order = np.argsort(oid)
+        oid = oid[order]
+        amount = np.array([float(r.amount) for r in overrides.values()], dtype=np.float64)[order]
+        pos = np.minimum(np.searchsorted(oid, ids), len(oid) - 1)
+        hit = oid[pos] == ids
+        fee_due[hit] = amount[pos[hit]]
+
+    paid_rows = db.session.query(
+        FeePayment.student_id,
+        func.sum(FeePayment.amount),
+        func.max(FeePayment.created_at),
+    ).filter(FeePayment.student_id.in_(scope), FeePayment.status == "Paid").group_by(FeePayment.student_id).all()
+    pay = _align(
+        [(sid, float(paid or 0), (today - last.date()).days if last else None) for sid, paid, last in paid_rows],
+        ids, 2,
+    )
+    paid = pay[:, 0]
+    days_since_payment = np.where(np.isin(ids, [r[0] for r in paid_rows]), pay[:, 1], np.nan)
+    outstanding = np.maximum(fee_due - paid, 0.0)
+
+    # ---- Scaled model input ----
+    has_att = total > 0
+    has_marks = n > 0
+    owes = outstanding > 0
+    staleness = np.where(np.isnan(days_since_payment), PAYMENT_STALENESS_DAYS, days_since_payment)
+    X = np.column_stack([
+        np.where(has_att, 1.0 - attendance_rate, 0.0),
+        np.clip(-attendance_trend, 0.0, 1.0),
+        np.where(has_marks, np.clip((MARKS_REFERENCE - marks_avg) / MARKS_REFERENCE, 0.0, 1.0), 0.0),
+        np.clip(-marks_trend / MARKS_DECLINE_SCALE, 0.0, 1.0),
+        np.clip(_ratio(outstanding, fee_due), 0.0, 1.0),
+        np.where(owes, np.clip(staleness / PAYMENT_STALENESS_DAYS, 0.0, 1.0), 0.0),
+    ]) if len(ids) else np.zeros((0, len(FEATURES)))
+
+    raw = {
+        "attendance_rate": np.where(has_att, attendance_rate, np.nan),
+        "attendance_trend": attendance_trend,
+        "marks_avg": np.where(has_marks, marks_avg, np.nan),
+        "marks_trend": marks_trend,
+        "outstanding_dues": outstanding,
+        "days_since_payment": days_since_payment,
+        "college_id": [s[4] for s in students],
+    }
+    return ids, raw, X
+
+
+# ===========================
+# Scoring
+# ===========================
+def score_features(X):
+    """Logistic score in [0, 1] for each row of the scaled feature matrix."""
+    return 1.0 / (1.0 + np.exp(-(X @ MODEL_WEIGHTS + MODEL_BIAS)))
+
+
+def risk_level(score):
+    for threshold, label in RISK_LEVELS:
+        if score >= threshold:
+            return label
+    return RISK_LEVELS[-1][1]
+
+
+def _nullable(values, cast=float):
+    return [None if np.isnan(v) else cast(v) for v in values.tolist()]
+
+
+def rescore_students(college_id=None):
+    """
+    Recompute and store dropout-risk scores for every student (optionally one college).
+    Returns (number_scored, elapsed_seconds).
+    """
+    started = time.perf_counter()
+    ids, raw, X = extract_features(college_id)
+    scores = score_features(X)
+
+    now = datetime.datetime.utcnow()
+    attendance_rate = _nullable(raw["attendance_rate"])
+    marks_avg = _nullable(raw["marks_avg"])
+    days_since = _nullable(raw["days_since_payment"], int)
+    rows = [
+        {
+            "student_id": sid,
+            "college_id": raw["college_id"][i],
+            "score": score,
+            "risk_level": risk_level(score),
+            "attendance_rate": attendance_rate[i],
+            "attendance_trend": att_trend,
+            "marks_avg": marks_avg[i],
+            "marks_trend": mk_trend,
+            "outstanding_dues": Decimal(f"{dues:.2f}"),
+            "days_since_payment": days_since[i],
+            "computed_at": now,
+        }
+        for i, (sid, score, att_trend, mk_trend, dues) in enumerate(zip(
+            ids.tolist(), scores.tolist(), raw["attendance_trend"].tolist(),
+            raw["marks_trend"].tolist(), raw["outstanding_dues"].tolist(),
+        ))
+    ]
+
+    stale = db.session.query(DropoutRiskScore)
+    if college_id:
+        stale.filter(DropoutRiskScore.college_id == college_id).delete(synchronize_session=False)
+        # student_id is unique: a student who moved college still has a row under the old one
+        id_list = ids.tolist()
+        for i in range(0, len(id_list), ID_BATCH):
+            stale.filter(DropoutRiskScore.student_id.in_(id_list[i:i + ID_BATCH])).delete(synchronize_session=False)
+    else:
+        stale.delete(synchronize_session=False)
+    if rows:
+        db.session.execute(insert(DropoutRiskScore), rows)
+    db.session.commit()
+    return len(rows), time.perf_counter() - started
+
+
+# ===========================
+# Admin Risk Dashboard
+# ===========================
+def _scores_query(level=None):
+    """The current admin's college's scores; callers reject admins without a college first."""
+    query = db.session.query(DropoutRiskScore, User).join(User, User.id == DropoutRiskScore.student_id) \
+        .filter(DropoutRiskScore.college_id == current_user.college_id)
+    if level:
+        query = query.filter(DropoutRiskScore.risk_level == level)
+    return query.order_by(DropoutRiskScore.score.desc())
+
+
+@risk_bp.route("/admin")
+@login_required
+def admin_risk():
+    if current_user.role != "Admin":
+        flash("⛔ Access Denied.", "danger")
+        return redirect(url_for("dashboard"))
+    if current_user.college_id is None:  # None would show every college
+        flash(NO_COLLEGE, "danger")
+        return redirect(url_for("dashboard"))
+
+    level = request.args.get("level") or None
+    limit = request.args.get("limit", 200, type=int)
+    rows = _scores_query(level).limit(limit).all()
+
+    counts = dict(db.session.query(DropoutRiskScore.risk_level, func.count(DropoutRiskScore.id))
+                  .filter(DropoutRiskScore.college_id == current_user.college_id)
+                  .group_by(DropoutRiskScore.risk_level).all())
+    return render_template("admin_risk.html", rows=rows, counts=counts, selected_level=level)
+
+
+@risk_bp.route("/admin/api")
+@login_required
+def admin_risk_api():
+    if current_user.role != "Admin":
+        return jsonify({"error": "Unauthorized"}), 403
+    if current_user.college_id is None:
+        return jsonify({"error": NO_COLLEGE}), 403
+
+    level = request.args.get("level") or None
+    limit = request.args.get("limit", 200, type=int)
+    return jsonify([
+        {
+            "student_id": s.student_id,
+            "name": u.name,
+            "roll_no": u.roll_no,
+            "program": u.program,
+            "branch": u.branch,
+            "year": u.year,
+            "score": round(s.score, 4),
+            "risk_level": s.risk_level,
+            "attendance_rate": s.attendance_rate,
+            "attendance_trend": s.attendance_trend,
+            "marks_avg": s.marks_avg,
+            "marks_trend": s.marks_trend,
+            "outstanding_dues": float(s.outstanding_dues) if s.outstanding_dues is not None else None,
+            "days_since_payment": s.days_since_payment,
+            "computed_at": s.computed_at.isoformat(),
+        }
+        for s, u in _scores_query(level).limit(limit).all()
+    ])
+
+
+@risk_bp.route("/admin/rescore", methods=["POST"])
+@login_required
+def admin_rescore():
+    if current_user.role != "Admin":
+        flash("⛔ Access Denied.", "danger")
+        return redirect(url_for("dashboard"))
+    if current_user.college_id is None:  # None would rescore every college
+        flash(NO_COLLEGE, "danger")
+        return redirect(url_for("dashboard"))
+
+    count, elapsed = rescore_students(current_user.college_id)
+    flash(f"✅ Rescored {count} students in {elapsed:.2f}s", "success")
+    return redirect(url_for("risk_bp.admin_risk"))
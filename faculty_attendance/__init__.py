@@ -5,4 +5,4 @@ faculty_stud_bp = Blueprint(
     template_folder="templates"
 )
 
-from faculty_attendance import routes  # import routes after defining blueprint
+from faculty_attendance import routes, api, sessions  # import routes after defining blueprint
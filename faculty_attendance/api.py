@@ -0,0 +1,127 @@
+"""
+JSON attendance API used by faculty_stud.html for delta sync.
+
+GET  /faculty/api/attendance/roster?branch=&class=&date=
+     -> {"version": 3, "columns": [...], "rows": [[id, roll_no, name, "P"|"A"|null, remarks], ...]}
+     Sent with an ETag, so an unchanged roster costs a 304.
+
+POST /faculty/api/attendance
+     {"date": "2025-09-01", "branch": "CSE", "class": "2", "version": 3, "op_id": "<uuid>",
+      "changes": [[student_id, "P"|"A", remarks?], ...]}
+     -> {"version": 4, "applied": 2}
+     Only changed students are sent. A stale "version" gets a 409 with the current
+     version and the server's rows for the students in the request; a repeated
+     "op_id" is acknowledged without being applied twice. A busy / locked
+     database gets the same 409, so the client re-reads and retries.
+"""
+from datetime import datetime
+
+from flask import request, jsonify
+from flask_login import current_user
+from sqlalchemy.exc import OperationalError
+
+from extensions import db
+from faculty_attendance import faculty_stud_bp
+from attendance_service import (
+    STATUS_CODES, CODE_FOR_STATUS, VersionConflict,
+    get_sheet, roster_students, sheet_records, apply_attendance_changes,
+)
+from utils import role_required
+
+ROSTER_COLUMNS = ["id", "roll_no", "name", "status", "remarks"]
+
+
+def _sheet_key(source):
+    branch = (source.get("branch") or "").strip()
+    class_name = (source.get("class") or "").strip()
+    try:
+        date = datetime.strptime(source.get("date") or "", "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        date = None
+    return date, branch, class_name
+
+
+def _rows(students, records):
+    rows = []
+    for student in students:
+        status, remarks = records.get(student.id, (None, None))
+        rows.append([student.id, student.roll_no, student.name, CODE_FOR_STATUS.get(status), remarks])
+    return rows
+
+
+@faculty_stud_bp.route('/api/attendance/roster', methods=['GET'])
+@role_required("Faculty", "Admin", "SuperAdmin")
+def attendance_roster():
+    date, branch, class_name = _sheet_key(request.args)
+    if not (date and branch and class_name):
+        return jsonify({"error": "branch, class and date (YYYY-MM-DD) are required"}), 400
+
+    sheet = get_sheet(date, branch, class_name)
+    response = jsonify({
+        "date": date.isoformat(),
+        "branch": branch,
+        "class": class_name,
+        "version": sheet.version if sheet else 0,
+        "columns": ROSTER_COLUMNS,
+        "rows": _rows(roster_students(branch, class_name), sheet_records(date, branch, class_name)),
+    })
+    response.add_etag()
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
+
+
+def _conflict(version, date, branch, class_name, changes):
+    """409 with the current version and the server's rows for the students in the request."""
+    records = sheet_records(date, branch, class_name)
+    return jsonify({
+        "error": "version_conflict",
+        "version": version,
+        "columns": ["id", "status", "remarks"],
+        "rows": [[sid, CODE_FOR_STATUS.get(records.get(sid, (None,))[0]), records.get(sid, (None, None))[1]]
+                 for sid in changes],
+    }), 409
+
+
+@faculty_stud_bp.route('/api/attendance', methods=['POST'])
+@role_required("Faculty", "Admin", "SuperAdmin")
+def attendance_sync():
+    data = request.get_json(silent=True) or {}
+    date, branch, class_name = _sheet_key(data)
+    if not (date and branch and class_name):
+        return jsonify({"error": "branch, class and date (YYYY-MM-DD) are required"}), 400
+
+    expected_version = data.get("version")
+    if expected_version is not None and not isinstance(expected_version, int):
+        return jsonify({"error": "version must be an integer"}), 400
+    op_id = data.get("op_id")
+    if op_id is not None and (not isinstance(op_id, str) or len(op_id) > 64):
+        return jsonify({"error": "op_id must be a string of at most 64 characters"}), 400
+
+    changes = {}
+    for change in data.get("changes") or []:
+        if not isinstance(change, list) or len(change) not in (2, 3) or change[1] not in STATUS_CODES:
+            return jsonify({"error": f"Invalid change {change!r}"}), 400
+        remarks = change[2] if len(change) == 3 else None
+        if remarks is not None and not isinstance(remarks, str):
+            return jsonify({"error": f"Invalid remarks for student {change[0]}"}), 400
+        changes[change[0]] = (STATUS_CODES[change[1]], remarks.strip() if remarks is not None else None)
+
+    roster = {student.id for student in roster_students(branch, class_name)}
+    unknown = [sid for sid in changes if sid not in roster]
+    if unknown:
+        return jsonify({"error": "Students not on this roster", "student_ids": unknown}), 400
+
+    try:
+        version, applied = apply_attendance_changes(
+            date, branch, class_name, changes,
+            expected_version=expected_version, op_id=op_id, user_id=current_user.id,
+        )
+    except VersionConflict as e:
+        return _conflict(e.current_version, date, branch, class_name, changes)
+    except OperationalError:
+        # SQLite "database is locked" / busy: same answer as a lost race, so the client re-reads and retries
+        db.session.rollback()
+        sheet = get_sheet(date, branch, class_name)
+        return _conflict(sheet.version if sheet else 0, date, branch, class_name, changes)
+
+    return jsonify({"version": version, "applied": applied})
@@ -1,6 +1,8 @@
 from flask import render_template, request, redirect, url_for, flash
 from faculty_attendance import faculty_stud_bp
-from models import User, Attendance, db
+from flask_login import current_user
+from roster_service import get_roster, roster_options
+from attendance_service import apply_attendance_changes
 from datetime import datetime
 
 
@@ -8,7 +10,7 @@ from datetime import datetime
 @faculty_stud_bp.route('/faculty/attendance', methods=['GET', 'POST'])
 def faculty_attendance():
     # Get all distinct branches where students exist
-    branches = [b[0] for b in db.session.query(User.branch).filter_by(role="Student").distinct().all()]
+    branches = roster_options()[1]
 
     students = []
     selected_branch = None
@@ -20,7 +22,7 @@ def faculty_attendance():
 
         # Fetch students for that branch
         if selected_branch:
-            students = User.query.filter_by(branch=selected_branch, role="Student").all()
+            students = get_roster(branch=selected_branch)
 
     return render_template(
         'faculty_stud.html',
@@ -43,32 +45,16 @@ def save_attendance():
         flash("Invalid date format!", "danger")
         return redirect(url_for("faculty_stud_bp.faculty_attendance"))
 
-    # Fetch students for branch
-    students = User.query.filter_by(branch=selected_branch, role="Student").all()
+    # Fetch students for branch; each year is its own attendance sheet
+    sheets = {}
+    for student_id, _, _, year in get_roster(branch=selected_branch):
+        present = request.form.get(f'attendance_{student_id}') == "on"
+        remark = "" if present else (request.form.get(f'remark_{student_id}') or "").strip()
+        sheets.setdefault(year or "", {})[student_id] = ("Present" if present else "Absent", remark)
 
-    for student in students:
-        checkbox_name = f'attendance_{student.id}'
-        present = request.form.get(checkbox_name) == "on"
+    # Only rows whose status/remark differ are written
+    for year, changes in sheets.items():
+        apply_attendance_changes(selected_date_obj, selected_branch, year, changes, user_id=getattr(current_user, "id", None))
 
-        # Check existing record
-        existing = Attendance.query.filter_by(
-            student_id=student.id,
-            date=selected_date_obj,
-            branch=selected_branch
-        ).first()
-
-        if existing:
-            existing.status = "Present" if present else "Absent"
-        else:
-            attendance = Attendance(
-                student_id=student.id,
-                date=selected_date_obj,
-                branch=selected_branch,
-                class_name=student.year,  # Assuming student.year = class
-                status="Present" if present else "Absent"
-            )
-            db.session.add(attendance)
-
-    db.session.commit()
     flash("✅ Attendance saved successfully!", "success")
     return redirect(url_for("faculty_stud_bp.faculty_attendance", branch=selected_branch, date=selected_date))
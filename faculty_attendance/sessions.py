@@ -0,0 +1,88 @@
+import uuid
+from datetime import datetime
+
+from flask import render_template, request, redirect, url_for, flash, abort
+from flask_login import login_required, current_user
+
+from faculty_attendance import faculty_stud_bp
+from models import FacultyCourse, ClassSession, Course
+from roster_service import get_course_roster
+from attendance_service import (
+    VersionConflict, get_or_create_session, session_records, mark_session, session_summaries,
+)
+
+
+def _own_faculty_course(faculty_course_id):
+    faculty_course = FacultyCourse.query.get_or_404(faculty_course_id)
+    if current_user.role != "Admin" and faculty_course.faculty_id != current_user.id:
+        abort(403)
+    return faculty_course
+
+
+# --------- Course sessions: list assignments + open a session ---------
+@faculty_stud_bp.route('/sessions', methods=['GET', 'POST'])
+@login_required
+def class_sessions():
+    if current_user.role not in ("Faculty", "Admin"):
+        flash("⛔ Access Denied.", "danger")
+        return redirect(url_for("dashboard"))
+
+    if request.method == 'POST':
+        faculty_course = _own_faculty_course(request.form.get('faculty_course_id', type=int))
+        try:
+            date = datetime.strptime(request.form.get('date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            flash("Invalid date format!", "danger")
+            return redirect(url_for("faculty_stud_bp.class_sessions"))
+        slot = (request.form.get('slot') or "1").strip()[:20]
+        session = get_or_create_session(
+            faculty_course, date, slot, topic=(request.form.get('topic') or "").strip() or None,
+            user_id=current_user.id,
+        )
+        return redirect(url_for("faculty_stud_bp.mark_class_session", session_id=session.id))
+
+    assignments = FacultyCourse.query.filter_by(faculty_id=current_user.id).join(Course) \
+        .order_by(Course.course_name).all()
+    sessions = ClassSession.query.filter(
+        ClassSession.faculty_course_id.in_([fc.id for fc in assignments])
+    ).order_by(ClassSession.date.desc(), ClassSession.slot).limit(30).all() if assignments else []
+
+    return render_template(
+        'faculty_sessions.html',
+        assignments=assignments,
+        sessions=sessions,
+        summaries=session_summaries([s.id for s in sessions]),
+        today=datetime.today().strftime('%Y-%m-%d'),
+    )
+
+
+# --------- Mark attendance for one session ---------
+@faculty_stud_bp.route('/sessions/<int:session_id>', methods=['GET', 'POST'])
+@login_required
+def mark_class_session(session_id):
+    session = ClassSession.query.get_or_404(session_id)
+    faculty_course = _own_faculty_course(session.faculty_course_id)
+    students = get_course_roster(faculty_course)
+
+    if request.method == 'POST':
+        changes = {}
+        for s in students:
+            present = request.form.get(f'attendance_{s.id}') == "on"
+            remark = "" if present else (request.form.get(f'remark_{s.id}') or "").strip()
+            changes[s.id] = ("Present" if present else "Absent", remark)
+        try:
+            _, written = mark_session(session, changes, op_id=(request.form.get('op_id') or None))
+        except VersionConflict:
+            flash("⚠️ Someone else is saving this session; please review and save again.", "warning")
+        else:
+            flash(f"✅ Attendance saved ({written} change{'s' if written != 1 else ''}).", "success")
+        return redirect(url_for("faculty_stud_bp.mark_class_session", session_id=session.id))
+
+    return render_template(
+        'faculty_session_mark.html',
+        class_session=session,
+        faculty_course=faculty_course,
+        students=students,
+        records=session_records(session.id),
+        op_id=uuid.uuid4().hex,  # a resubmitted form is applied once
+    )
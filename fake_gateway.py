@@ -0,0 +1,162 @@
+"""
+Local stand-in for a hosted payment gateway, for development and load tests.
+
+    python fake_gateway.py [--port 5055] [--webhook http://127.0.0.1:5000/payments/webhook]
+                           [--secret dev-webhook-secret] [--delay 1.0] [--auto captured|failed]
+
+GET /checkout shows a pay / decline page for a signed order (see
+payment_gateway.FakeGateway.checkout_url). Completing it redirects the browser
+straight back to the college site; the signed webhook event is delivered
+afterwards from a background queue, after --delay seconds, retried with backoff
+until the site accepts it. --auto completes every checkout immediately, which
+is useful when scripting bursts.
+
+Standard library only; it plays the role of an external service, so it does
+not import the app.
+"""
+import argparse
+import hashlib
+import hmac
+import html
+import json
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+SIGNATURE_HEADER = "X-Gateway-Signature"
+MAX_DELIVERY_ATTEMPTS = 8
+
+
+def sign(secret, message):
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+class WebhookSender(threading.Thread):
+    """Delivers events in order of due time; failed deliveries are retried with exponential backoff."""
+
+    def __init__(self, url, secret):
+        super().__init__(daemon=True)
+        self.url, self.secret = url, secret
+        self.queue = queue.PriorityQueue()
+
+    def send(self, event, delay=0.0):
+        self.queue.put((time.monotonic() + delay, event["id"], event, 1))
+
+    def run(self):
+        while True:
+            due, event_id, event, attempt = self.queue.get()
+            wait = due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            body = json.dumps(event).encode()
+            req = urllib.request.Request(self.url, data=body, method="POST", headers={
+                "Content-Type": "application/json", SIGNATURE_HEADER: sign(self.secret, body)})
+            try:
+                with urllib.request.urlopen(req, timeout=10) as res:
+                    print(f"→ {event['type']} {event['order_id']} delivered ({res.status})", flush=True)
+                    continue
+            except (urllib.error.URLError, OSError) as e:
+                error = e
+            if attempt < MAX_DELIVERY_ATTEMPTS:
+                backoff = min(2 ** attempt, 60)
+                print(f"✗ {event['order_id']} attempt {attempt} failed ({error}); retrying in {backoff}s", flush=True)
+                self.queue.put((time.monotonic() + backoff, event_id, event, attempt + 1))
+            else:
+                print(f"✗ {event['order_id']} dropped after {attempt} attempts ({error})", flush=True)
+
+
+def make_handler(args, sender):
+    class Handler(BaseHTTPRequestHandler):
+        def _signed_params(self, query):
+            params = dict(parse_qsl(query))
+            signature = params.pop("signature", "")
+            expected = sign(args.secret, urlencode(params).encode())
+            return params if hmac.compare_digest(signature, expected) else None
+
+        def _send(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+            data = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _complete(self, params, outcome):
+            event = {
+                "id": f"evt_{uuid.uuid4().hex[:20]}",
+                "type": "payment.captured" if outcome == "captured" else "payment.failed",
+                "order_id": params["order_id"],
+                "payment_id": f"pay_{uuid.uuid4().hex[:14]}",
+                "amount": params["amount"],
+                "currency": params.get("currency", "INR"),
+                "created_at": int(time.time()),
+            }
+            sender.send(event, delay=args.delay)
+            self._send(303, "", headers={"Location": params["return_url"]})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/checkout":
+                return self._send(404, "Not found")
+            params = self._signed_params(url.query)
+            if params is None:
+                return self._send(400, "Invalid checkout signature")
+            if args.auto:
+                return self._complete(params, args.auto)
+            hidden = "".join(f'<input type="hidden" name="{html.escape(k)}" value="{html.escape(v)}">'
+                             for k, v in params.items())
+            signature = html.escape(sign(args.secret, urlencode(params).encode()))
+            self._send(200, f"""<!DOCTYPE html><html><head><title>Fake Gateway</title></head>
+<body style="font-family:sans-serif;max-width:420px;margin:80px auto;text-align:center">
+<h2>🏦 Fake Gateway</h2><p>Order <code>{html.escape(params['order_id'])}</code></p>
+<p style="font-size:28px">₹{html.escape(params['amount'])}</p>
+<form method="POST" action="/checkout">{hidden}<input type="hidden" name="signature" value="{signature}">
+<button name="outcome" value="captured" style="padding:12px 24px">Pay</button>
+<button name="outcome" value="failed" style="padding:12px 24px">Decline</button></form></body></html>""")
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/checkout":
+                return self._send(404, "Not found")
+            form = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+            fields = dict(parse_qsl(form))
+            outcome = fields.pop("outcome", "failed")
+            params = self._signed_params(urlencode(fields))
+            if params is None:
+                return self._send(400, "Invalid checkout signature")
+            self._complete(params, outcome)
+
+        def log_message(self, fmt, *log_args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--webhook", default="http://127.0.0.1:5000/payments/webhook")
+    parser.add_argument("--secret", default="dev-webhook-secret")
+    parser.add_argument("--delay", type=float, default=1.0, help="seconds before the webhook is sent")
+    parser.add_argument("--auto", choices=["captured", "failed"], help="complete every checkout immediately")
+    args = parser.parse_args()
+
+    sender = WebhookSender(args.webhook, args.secret)
+    sender.start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args, sender))
+    print(f"Fake gateway on http://{args.host}:{args.port} → webhooks to {args.webhook}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+"""
+Fee defaulter report and reminders.
+
+    flask fees defaulters [--remind] [--dry-run]    # rebuild the report (and send reminders)
+    flask fees remind                               # only send due reminders
+
+A student is a defaulter when their fee (as resolved by fee_resolver: their
+own override, else the most specific cohort rule) has a ``last_date`` in the
+past and their "Paid" FeePayment total is below its amount. Paid totals are
+aggregated in SQL and streamed with the students, and each student's rule is a
+dict lookup in the compiled rules, so payments are never loaded into Python.
+The result is cached in the FeeDefaulter table, which the admin page and the
+CSV / PDF exports read.
+
+Reminders reuse the alert transports (see alerts.py): FEE_REMINDER_TRANSPORT
+falls back to ALERT_TRANSPORT, so in development they land in ALERT_FILE. A
+student is reminded at most once every FEE_REMINDER_COOLDOWN_DAYS. Report runs
+and ``flask fees remind`` take the job through analytics.claim_job, and each
+reminder batch is claimed by stamping ``reminded_at`` with a conditional
+UPDATE before it is sent (and restored on failure), so overlapping runs never
+remind a student twice.
+"""
+import csv
+import datetime
+import io
+import logging
+import time
+from decimal import Decimal
+
+import click
+from flask import Blueprint, Response, current_app, render_template, request, redirect, url_for, flash, send_file, \
+    stream_with_context
+from flask_login import login_required, current_user
+from sqlalchemy import func, insert, update, delete, or_
+
+from alerts import Message, RateLimiter, get_transport
+from analytics import claim_job, release_job
+from extensions import db
+from fee_resolver import resolve_fee, compiled_rules, invalidate_fee_rules
+from models import User, FeePayment, FeeDefaulter, AnalyticsRun, JobLock
+from pdf_render import Block, Text, table_row, render_table
+
+fee_defaulters_bp = Blueprint("fee_defaulters", __name__, cli_group="fees")
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "fee_defaulters"
+STALE_RUN_AFTER = datetime.timedelta(hours=2)
+WRITE_BATCH = 5000
+PAGE_LIMIT = 500
+CENT = Decimal("0.01")
+
+REPORT_TITLE = Block([Text(40, 0, "Fee Defaulters – {stamp}", font=("Helvetica-Bold", 12))], height=25)
+REPORT_ROW, REPORT_HEADER = table_row([
+    ("roll_no", "Roll No", 60), ("name", "Name", 110), ("cohort", "Program/Branch/Year", 100),
+    ("paid", "Paid", 50), ("due", "Due", 50), ("last_date", "Last Date", 55), ("overdue", "Days Overdue", 55),
+], font=("Helvetica", 9), header_font=("Helvetica-Bold", 9), height=14)
+
+# Defaults, overridable through app.config
+DEFAULTS = {
+    "FEE_REMINDER_TRANSPORT": None,     # None = ALERT_TRANSPORT
+    "FEE_REMINDER_COOLDOWN_DAYS": 7,
+    "FEE_REMINDER_BATCH_SIZE": 100,
+    "FEE_REMINDER_RATE_PER_MINUTE": 600,
+}
+
+
+def _config(key):
+    return current_app.config.get(key, DEFAULTS[key])
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(CENT)
+
+
+# ===========================
+# Report query
+# ===========================
+def defaulter_rows(today, college_id=None):
+    """
+    Yields (student_id, college_id, fee_config_id, fee_amount, paid, last_date)
+    for every student whose applicable fee is overdue and not fully paid, in
+    one college if ``college_id`` is given.
+    """
+    # Compile the current rules up front, not mid-stream under the yield_per cursor
+    invalidate_fee_rules()
+    compiled_rules()
+
+    paid = db.session.query(FeePayment.student_id, func.sum(FeePayment.amount).label("total")) \
+        .filter(FeePayment.status == "Paid").group_by(FeePayment.student_id).subquery()
+    students = db.session.query(
+        User.id, User.college_id, User.program, User.branch, User.year, User.section,
+        func.coalesce(paid.c.total, 0).label("paid"),
+    ).outerjoin(paid, paid.c.student_id == User.id).filter(User.role == "Student")
+    if college_id is not None:
+        students = students.filter(User.college_id == college_id)
+    students = students.order_by(User.id).execution_options(yield_per=WRITE_BATCH)
+
+    for student in students:
+        rule = resolve_fee(student)
+        if rule is None or rule.last_date is None or rule.last_date >= today:
+            continue
+        paid_amount = _money(student.paid)
+        if paid_amount < rule.amount:
+            yield student.id, student.college_id, rule.id, rule.amount, paid_amount, rule.last_date
+
+
+def build_report(today=None, dry_run=False, college_id=None):
+    """
+    Rebuild FeeDefaulter from defaulter_rows(). Existing rows are updated in place
+    so their reminder history is kept. With ``college_id`` only that college's
+    rows are rebuilt and cleared. Returns (defaulters, added, cleared).
+    """
+    today = today or datetime.date.today()
+    now = datetime.datetime.utcnow()
+    existing = db.session.query(FeeDefaulter.student_id, FeeDefaulter.id)
+    if college_id is not None:
+        existing = existing.filter(FeeDefaulter.college_id == college_id)
+    existing = dict(existing)
+    seen = set()
+    new_rows, changed_rows = [], []
+    added = 0
+
+    def flush():
+        if new_rows:
+            db.session.execute(insert(FeeDefaulter.__table__), new_rows)
+        if changed_rows:
+            db.session.execute(update(FeeDefaulter), changed_rows)
+        new_rows.clear()
+        changed_rows.clear()
+
+    for student_id, student_college, config_id, amount, paid, last_date in defaulter_rows(today, college_id):
+        seen.add(student_id)
+        fee, paid = _money(amount), _money(paid)
+        row = {
+            "college_id": student_college, "fee_config_id": config_id, "fee_amount": fee, "paid_amount": paid,
+            "amount_due": fee - paid, "last_date": last_date, "days_overdue": (today - last_date).days,
+            "generated_at": now,
+        }
+        if student_id in existing:
+            changed_rows.append({"id": existing[student_id], **row})
+        else:
+            new_rows.append({"student_id": student_id, "reminder_count": 0, **row})
+            added += 1
+        if not dry_run and len(new_rows) + len(changed_rows) >= WRITE_BATCH:
+            flush()
+
+    cleared = [row_id for student_id, row_id in existing.items() if student_id not in seen]
+    if dry_run:
+        db.session.rollback()
+        return len(seen), added, len(cleared)
+
+    flush()
+    for i in range(0, len(cleared), WRITE_BATCH):
+        db.session.execute(delete(FeeDefaulter).where(FeeDefaulter.id.in_(cleared[i:i + WRITE_BATCH])))
+    db.session.commit()
+    return len(seen), added, len(cleared)
+
+
+# ===========================
+# Reminders
+# ===========================
+def _reminder(defaulter, name, email):
+    return Message(
+        [defaulter.id], email, f"Fee payment overdue: ₹{defaulter.amount_due:,.2f} due",
+        f"Dear {name},\n\n"
+        f"Your fee of ₹{defaulter.fee_amount:,.2f} was due on {defaulter.last_date:%d-%m-%Y}. "
+        f"We have received ₹{defaulter.paid_amount:,.2f}, leaving ₹{defaulter.amount_due:,.2f} outstanding "
+        f"({defaulter.days_overdue} day{'s' if defaulter.days_overdue != 1 else ''} overdue).\n\n"
+        "Please pay from the Student Fees page or contact the accounts office.\n",
+    )
+
+
+def _claim_reminders(ids, cutoff, now):
+    """
+    Stamp ``reminded_at`` on the ``ids`` that are still outside the cooldown;
+    returns the set this caller claimed. Commits.
+    """
+    claimed = db.session.execute(
+        update(FeeDefaulter)
+        .where(FeeDefaulter.id.in_(ids),
+               or_(FeeDefaulter.reminded_at.is_(None), FeeDefaulter.reminded_at < cutoff))
+        .values(reminded_at=now)
+        .returning(FeeDefaulter.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.session.commit()
+    return set(claimed)
+
+
+def send_reminders(transport=None, college_id=None):
+    """
+    Remind every defaulter outside the cooldown (in one college if ``college_id``
+    is given), in rate-limited batches. Returns (sent, failed).
+    """
+    transport = transport or get_transport(_config("FEE_REMINDER_TRANSPORT"))
+    batch_size = _config("FEE_REMINDER_BATCH_SIZE")
+    limiter = RateLimiter(_config("FEE_REMINDER_RATE_PER_MINUTE"))
+    batch_size = min(batch_size, limiter.burst)  # a batch is at most one bucket of messages
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=_config("FEE_REMINDER_COOLDOWN_DAYS"))
+    sent = failed = 0
+    last_id = 0
+
+    while True:
+        query = db.session.query(FeeDefaulter, User.name, User.email) \
+            .join(User, User.id == FeeDefaulter.student_id) \
+            .filter(FeeDefaulter.id > last_id,
+                    or_(FeeDefaulter.reminded_at.is_(None), FeeDefaulter.reminded_at < cutoff))
+        if college_id is not None:
+            query = query.filter(FeeDefaulter.college_id == college_id)
+        rows = query.order_by(FeeDefaulter.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1][0].id
+
+        # (id, reminded_at, reminder_count, message), read before the claim commit expires the rows
+        batch = [(d.id, d.reminded_at, d.reminder_count, _reminder(d, name, email)) for d, name, email in rows]
+        claimed = _claim_reminders([row[0] for row in batch], cutoff, datetime.datetime.utcnow())
+        batch = [row for row in batch if row[0] in claimed]
+        if not batch:
+            continue  # another run took the whole batch
+
+        limiter.acquire(len(batch))
+        try:
+            results = transport.send_batch([row[3] for row in batch])
+        except Exception as e:  # leave the batch unreminded; the next run retries it
+            logger.exception("fee reminder transport failed")
+            results = {row[0]: str(e) for row in batch}
+
+        now = datetime.datetime.utcnow()
+        changes = []
+        for defaulter_id, reminded_at, reminder_count, _ in batch:
+            error = results.get(defaulter_id, "no result from transport")
+            if error is None:
+                changes.append({"id": defaulter_id, "reminded_at": now, "reminder_count": reminder_count + 1,
+                                "reminder_error": None})
+                sent += 1
+            else:
+                # Give back the claim so the next run retries this student
+                changes.append({"id": defaulter_id, "reminded_at": reminded_at, "reminder_error": error[:1000]})
+                failed += 1
+        db.session.execute(update(FeeDefaulter), changes)
+        db.session.commit()
+    return sent, failed
+
+
+def _claim_run():
+    """claim_job for the defaulter job; raises RuntimeError if another run holds it."""
+    stamp = claim_job(JOB_NAME, STALE_RUN_AFTER)
+    if stamp is None:
+        lock = db.session.get(JobLock, JOB_NAME)
+        raise RuntimeError(f"Defaulter run {lock.run_id} is still in progress (started {lock.locked_at})")
+    return stamp
+
+
+def run_defaulter_report(remind=False, dry_run=False, college_id=None):
+    """
+    Rebuild the report (and optionally remind), recorded as an AnalyticsRun. The
+    CLI rebuilds every college; the admin page passes its own ``college_id``.
+    """
+    stamp = _claim_run()
+    run = AnalyticsRun(job=JOB_NAME, status="running", started_at=stamp)
+    db.session.add(run)
+    db.session.flush()
+    db.session.query(JobLock).filter_by(job=JOB_NAME, locked_at=stamp).update(
+        {JobLock.run_id: run.id}, synchronize_session=False)
+    db.session.commit()
+
+    started = time.perf_counter()
+    try:
+        defaulters, added, cleared = build_report(dry_run=dry_run, college_id=college_id)
+        sent, failed = send_reminders(college_id=college_id) if remind and not dry_run else (0, 0)
+        run.timings = {"college_id": college_id, "defaulters": defaulters, "added": added, "cleared": cleared,
+                       "reminded": sent, "failed": failed, "dry_run": dry_run}
+        run.status = "success"
+    except Exception as e:
+        db.session.rollback()
+        run.status = "failed"
+        run.error = str(e)
+        raise
+    finally:
+        run.finished_at = datetime.datetime.utcnow()
+        run.duration_ms = int((time.perf_counter() - started) * 1000)
+        db.session.commit()
+        release_job(JOB_NAME, stamp)
+    return run
+
+
+# ===========================
+# CLI: flask fees defaulters / remind
+# ===========================
+@fee_defaulters_bp.cli.command("defaulters")
+@click.option("--remind", is_flag=True, help="Also send reminders to defaulters outside the cooldown.")
+@click.option("--dry-run", is_flag=True, help="Only count defaulters; write nothing.")
+def defaulters_command(remind, dry_run):
+    """Rebuild the fee defaulter report."""
+    try:
+        run = run_defaulter_report(remind=remind, dry_run=dry_run)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    t = run.timings
+    click.echo(f"✅ {t['defaulters']} defaulters ({t['added']} new, {t['cleared']} cleared)"
+               f"{' (dry run)' if dry_run else ''}, {t['reminded']} reminded, {t['failed']} failed "
+               f"in {run.duration_ms} ms")
+
+
+@fee_defaulters_bp.cli.command("remind")
+def remind_command():
+    """Send reminders to defaulters in the current report."""
+    try:
+        stamp = _claim_run()
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    try:
+        sent, failed = send_reminders()
+    finally:
+        db.session.rollback()
+        release_job(JOB_NAME, stamp)
+    click.echo(f"✅ {sent} reminded, {failed} failed")
+
+
+# ===========================
+# Admin report + exports
+# ===========================
+def _report_query(*entities):
+    """The current admin's college's defaulters, narrowed by the program/branch/year query args."""
+    query = db.session.query(*entities).select_from(FeeDefaulter) \
+        .join(User, User.id == FeeDefaulter.student_id) \
+        .filter(FeeDefaulter.college_id == current_user.college_id)
+    for field in ("program", "branch", "year"):
+        value = (request.args.get(field) or "").strip()
+        if value:
+            query = query.filter(func.upper(func.trim(getattr(User, field))) == value.upper())
+    return query
+
+
+def _report_rows():
+    return _report_query(
+        User.roll_no, User.name, User.program, User.branch, User.year, FeeDefaulter.fee_amount,
+        FeeDefaulter.paid_amount, FeeDefaulter.amount_due, FeeDefaulter.last_date, FeeDefaulter.days_overdue,
+        FeeDefaulter.reminded_at, FeeDefaulter.reminder_error,
+    ).order_by(FeeDefaulter.days_overdue.desc(), FeeDefaulter.amount_due.desc(), FeeDefaulter.id)
+
+
+EXPORT_COLUMNS = ["Roll No", "Name", "Program", "Branch", "Year", "Fee", "Paid", "Due", "Last Date",
+                  "Days Overdue", "Last Reminded"]
+
+
+def _export_row(d):
+    return [d.roll_no, d.name, d.program, d.branch, d.year, f"{d.fee_amount:.2f}", f"{d.paid_amount:.2f}",
+            f"{d.amount_due:.2f}", d.last_date.isoformat(), d.days_overdue,
+            d.reminded_at.strftime("%Y-%m-%d") if d.reminded_at else ""]
+
+
+@fee_defaulters_bp.route("/admin/defaulters")
+@login_required
+def admin_defaulters():
+    if current_user.role != "Admin":
+        flash("⛔ Access Denied.", "danger")
+        return redirect(url_for("dashboard"))
+
+    count, total_due = _report_query(func.count(FeeDefaulter.id), func.sum(FeeDefaulter.amount_due)).one()
+    last_run = AnalyticsRun.query.filter_by(job=JOB_NAME, status="success") \
+        .order_by(AnalyticsRun.id.desc()).first()
+    return render_template(
+        "fee_defaulters.html",
+        defaulters=_report_rows().limit(PAGE_LIMIT).all(),
+        count=count,
+        total_due=_money(total_due),
+        last_run=last_run,
+        filters={field: request.args.get(field, "") for field in ("program", "branch", "year")},
+        page_limit=PAGE_LIMIT,
+    )
+
+
+@fee_defaulters_bp.route("/admin/defaulters/refresh", methods=["POST"])
+@login_required
+def refresh_defaulters():
+    if current_user.role != "Admin":
+        flash("⛔ Access Denied.", "danger")
+        return redirect(url_for("dashboard"))
+    if current_user.college_id is None:  # None would rebuild every college
+        flash("⛔ Your account is not linked to a college.", "danger")
+        return redirect(url_for("fee_defaulters.admin_defaulters"))
+
+    try:
+        run = run_defaulter_report(remind=request.form.get("remind") == "on", college_id=current_user.college_id)
+    except RuntimeError as e:
+        flash(str(e), "warning")
+    else:
+        t = run.timings
+        failed = f", {t['failed']} failed" if t["failed"] else ""
+        flash(f"✅ Report rebuilt: {t['defaulters']} defaulters, {t['reminded']} reminded{failed}.", "success")
+    return redirect(url_for("fee_defaulters.admin_defaulters"))
+
+
+@fee_defaulters_bp.route("/admin/defaulters/export/<filetype>")
+@login_required
+def export_defaulters(filetype):
+    if current_user.role != "Admin":
+        flash("⛔ Access Denied.", "danger")
+        return redirect(url_for("dashboard"))
+
+    query = _report_rows().execution_options(yield_per=1000)
+    stamp = datetime.date.today().isoformat()
+
+    if filetype.lower() == "csv":
+        def generate():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            for row in query:
+                writer.writerow(_export_row(row))
+                if buffer.tell() > 64 * 1024:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+
+        return Response(stream_with_context(generate()), mimetype="text/csv",
+                        headers={"Content-Disposition": f"attachment; filename=fee_defaulters_{stamp}.csv"})
+
+    elif filetype.lower() == "pdf":
+        rows = ({"roll_no": d.roll_no or "-", "name": d.name, "cohort": f"{d.program}/{d.branch}/{d.year}",
+                 "paid": f"{d.paid_amount:.2f}", "due": f"{d.amount_due:.2f}", "last_date": d.last_date,
+                 "overdue": d.days_overdue} for d in query)
+        pdf = render_table(REPORT_TITLE, REPORT_ROW, REPORT_HEADER, rows, {"stamp": stamp})
+        return send_file(io.BytesIO(pdf), mimetype="application/pdf", as_attachment=True,
+                         download_name=f"fee_defaulters_{stamp}.pdf")
+
+    flash("Invalid file type!", "danger")
+    return redirect(url_for("fee_defaulters.admin_defaulters"))
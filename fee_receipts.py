@@ -0,0 +1,236 @@
+"""
+Fee receipt rendering, for one student or a whole cohort.
+
+A batch (admin_fee.bulk_receipts) is loaded with one query: every "Paid"
+payment of the filtered students, joined to the student and ordered so it
+groups by student in a single pass. Rendering needs no database access, so a
+ZIP of per-student PDFs is rendered across a process pool in chunks of
+RECEIPT_CHUNK_SIZE students and streamed out as chunks complete. The college
+logo is read once by the parent and decoded once per worker (pool initializer),
+not once per receipt.
+
+A combined PDF is a single reportlab document, which cannot be assembled from
+pages drawn in other processes, so it is rendered in-process; the shared logo
+is embedded once and referenced from every page.
+
+The receipt layout is a set of pdf_render Blocks shared by the admin receipts
+and the student's single-payment receipt (student_fee.download_receipt).
+"""
+import io
+import itertools
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+from extensions import db
+from models import User, FeePayment
+from payment_service import money
+from pdf_render import Block, Document, Image, Text, image, image_from_bytes
+
+# Defaults, overridable through app.config
+DEFAULTS = {
+    "RECEIPT_WORKERS": min(os.cpu_count() or 1, 4),
+    "RECEIPT_CHUNK_SIZE": 50,       # students per pool task
+    "RECEIPT_POOL_MIN": 100,        # smaller batches are rendered in-process
+}
+
+_logo = None  # decoded logo inside pool workers only (see _init_worker)
+
+
+def _config(key):
+    return current_app.config.get(key, DEFAULTS[key])
+
+
+def load_logo(college):
+    """The college logo file's bytes, or None."""
+    if college and college.logo and os.path.exists(college.logo):
+        with open(college.logo, "rb") as f:
+            return f.read()
+    return None
+
+
+def decode_logo(logo_bytes):
+    return image_from_bytes(logo_bytes)
+
+
+# ===========================
+# Layout (see pdf_render)
+# ===========================
+HEADER = Block([
+    Image("logo", x=40, dy=60, width=80, height=60),
+    Text(140, 20, "{college_name}", font=("Helvetica-Bold", 16), when="college_name"),
+    Text(50, 100, "Student Name: {name}"),
+    Text(50, 120, "Roll No: {roll_no}"),
+    Text(50, 140, "Program: {program} | Branch: {branch} | Year: {year}"),
+    Text(50, 160, "Email: {email}"),
+    Text(50, 200, "{title}", font=("Helvetica-Bold", 14)),
+], height=230)
+
+PAYMENT_LINE = Block([
+    Text(60, 0, "Payment ID: {payment_id} | Amount: {amount} | Date: {date}"),
+], height=20)
+
+TOTAL = Block([
+    Text(50, 20, "Total Paid: {total}", font=("Helvetica-Bold", 12)),
+], height=40)
+
+PAYMENT_DETAIL = Block([
+    Text(60, 0, "Payment ID: {payment_id}"),
+    Text(60, 20, "Method: {method}"),
+    Text(60, 40, "Amount: {amount}"),
+    Text(60, 60, "Status: {status}"),
+    Text(60, 80, "Date: {date}"),
+], height=100)
+
+# A payment line never starts below this (y < 80 before the line)
+RECEIPT_BOTTOM = 60
+
+
+def draw_receipt(doc, college_name, logo, student, payments):
+    """
+    One receipt (a page, more for long payment lists). ``student`` is a dict
+    (name, roll_no, program, branch, year, email); ``payments`` a list of
+    (payment_id, amount, created_at).
+    """
+    flow = doc.flow(bottom=RECEIPT_BOTTOM)
+    flow.place(HEADER, {**student, "college_name": college_name, "logo": logo, "title": "Fee Payment Summary"})
+    total = money(0)
+    for payment_id, amount, created_at in payments:
+        amount = money(amount)
+        flow.place(PAYMENT_LINE, {"payment_id": payment_id, "amount": amount,
+                                  "date": created_at.strftime("%Y-%m-%d")})
+        total += amount
+    flow.place(TOTAL, {"total": total})
+    doc.end_page()
+
+
+def render_receipts(college_name, logo, receipts):
+    """PDF bytes with one receipt per (student, payments) pair."""
+    doc = Document()
+    for student, payments in receipts:
+        draw_receipt(doc, college_name, logo, student, payments)
+    return doc.finish()
+
+
+def render_payment_receipt(college, student, payment):
+    """PDF bytes for a single payment, as downloaded by the student."""
+    doc = Document()
+    flow = doc.flow()
+    flow.place(HEADER, {
+        "college_name": college.name if college else None,
+        "logo": image(college.logo) if college else None,
+        "name": student.name, "roll_no": student.roll_no, "program": student.program,
+        "branch": student.branch, "year": student.year, "email": student.email,
+        "title": "Fee Payment Receipt",
+    })
+    flow.place(PAYMENT_DETAIL, {"payment_id": payment.id, "method": payment.payment_method,
+                                "amount": payment.amount, "status": payment.status,
+                                "date": payment.created_at.strftime("%Y-%m-%d")})
+    return doc.finish()
+
+
+# ===========================
+# Batch loading
+# ===========================
+def receipt_batch(college_id, program=None, branch=None, year=None):
+    """
+    Yields (student, payments) for every student of the college with at least
+    one "Paid" payment, from a single query grouped by student.
+    """
+    query = db.session.query(
+        User.id, User.name, User.roll_no, User.program, User.branch, User.year, User.email,
+        FeePayment.payment_id, FeePayment.amount, FeePayment.created_at,
+    ).join(FeePayment, FeePayment.student_id == User.id).filter(
+        User.role == "Student", User.college_id == college_id, FeePayment.status == "Paid",
+    )
+    if program:
+        query = query.filter(User.program == program)
+    if branch:
+        query = query.filter(User.branch == branch)
+    if year:
+        query = query.filter(User.year == year)
+
+    rows = query.order_by(User.roll_no, User.id, FeePayment.created_at, FeePayment.id)
+    for _, group in itertools.groupby(rows, key=lambda row: row.id):
+        group = list(group)
+        first = group[0]
+        student = {"name": first.name, "roll_no": first.roll_no, "program": first.program,
+                   "branch": first.branch, "year": first.year, "email": first.email}
+        yield student, [(row.payment_id, row.amount, row.created_at) for row in group]
+
+
+# ===========================
+# Process pool (ZIP)
+# ===========================
+def _init_worker(logo_bytes):
+    """Pool initializer; never called in the web process, where concurrent downloads would share the global."""
+    global _logo
+    _logo = decode_logo(logo_bytes)
+
+
+def _render_files(college_name, logo, receipts):
+    """[(filename, pdf bytes)] for a chunk of receipts."""
+    return [(f"receipt_{student['roll_no'] or 'student'}.pdf", render_receipts(college_name, logo, [(student, payments)]))
+            for student, payments in receipts]
+
+
+def _render_chunk(college_name, receipts):
+    """Pool task: _render_files with the worker's logo."""
+    return _render_files(college_name, _logo, receipts)
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable sink that hands zipfile output to a generator piece by piece."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def stream_receipt_zip(college_name, logo_bytes, receipts):
+    """
+    Generator of ZIP bytes, one PDF per student. ``receipts`` is a list (load
+    it before streaming, so no query is open when workers fork). Large batches
+    are rendered across a process pool; chunks are written in order as they
+    complete.
+    """
+    chunk_size = _config("RECEIPT_CHUNK_SIZE")
+    chunks = [receipts[i:i + chunk_size] for i in range(0, len(receipts), chunk_size)]
+
+    sink = _ChunkWriter()
+    names = set()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        if len(receipts) < _config("RECEIPT_POOL_MIN"):
+            logo = decode_logo(logo_bytes)
+            results = (_render_files(college_name, logo, chunk) for chunk in chunks)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=min(_config("RECEIPT_WORKERS"), len(chunks)),
+                                       initializer=_init_worker, initargs=(logo_bytes,))
+            results = pool.map(_render_chunk, itertools.repeat(college_name), chunks)
+        try:
+            for rendered in results:
+                for name, data in rendered:
+                    # Roll numbers should be unique, but don't let a duplicate overwrite a receipt
+                    base, n = name, 1
+                    while name in names:
+                        n += 1
+                        name = base.replace(".pdf", f"_{n}.pdf")
+                    names.add(name)
+                    archive.writestr(name, data)
+                yield sink.drain()
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+    yield sink.drain()
@@ -0,0 +1,243 @@
+"""
+Fee resolution: which FeeConfig applies to a student.
+
+Rules are FeeConfig rows keyed on (program, branch, year, section); a NULL
+(or "*" on input) field is a wildcard. For a student the most specific rule
+wins, with earlier fields dominating: a section rule beats a branch + year
+rule, which beats a branch-wide rule, which beats the program-wide default,
+and so on down to an optional global (all-wildcard) default. A row with
+``student_id`` set is a per-student override and beats every rule.
+
+All rules are compiled into in-process dicts, so resolving a student is a dict
+hit: the first student of a cohort probes at most 16 keys and the result is
+memoised per cohort. Writes must call invalidate_fee_rules(); the compiled
+table also expires after FEE_RULES_TTL seconds, which bounds staleness for
+other worker processes.
+
+    flask fee-rules import matrix.csv     # bulk upsert a fee matrix
+    flask fee-rules show                  # print the compiled rules
+"""
+import csv
+import datetime
+import io
+import itertools
+import threading
+import time
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+import click
+from flask import Blueprint
+
+from extensions import db
+from models import FeeConfig
+
+fee_rules_bp = Blueprint("fee_rules", __name__, cli_group="fee-rules")
+
+FEE_RULES_TTL = 60
+CENT = Decimal("0.01")
+WILDCARDS = ("", "*", "ALL", "ANY")
+MATRIX_COLUMNS = ["program", "branch", "year", "section", "amount", "last_date"]
+
+FeeRule = namedtuple("FeeRule", ["id", "amount", "last_date", "program", "branch", "year", "section", "student_id"])
+
+# Which fields each probe keeps, most specific first: (program, branch, year, section)
+# bit weights 8/4/2/1, so e.g. (P, B, *, *) is tried before (P, *, Y, S).
+PROBE_ORDER = sorted(itertools.product((True, False), repeat=4),
+                     key=lambda keep: -sum(w for w, k in zip((8, 4, 2, 1), keep) if k))
+
+_Compiled = namedtuple("_Compiled", ["expires", "rules", "overrides", "resolved"])
+_state = None
+_lock = threading.Lock()
+
+
+def normalize_cohort(program, branch, year, section=None):
+    """The lookup key: upper-cased, stripped, with wildcards as None."""
+    def norm(value):
+        value = str(value).strip().upper() if value is not None else ""
+        return None if value in WILDCARDS else value
+    return norm(program), norm(branch), norm(year), norm(section)
+
+
+def invalidate_fee_rules():
+    """Drop the compiled rules; call after any FeeConfig write."""
+    global _state
+    with _lock:
+        _state = None
+
+
+def _compiled():
+    global _state
+    now = time.monotonic()
+    with _lock:
+        if _state is not None and _state.expires > now:
+            return _state
+
+    rules, overrides = {}, {}
+    rows = db.session.query(
+        FeeConfig.id, FeeConfig.amount, FeeConfig.last_date, FeeConfig.program, FeeConfig.branch,
+        FeeConfig.year, FeeConfig.section, FeeConfig.student_id,
+    ).order_by(FeeConfig.id)
+    for row in rows:
+        rule = FeeRule(row.id, Decimal(str(row.amount)).quantize(CENT), row.last_date,
+                       *normalize_cohort(row.program, row.branch, row.year, row.section), row.student_id)
+        # Ascending ids: a later row for the same key supersedes older duplicates
+        if rule.student_id is not None:
+            overrides[rule.student_id] = rule
+        else:
+            rules[(rule.program, rule.branch, rule.year, rule.section)] = rule
+
+    state = _Compiled(now + FEE_RULES_TTL, rules, overrides, {})
+    with _lock:
+        _state = state
+    return state
+
+
+# ===========================
+# Resolution
+# ===========================
+def resolve_fee(student):
+    """
+    The FeeRule for ``student`` (anything with id / program / branch / year /
+    section attributes, e.g. a User or a column Row), or None.
+    """
+    table = _compiled()
+    override = table.overrides.get(student.id)
+    if override is not None:
+        return override
+
+    key = normalize_cohort(student.program, student.branch, student.year, getattr(student, "section", None))
+    try:
+        return table.resolved[key]
+    except KeyError:
+        pass
+    rule = table.resolved[key] = match_rule(table.rules, key)
+    return rule
+
+
+def match_rule(rules, key):
+    """The most specific of ``rules`` (as from compiled_rules) for a normalized cohort ``key``, or None."""
+    for keep in PROBE_ORDER:
+        rule = rules.get(tuple(v if k else None for v, k in zip(key, keep)))
+        if rule is not None:
+            return rule
+    return None
+
+
+def compiled_rules():
+    """(cohort rules, per-student overrides) as currently compiled, for display."""
+    table = _compiled()
+    return dict(table.rules), dict(table.overrides)
+
+
+# ===========================
+# Writes
+# ===========================
+def upsert_rule(program, branch, year, section, amount, last_date, existing=None):
+    """
+    Create or update the one cohort rule for this key; does not commit.
+    ``existing`` may be a preloaded {key: FeeConfig} map (bulk imports).
+    Returns (FeeConfig, created).
+    """
+    key = normalize_cohort(program, branch, year, section)
+    if existing is not None:
+        config = existing.get(key)
+    else:
+        config = FeeConfig.query.filter(
+            FeeConfig.student_id.is_(None),
+            *[(column.is_(None) if value is None else column == value)
+              for column, value in zip((FeeConfig.program, FeeConfig.branch, FeeConfig.year, FeeConfig.section), key)]
+        ).order_by(FeeConfig.id.desc()).first()
+
+    created = config is None
+    if created:
+        config = FeeConfig(program=key[0], branch=key[1], year=key[2], section=key[3])
+        db.session.add(config)
+        if existing is not None:
+            existing[key] = config
+    config.amount = amount
+    config.last_date = last_date
+    config.updated_at = datetime.datetime.utcnow()
+    return config, created
+
+
+def import_fee_matrix(text):
+    """
+    Upsert every row of a fee matrix CSV (columns MATRIX_COLUMNS; blank or "*"
+    is a wildcard, last_date is YYYY-MM-DD or blank). All-or-nothing: any bad row
+    rejects the file. Commits on success. Returns a stats dict.
+    """
+    stats = {"rows": 0, "created": 0, "updated": 0, "errors": []}
+    reader = csv.reader(io.StringIO(text))
+    header = [h.strip().lower() for h in next(reader, [])]
+    missing = {"program", "amount"} - set(header)
+    if missing:
+        stats["errors"].append(f"missing column(s): {', '.join(sorted(missing))}")
+        return stats
+    col = {name: header.index(name) for name in MATRIX_COLUMNS if name in header}
+
+    existing = {}
+    for config in FeeConfig.query.filter(FeeConfig.student_id.is_(None)).order_by(FeeConfig.id):
+        existing[normalize_cohort(config.program, config.branch, config.year, config.section)] = config
+
+    seen = {}
+    for line_no, values in enumerate(reader, start=2):
+        if not any(v.strip() for v in values):
+            continue
+        stats["rows"] += 1
+        field = {name: (values[i].strip() if i < len(values) else "") for name, i in col.items()}
+        try:
+            amount = Decimal(field["amount"]).quantize(CENT)
+            if amount < 0:
+                raise InvalidOperation
+        except InvalidOperation:
+            stats["errors"].append(f"line {line_no}: invalid amount {field['amount']!r}")
+            continue
+        try:
+            last_date = datetime.datetime.strptime(field["last_date"], "%Y-%m-%d").date() \
+                if field.get("last_date") else None
+        except ValueError:
+            stats["errors"].append(f"line {line_no}: invalid last_date {field['last_date']!r}")
+            continue
+
+        key = normalize_cohort(field.get("program"), field.get("branch"), field.get("year"), field.get("section"))
+        if key in seen:
+            stats["errors"].append(f"line {line_no}: duplicates line {seen[key]}")
+            continue
+        seen[key] = line_no
+        _, created = upsert_rule(*key, amount, last_date, existing=existing)
+        stats["created" if created else "updated"] += 1
+
+    if stats["errors"]:
+        db.session.rollback()
+        stats["created"] = stats["updated"] = 0
+        return stats
+    db.session.commit()
+    invalidate_fee_rules()
+    return stats
+
+
+# ===========================
+# CLI: flask fee-rules import / show
+# ===========================
+@fee_rules_bp.cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def import_command(path):
+    """Bulk upsert fee rules from a CSV fee matrix."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        stats = import_fee_matrix(f.read())
+    if stats["errors"]:
+        for error in stats["errors"][:20]:
+            click.echo(f"  ✗ {error}", err=True)
+        raise click.ClickException(f"{len(stats['errors'])} error(s); nothing imported")
+    click.echo(f"✅ {stats['rows']} rows: {stats['created']} created, {stats['updated']} updated")
+
+
+@fee_rules_bp.cli.command("show")
+def show_command():
+    """Print the compiled fee rules, most specific first."""
+    rules, overrides = compiled_rules()
+    for key, rule in sorted(rules.items(), key=lambda kv: [v is None for v in kv[0]] + [str(kv[0])]):
+        label = " / ".join(v or "*" for v in key)
+        click.echo(f"{label:<40} ₹{rule.amount:>12,.2f}  due {rule.last_date or '-'}  (#{rule.id})")
+    click.echo(f"{len(rules)} cohort rules, {len(overrides)} student overrides")
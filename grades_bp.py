@@ -2,6 +2,8 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from models import User, Result, Course, db  # Correct imports
 from sqlalchemy import distinct
+from roster_service import get_roster
+from course_catalog import invalidate_catalog
 
 grades_bp = Blueprint("grades_bp", __name__, template_folder="templates")
 
@@ -84,6 +86,7 @@ def faculty_upload_grades():
             course = Course(course_name=course_name, course_code=course_code)
             db.session.add(course)
             db.session.commit() # Commit here to generate the new course.id
+            invalidate_catalog()
 
         # Step 3: Now, create the Result object using the correct 'course_id'
         result = Result(
@@ -100,7 +103,7 @@ def faculty_upload_grades():
         flash("✅ Result uploaded successfully (pending admin approval)", "success")
         return redirect(url_for("grades_bp.faculty_upload_grades"))
 
-    students = User.query.filter_by(role="Student").all()
+    students = get_roster()
     return render_template("faculty_grades_upload.html", students=students)
 
 
@@ -0,0 +1,217 @@
+import bisect
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import Blueprint, Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # optional: fall back to cProfile
+    Profiler = None
+
+logger = logging.getLogger("instrumentation")
+
+metrics_bp = Blueprint("metrics_bp", __name__)
+
+# Defaults, overridable through app.config
+DEFAULTS = {
+    "N_PLUS_ONE_THRESHOLD": 10,      # identical statements per request before warning
+    "SLOW_QUERY_MS": 200,            # log statements slower than this
+    "SLOW_REQUEST_MS": 1000,         # log requests slower than this
+    "PROFILE_SAMPLE_RATE": 0.0,      # fraction of requests to profile (0 = off)
+    "PROFILE_DIR": "profiles",
+    "METRICS_TOKEN": None,           # if set, /metrics requires "Authorization: Bearer <token>"
+}
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"IN \((?:\?|%s|:\w+|__\[POSTCOMPILE_\w+\])(?:, ?(?:\?|%s|:\w+))*\)", re.IGNORECASE)
+
+
+def fingerprint(statement):
+    """Collapse literals and IN-lists so statements that differ only by values group together."""
+    statement = _IN_LISTS.sub("IN (?)", statement)
+    return " ".join(_LITERALS.sub("?", statement).split())
+
+
+# ===========================
+# Metrics Registry
+# ===========================
+class MetricsRegistry:
+    """Thread-safe in-process counters and histograms rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()                 # (endpoint, method, status) -> count
+        self.duration_buckets = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1))
+        self.duration_sum = Counter()             # (endpoint, method) -> seconds
+        self.duration_count = Counter()
+        self.queries = Counter()                  # endpoint -> statements executed
+        self.query_seconds = Counter()            # endpoint -> seconds in the database
+        self.slow_queries = Counter()             # endpoint -> statements over SLOW_QUERY_MS
+        self.n_plus_one = Counter()               # endpoint -> requests flagged as N+1
+        self.profiles = 0
+
+    def observe_request(self, endpoint, method, status, seconds, query_count, query_seconds, slow, n_plus_one):
+        key = (endpoint, method)
+        with self._lock:
+            self.requests[(endpoint, method, str(status))] += 1
+            self.duration_buckets[key][bisect.bisect_left(DURATION_BUCKETS, seconds)] += 1
+            self.duration_sum[key] += seconds
+            self.duration_count[key] += 1
+            self.queries[endpoint] += query_count
+            self.query_seconds[endpoint] += query_seconds
+            self.slow_queries[endpoint] += slow
+            if n_plus_one:
+                self.n_plus_one[endpoint] += 1
+
+    def render(self):
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            metric("erp_http_requests_total", "counter", "HTTP requests by endpoint, method and status.")
+            for (endpoint, method, status), n in sorted(self.requests.items()):
+                lines.append(f'erp_http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {n}')
+
+            metric("erp_http_request_duration_seconds", "histogram", "Request latency in seconds.")
+            for (endpoint, method), counts in sorted(self.duration_buckets.items()):
+                labels = f'endpoint="{endpoint}",method="{method}"'
+                cumulative = 0
+                for bound, n in zip(DURATION_BUCKETS, counts):
+                    cumulative += n
+                    lines.append(f'erp_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'erp_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative + counts[-1]}')
+                lines.append(f"erp_http_request_duration_seconds_sum{{{labels}}} {self.duration_sum[(endpoint, method)]:.6f}")
+                lines.append(f"erp_http_request_duration_seconds_count{{{labels}}} {self.duration_count[(endpoint, method)]}")
+
+            for name, kind, help_text, values, fmt in [
+                ("erp_db_queries_total", "counter", "SQL statements executed while serving requests.", self.queries, "{}"),
+                ("erp_db_query_seconds_total", "counter", "Time spent in SQL statements while serving requests.", self.query_seconds, "{:.6f}"),
+                ("erp_db_slow_queries_total", "counter", "SQL statements slower than SLOW_QUERY_MS.", self.slow_queries, "{}"),
+                ("erp_n_plus_one_requests_total", "counter", "Requests that repeated one statement more than N_PLUS_ONE_THRESHOLD times.", self.n_plus_one, "{}"),
+            ]:
+                metric(name, kind, help_text)
+                for endpoint, value in sorted(values.items()):
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} ' + fmt.format(value))
+
+            metric("erp_profiles_written_total", "counter", "Sampled request profiles written to PROFILE_DIR.")
+            lines.append(f"erp_profiles_written_total {self.profiles}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# ===========================
+# SQLAlchemy Cursor Hooks
+# ===========================
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start"].pop()
+    if not has_request_context() or "perf" not in g:
+        return
+    elapsed = time.perf_counter() - started
+    perf = g.perf
+    perf["queries"] += 1
+    perf["query_seconds"] += elapsed
+    perf["statements"][fingerprint(statement)] += 1
+    if elapsed * 1000 >= current_app.config["SLOW_QUERY_MS"]:
+        perf["slow"] += 1
+        logger.warning("slow query %.1f ms on %s: %s", elapsed * 1000, request.endpoint, statement)
+
+
+# ===========================
+# Request Hooks
+# ===========================
+def _before_request():
+    g.perf = {"start": time.perf_counter(), "queries": 0, "query_seconds": 0.0, "slow": 0, "statements": Counter()}
+    rate = current_app.config["PROFILE_SAMPLE_RATE"]
+    if rate and random.random() < rate:
+        if Profiler is not None:
+            g.profiler = Profiler()
+            g.profiler.start()
+        else:
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+
+def _write_profile(profiler, endpoint):
+    directory = current_app.config["PROFILE_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.join(directory, f"{endpoint}_{int(time.time() * 1000)}")
+    if Profiler is not None and isinstance(profiler, Profiler):
+        profiler.stop()
+        with open(stem + ".html", "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+    else:
+        profiler.disable()
+        profiler.dump_stats(stem + ".prof")
+    registry.profiles += 1
+
+
+def _after_request(response):
+    perf = g.pop("perf", None)
+    if perf is None:
+        return response
+
+    endpoint = request.endpoint or "unknown"
+    elapsed = time.perf_counter() - perf["start"]
+    config = current_app.config
+
+    repeated = [(stmt, n) for stmt, n in perf["statements"].items() if n > config["N_PLUS_ONE_THRESHOLD"]]
+    for stmt, n in repeated:
+        logger.warning("possible N+1 on %s: %d x %s", endpoint, n, stmt)
+
+    if elapsed * 1000 >= config["SLOW_REQUEST_MS"]:
+        logger.warning("slow request %s %s %.1f ms (%d queries, %.1f ms in db)",
+                       request.method, request.path, elapsed * 1000, perf["queries"], perf["query_seconds"] * 1000)
+
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        _write_profile(profiler, endpoint)
+
+    if endpoint != "static":
+        registry.observe_request(endpoint, request.method, response.status_code, elapsed,
+                                 perf["queries"], perf["query_seconds"], perf["slow"], bool(repeated))
+
+    response.headers["Server-Timing"] = (
+        f'app;dur={elapsed * 1000:.1f}, db;dur={perf["query_seconds"] * 1000:.1f};desc="{perf["queries"]} queries"'
+    )
+    return response
+
+
+def init_instrumentation(app):
+    """Attach timing/query hooks to ``app``; the /metrics route lives on metrics_bp."""
+    for key, value in DEFAULTS.items():
+        app.config.setdefault(key, value)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+
+# ===========================
+# Prometheus Endpoint
+# ===========================
+@metrics_bp.route("/metrics")
+def metrics():
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
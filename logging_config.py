@@ -0,0 +1,153 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+# Defaults, overridable through app.config
+DEFAULTS = {
+    "LOG_FILE": "app.log",
+    "LOG_LEVEL": "INFO",
+    "LOG_MAX_BYTES": 10 * 1024 * 1024,  # size-based rotation...
+    "LOG_BACKUP_COUNT": 5,
+    "LOG_ROTATE_WHEN": None,            # ...or time-based, e.g. "midnight"
+    "LOG_CONSOLE": True,
+}
+
+# Extra attributes copied from a LogRecord into the JSON line when present
+CONTEXT_FIELDS = ("request_id", "user_id", "route", "method", "path", "status", "duration_ms")
+
+_ANSI = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+
+def strip_ansi(text):
+    return _ANSI.sub("", text)
+
+
+# ===========================
+# Formatting / Filtering
+# ===========================
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Runs in the calling thread (before the record is queued), so request
+    details are captured while the request context is still available.
+    """
+
+    def filter(self, record):
+        record.msg = strip_ansi(str(record.msg))
+        if record.args:
+            record.args = tuple(strip_ansi(a) if isinstance(a, str) else a for a in record.args)
+        if has_request_context():
+            if getattr(record, "request_id", None) is None:
+                record.request_id = g.get("request_id")
+            if getattr(record, "route", None) is None:
+                record.route = request.endpoint
+            # Only use a user Flask-Login has already loaded; never trigger a DB lookup from logging
+            user = g.get("_login_user")
+            if getattr(record, "user_id", None) is None and user is not None and user.is_authenticated:
+                record.user_id = user.id
+        return True
+
+
+# ===========================
+# Request Hooks
+# ===========================
+access_logger = logging.getLogger("access")
+
+
+def _before_request():
+    g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    g.log_start = time.perf_counter()
+
+
+def _after_request(response):
+    started = g.get("log_start")
+    if started is None or request.endpoint == "static":
+        return response
+    duration_ms = round((time.perf_counter() - started) * 1000, 2)
+    access_logger.info(
+        "%s %s %s", request.method, request.path, response.status_code,
+        extra={"method": request.method, "path": request.path,
+               "status": response.status_code, "duration_ms": duration_ms},
+    )
+    response.headers["X-Request-ID"] = g.request_id
+    return response
+
+
+# ===========================
+# Setup
+# ===========================
+def _file_handler(config):
+    if config["LOG_ROTATE_WHEN"]:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            config["LOG_FILE"], when=config["LOG_ROTATE_WHEN"],
+            backupCount=config["LOG_BACKUP_COUNT"], encoding="utf-8", utc=True,
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            config["LOG_FILE"], maxBytes=config["LOG_MAX_BYTES"],
+            backupCount=config["LOG_BACKUP_COUNT"], encoding="utf-8",
+        )
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def init_logging(app):
+    """
+    Route all logging through a QueueHandler; a QueueListener thread does the
+    formatting and disk I/O so request threads never block on the log file.
+    """
+    for key, value in DEFAULTS.items():
+        app.config.setdefault(key, value)
+    if app.extensions.get("log_listener"):
+        return app.extensions["log_listener"]
+
+    handlers = [_file_handler(app.config)]
+    if app.config["LOG_CONSOLE"]:
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        handlers.append(console)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.setLevel(app.config["LOG_LEVEL"])
+    root.addHandler(queue_handler)
+    # Access lines now come from the "access" logger with durations attached
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.extensions["log_listener"] = listener
+    return listener
@@ -31,11 +31,16 @@ else:
         poolclass=pool.NullPool,
     )
 
+def include_object(obj, name, type_, reflected, compare_to):
+    # student_search (FTS5) and its shadow tables are managed by student_search.py
+    return not (type_ == "table" and reflected and name.startswith("student_search"))
+
 def run_migrations_offline():
     url = str(engine.url)
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -47,6 +52,7 @@ def run_migrations_online():
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
+            include_object=include_object,
         )
         with context.begin_transaction():
             context.run_migrations()
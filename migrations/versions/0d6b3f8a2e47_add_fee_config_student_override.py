@@ -0,0 +1,30 @@
+"""Add student_id to fee_configs for per-student fee overrides
+
+Revision ID: 0d6b3f8a2e47
+Revises: f2a9c6e1b375
+Create Date: 2026-10-19 18:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0d6b3f8a2e47'
+down_revision = 'f2a9c6e1b375'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('fee_configs') as batch_op:
+        batch_op.add_column(sa.Column('student_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_fee_configs_student_id', 'users', ['student_id'], ['id'])
+        batch_op.create_index('ix_fee_configs_student_id', ['student_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('fee_configs') as batch_op:
+        batch_op.drop_index('ix_fee_configs_student_id')
+        batch_op.drop_constraint('fk_fee_configs_student_id', type_='foreignkey')
+        batch_op.drop_column('student_id')
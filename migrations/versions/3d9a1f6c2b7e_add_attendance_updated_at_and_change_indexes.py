@@ -0,0 +1,32 @@
+"""Add attendance.updated_at and updated_at indexes for incremental analytics
+
+Revision ID: 3d9a1f6c2b7e
+Revises: ef3de76ac8f7
+Create Date: 2026-10-19 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d9a1f6c2b7e'
+down_revision = 'ef3de76ac8f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('attendance', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_attendance_date', 'attendance', ['date'])
+    op.create_index('ix_attendance_updated_at', 'attendance', ['updated_at'])
+    op.create_index('ix_fee_payments_updated_at', 'fee_payments', ['updated_at'])
+    op.create_index('ix_results_updated_at', 'results', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_results_updated_at', table_name='results')
+    op.drop_index('ix_fee_payments_updated_at', table_name='fee_payments')
+    op.drop_index('ix_attendance_updated_at', table_name='attendance')
+    op.drop_index('ix_attendance_date', table_name='attendance')
+    op.drop_column('attendance', 'updated_at')
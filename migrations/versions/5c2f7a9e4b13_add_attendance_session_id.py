@@ -0,0 +1,35 @@
+"""Add attendance.session_id and course/session attendance + enrollment indexes
+
+Revision ID: 5c2f7a9e4b13
+Revises: 8b4e2c7d1a90
+Create Date: 2026-10-19 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2f7a9e4b13'
+down_revision = '8b4e2c7d1a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # class_sessions itself is created by db.create_all(); SQLite needs batch mode for the FK
+    with op.batch_alter_table('attendance') as batch_op:
+        batch_op.add_column(sa.Column('session_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_attendance_session_id', 'class_sessions', ['session_id'], ['id'])
+        batch_op.create_index('ix_attendance_session', ['session_id'])
+        batch_op.create_index('ix_attendance_student_course', ['student_id', 'course_id'])
+    op.create_index('ix_student_courses_course', 'student_courses', ['course_id', 'branch', 'year'])
+
+
+def downgrade():
+    op.drop_index('ix_student_courses_course', table_name='student_courses')
+    with op.batch_alter_table('attendance') as batch_op:
+        batch_op.drop_index('ix_attendance_student_course')
+        batch_op.drop_index('ix_attendance_session')
+        batch_op.drop_constraint('fk_attendance_session_id', type_='foreignkey')
+        batch_op.drop_column('session_id')
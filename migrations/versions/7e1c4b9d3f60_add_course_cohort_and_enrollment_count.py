@@ -0,0 +1,41 @@
+"""Add cohort columns and enrollment_count to courses
+
+Revision ID: 7e1c4b9d3f60
+Revises: 0d6b3f8a2e47
+Create Date: 2026-10-19 21:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e1c4b9d3f60'
+down_revision = '0d6b3f8a2e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('courses') as batch_op:
+        batch_op.add_column(sa.Column('program', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('branch', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('year', sa.String(length=10), nullable=True))
+        batch_op.add_column(sa.Column('semester', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('enrollment_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_index('ix_courses_cohort', ['program', 'branch', 'year', 'semester'])
+
+    op.execute(
+        "UPDATE courses SET enrollment_count = "
+        "(SELECT COUNT(*) FROM student_courses WHERE student_courses.course_id = courses.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('courses') as batch_op:
+        batch_op.drop_index('ix_courses_cohort')
+        batch_op.drop_column('enrollment_count')
+        batch_op.drop_column('semester')
+        batch_op.drop_column('year')
+        batch_op.drop_column('branch')
+        batch_op.drop_column('program')
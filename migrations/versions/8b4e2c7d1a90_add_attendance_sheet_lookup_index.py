@@ -0,0 +1,24 @@
+"""Add composite (date, branch, class_name) index on attendance
+
+Revision ID: 8b4e2c7d1a90
+Revises: 3d9a1f6c2b7e
+Create Date: 2026-10-19 10:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4e2c7d1a90'
+down_revision = '3d9a1f6c2b7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_attendance_sheet_lookup', 'attendance', ['date', 'branch', 'class_name'])
+
+
+def downgrade():
+    op.drop_index('ix_attendance_sheet_lookup', table_name='attendance')
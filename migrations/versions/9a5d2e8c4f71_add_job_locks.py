@@ -0,0 +1,33 @@
+"""Add job_locks for atomic batch-job claims
+
+Revision ID: 9a5d2e8c4f71
+Revises: 7e1c4b9d3f60
+Create Date: 2026-10-20 10:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a5d2e8c4f71'
+down_revision = '7e1c4b9d3f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # app.py runs db.create_all() before alembic, so the table may already exist
+    if sa.inspect(op.get_bind()).has_table('job_locks'):
+        return
+    op.create_table(
+        'job_locks',
+        sa.Column('job', sa.String(length=50), nullable=False),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('run_id', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('job'),
+    )
+
+
+def downgrade():
+    op.drop_table('job_locks')
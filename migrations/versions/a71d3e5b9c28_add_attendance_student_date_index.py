@@ -0,0 +1,24 @@
+"""Add (student_id, date) index on attendance for keyset-paginated history
+
+Revision ID: a71d3e5b9c28
+Revises: 5c2f7a9e4b13
+Create Date: 2026-10-19 14:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a71d3e5b9c28'
+down_revision = '5c2f7a9e4b13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_attendance_student_date', 'attendance', ['student_id', 'date'])
+
+
+def downgrade():
+    op.drop_index('ix_attendance_student_date', table_name='attendance')
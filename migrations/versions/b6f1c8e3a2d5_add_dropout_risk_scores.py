@@ -0,0 +1,47 @@
+"""Add dropout_risk_scores
+
+Revision ID: b6f1c8e3a2d5
+Revises: 9a5d2e8c4f71
+Create Date: 2026-10-20 11:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6f1c8e3a2d5'
+down_revision = '9a5d2e8c4f71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # app.py runs db.create_all() before alembic, so the table may already exist
+    if sa.inspect(op.get_bind()).has_table('dropout_risk_scores'):
+        return
+    op.create_table(
+        'dropout_risk_scores',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('college_id', sa.Integer(), nullable=True),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('risk_level', sa.String(length=10), nullable=False),
+        sa.Column('attendance_rate', sa.Float(), nullable=True),
+        sa.Column('attendance_trend', sa.Float(), nullable=True),
+        sa.Column('marks_avg', sa.Float(), nullable=True),
+        sa.Column('marks_trend', sa.Float(), nullable=True),
+        sa.Column('outstanding_dues', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('days_since_payment', sa.Integer(), nullable=True),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['college_id'], ['colleges.id']),
+        sa.ForeignKeyConstraint(['student_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('student_id'),
+    )
+    op.create_index('ix_dropout_risk_college_score', 'dropout_risk_scores', ['college_id', 'score'])
+
+
+def downgrade():
+    op.drop_index('ix_dropout_risk_college_score', table_name='dropout_risk_scores')
+    op.drop_table('dropout_risk_scores')
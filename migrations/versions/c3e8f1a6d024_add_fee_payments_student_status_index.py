@@ -0,0 +1,24 @@
+"""Add (student_id, status) index on fee_payments for paid-total aggregation
+
+Revision ID: c3e8f1a6d024
+Revises: a71d3e5b9c28
+Create Date: 2026-10-19 15:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8f1a6d024'
+down_revision = 'a71d3e5b9c28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_fee_payments_student_status', 'fee_payments', ['student_id', 'status'])
+
+
+def downgrade():
+    op.drop_index('ix_fee_payments_student_status', table_name='fee_payments')
@@ -0,0 +1,41 @@
+"""Add class_sessions.version / last_op_id and one attendance row per session student
+
+Revision ID: d8a4f2b6c1e9
+Revises: b6f1c8e3a2d5
+Create Date: 2026-10-20 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a4f2b6c1e9'
+down_revision = 'b6f1c8e3a2d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # app.py runs db.create_all() before alembic, so a fresh database already has these
+    inspector = sa.inspect(op.get_bind())
+    columns = {c['name'] for c in inspector.get_columns('class_sessions')}
+    if 'version' not in columns:
+        with op.batch_alter_table('class_sessions') as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='0'))
+            batch_op.add_column(sa.Column('last_op_id', sa.String(length=64), nullable=True))
+
+    if 'uq_attendance_session_student' not in {i['name'] for i in inspector.get_indexes('attendance')}:
+        # Keep the newest row of any (session, student) pair that concurrent saves duplicated
+        op.execute(
+            "DELETE FROM attendance WHERE session_id IS NOT NULL AND id NOT IN "
+            "(SELECT MAX(id) FROM attendance WHERE session_id IS NOT NULL GROUP BY session_id, student_id)"
+        )
+        op.create_index('uq_attendance_session_student', 'attendance', ['session_id', 'student_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_attendance_session_student', table_name='attendance')
+    with op.batch_alter_table('class_sessions') as batch_op:
+        batch_op.drop_column('last_op_id')
+        batch_op.drop_column('version')
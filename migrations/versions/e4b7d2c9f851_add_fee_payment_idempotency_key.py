@@ -0,0 +1,28 @@
+"""Add idempotency_key to fee_payments
+
+Revision ID: e4b7d2c9f851
+Revises: c3e8f1a6d024
+Create Date: 2026-10-19 16:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7d2c9f851'
+down_revision = 'c3e8f1a6d024'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('fee_payments') as batch_op:
+        batch_op.add_column(sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+        batch_op.create_index('uq_fee_payments_idempotency', ['student_id', 'idempotency_key'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('fee_payments') as batch_op:
+        batch_op.drop_index('uq_fee_payments_idempotency')
+        batch_op.drop_column('idempotency_key')
@@ -0,0 +1,24 @@
+"""Add razorpay_order_id index on fee_payments for webhook reconciliation
+
+Revision ID: f2a9c6e1b375
+Revises: e4b7d2c9f851
+Create Date: 2026-10-19 17:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a9c6e1b375'
+down_revision = 'e4b7d2c9f851'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_fee_payments_order', 'fee_payments', ['razorpay_order_id'])
+
+
+def downgrade():
+    op.drop_index('ix_fee_payments_order', table_name='fee_payments')
@@ -30,10 +30,21 @@ class College(db.Model):
         return f"<College id={self.id} name={self.name}>"
 
 class Course(db.Model):
+    """
+    A course in the catalog. program / branch / year / semester scope it to a
+    cohort; a NULL column means "any". ``enrollment_count`` is the number of
+    StudentCourse rows, maintained on insert/delete by course_catalog.
+    """
     __tablename__ = "courses"
+    __table_args__ = (db.Index("ix_courses_cohort", "program", "branch", "year", "semester"),)
     id = db.Column(db.Integer, primary_key=True)
     course_name = db.Column(db.String(150), nullable=False, unique=True)
     course_code = db.Column(db.String(50), nullable=False, unique=True)
+    program = db.Column(db.String(100), nullable=True)
+    branch = db.Column(db.String(100), nullable=True)
+    year = db.Column(db.String(10), nullable=True)
+    semester = db.Column(db.String(20), nullable=True)
+    enrollment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
@@ -174,7 +185,10 @@ class User(UserMixin, db.Model):
 # ===========================
 class Result(db.Model):
     __tablename__ = "results"
-    __table_args__ = (db.Index("ix_results_student_semester", "student_id", "semester"),)
+    __table_args__ = (
+        db.Index("ix_results_student_semester", "student_id", "semester"),
+        db.Index("ix_results_updated_at", "updated_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -194,24 +208,88 @@ class Result(db.Model):
 
 class Attendance(db.Model):
     __tablename__ = "attendance"
+    __table_args__ = (
+        db.Index("ix_attendance_date", "date"),
+        db.Index("ix_attendance_updated_at", "updated_at"),
+        db.Index("ix_attendance_sheet_lookup", "date", "branch", "class_name"),
+        db.Index("ix_attendance_session", "session_id"),
+        # One row per student per class session (NULL session_ids, i.e. day sheets, never collide)
+        db.Index("uq_attendance_session_student", "session_id", "student_id", unique=True),
+        db.Index("ix_attendance_student_course", "student_id", "course_id"),
+        db.Index("ix_attendance_student_date", "student_id", "date"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     course_id = db.Column(db.Integer, db.ForeignKey("courses.id"), nullable=True)
+    session_id = db.Column(db.Integer, db.ForeignKey("class_sessions.id"), nullable=True)  # set for course-session attendance
     branch = db.Column(db.String(50), nullable=False)
     class_name = db.Column(db.String(50), nullable=False)
     date = db.Column(db.Date, nullable=False)
     status = db.Column(db.String(10), nullable=False)
     remarks = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
 
     student = db.relationship("User", back_populates="attendance_records")
     course = db.relationship("Course", back_populates="attendance_records")
+    session = db.relationship("ClassSession", back_populates="attendance_records")
 
     def __repr__(self):
         return f"<Attendance student={self.student_id} course={self.course_id} date={self.date} status={self.status}>"
 
+class AttendanceSheet(db.Model):
+    """
+    One row per (date, branch, class) roster. ``version`` is bumped on every
+    save and used as the optimistic-concurrency token by the attendance API.
+    """
+    __tablename__ = "attendance_sheets"
+    __table_args__ = (db.UniqueConstraint("date", "branch", "class_name", name="uq_attendance_sheet"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False)
+    branch = db.Column(db.String(50), nullable=False)
+    class_name = db.Column(db.String(50), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    last_op_id = db.Column(db.String(64))
+    updated_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<AttendanceSheet {self.date} {self.branch}/{self.class_name} v{self.version}>"
+
+class AttendanceBitmap(db.Model):
+    """
+    Compact attendance history for one (student, course, term): bit ``n`` of
+    ``marked``/``present`` is day ``n`` after ``term_start`` (little-endian bytes).
+    ``course_id`` is NULL for day-sheet (branch/class) attendance. Remarks are kept
+    sparsely as {"<day offset>": "text"}. Maintained by attendance_bitmap.py.
+    """
+    __tablename__ = "attendance_bitmaps"
+    __table_args__ = (db.Index("ix_attendance_bitmaps_key", "student_id", "course_id", "term_start", unique=True),
+                      db.Index("ix_attendance_bitmaps_course_term", "course_id", "term_start"))
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey("courses.id"), nullable=True)
+    term_start = db.Column(db.Date, nullable=False)
+    marked = db.Column(db.LargeBinary, nullable=False, default=b"")
+    present = db.Column(db.LargeBinary, nullable=False, default=b"")
+    remarks = db.Column(db.JSON)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<AttendanceBitmap student={self.student_id} course={self.course_id} term={self.term_start}>"
+
 class FeePayment(db.Model):
     __tablename__ = "fee_payments"
+    __table_args__ = (
+        db.Index("ix_fee_payments_updated_at", "updated_at"),
+        db.Index("ix_fee_payments_student_status", "student_id", "status"),
+        db.Index("uq_fee_payments_idempotency", "student_id", "idempotency_key", unique=True),
+        db.Index("ix_fee_payments_order", "razorpay_order_id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     college_id = db.Column(db.Integer, db.ForeignKey("colleges.id"), nullable=True)
@@ -220,6 +298,7 @@ class FeePayment(db.Model):
     payment_id = db.Column(db.String(100))
     status = db.Column(db.String(20), default="Unpaid")
     payment_method = db.Column(db.String(50))
+    idempotency_key = db.Column(db.String(64))  # client-supplied; one intent per (student, key)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
@@ -229,8 +308,68 @@ class FeePayment(db.Model):
     def __repr__(self):
         return f"<FeePayment id={self.id} student={self.student_id} amount={self.amount} status={self.status}>"
 
+class FeeLedger(db.Model):
+    """
+    Per-student concurrency token for fee payments. ``version`` is bumped in the
+    same transaction as every intent creation or payment status change, so two
+    requests that computed dues from the same state cannot both commit.
+    """
+    __tablename__ = "fee_ledgers"
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, unique=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<FeeLedger student={self.student_id} v{self.version}>"
+
+class PaymentEvent(db.Model):
+    """
+    A settlement notification received from the payment gateway's webhook.
+    Stored as-is on receipt and applied to FeePayment later by the reconciliation
+    worker (status received → applied / ignored / rejected). ``event_id`` is the
+    gateway's id, so redelivered webhooks are recorded once.
+    """
+    __tablename__ = "payment_events"
+    __table_args__ = (db.Index("ix_payment_events_status", "status", "id"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(100), nullable=False, unique=True)
+    event_type = db.Column(db.String(50), nullable=False)  # payment.captured / payment.failed
+    order_id = db.Column(db.String(100), nullable=False, index=True)
+    gateway_payment_id = db.Column(db.String(100))
+    amount = db.Column(db.Numeric(10, 2))
+    payload = db.Column(db.JSON)
+    status = db.Column(db.String(20), nullable=False, default="received")
+    error = db.Column(db.Text)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<PaymentEvent {self.event_id} {self.event_type} order={self.order_id} {self.status}>"
+
+class ProfileChange(db.Model):
+    """
+    One saved edit of a student profile: ``changes`` maps each column that
+    actually changed to ``[old, new]`` (dates / decimals as strings; uploaded
+    files as their stored paths). Written by profile_changes.apply_changes.
+    """
+    __tablename__ = "profile_changes"
+    __table_args__ = (db.Index("ix_profile_changes_student", "student_id", "changed_at"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    changed_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    changes = db.Column(db.JSON, nullable=False)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ProfileChange student={self.student_id} fields={sorted(self.changes or {})}>"
+
 class StudentCourse(db.Model):
     __tablename__ = "student_courses"
+    __table_args__ = (db.Index("ix_student_courses_course", "course_id", "branch", "year"),)
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     course_id = db.Column(db.Integer, db.ForeignKey("courses.id"), nullable=False)
@@ -263,16 +402,53 @@ class FacultyCourse(db.Model):
 
     faculty = db.relationship("User", back_populates="faculty_courses")
     course = db.relationship("Course", back_populates="faculty_courses")
+    sessions = db.relationship("ClassSession", back_populates="faculty_course", lazy="dynamic")
 
     def __repr__(self):
         return f"<FacultyCourse faculty={self.faculty_id} course={self.course_id} sem={self.semester}>"
 
+class ClassSession(db.Model):
+    """
+    One taught period of a FacultyCourse on a date/slot. Attendance rows marked
+    for it carry its id, so per-session and per-course summaries are index lookups.
+    ``version`` is bumped on every save, as on AttendanceSheet.
+    """
+    __tablename__ = "class_sessions"
+    __table_args__ = (
+        db.UniqueConstraint("faculty_course_id", "date", "slot", name="uq_class_session_slot"),
+        db.Index("ix_class_sessions_course_date", "course_id", "date"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    faculty_course_id = db.Column(db.Integer, db.ForeignKey("faculty_courses.id"), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey("courses.id"), nullable=False)  # copied from the FacultyCourse
+    date = db.Column(db.Date, nullable=False)
+    slot = db.Column(db.String(20), nullable=False, default="1")  # period number or start time
+    topic = db.Column(db.String(255))
+    version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    last_op_id = db.Column(db.String(64))
+    created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    faculty_course = db.relationship("FacultyCourse", back_populates="sessions")
+    course = db.relationship("Course")
+    attendance_records = db.relationship("Attendance", back_populates="session", lazy="dynamic")
+
+    def __repr__(self):
+        return f"<ClassSession course={self.course_id} date={self.date} slot={self.slot}>"
+
 # ===========================
 # 4. Configuration and Utility Models
 # ===========================
 class FeeConfig(db.Model):
+    """
+    A fee for a program/branch/year cohort, or, when ``student_id`` is set, a
+    per-student override that takes precedence over the cohort's fee.
+    """
     __tablename__ = "fee_configs"
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True, index=True)
     program = db.Column(db.String(100))
     branch = db.Column(db.String(100))
     year = db.Column(db.String(20))
@@ -297,3 +473,187 @@ class DropdownValue(db.Model):
     def __repr__(self):
         return f"<DropdownValue field={self.field} value={self.value}>"
 
+
+# ===========================
+# 5. Analytics Models
+# ===========================
+class DropoutRiskScore(db.Model):
+    __tablename__ = "dropout_risk_scores"
+    __table_args__ = (db.Index("ix_dropout_risk_college_score", "college_id", "score"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, unique=True)
+    college_id = db.Column(db.Integer, db.ForeignKey("colleges.id"), nullable=True)
+    score = db.Column(db.Float, nullable=False)
+    risk_level = db.Column(db.String(10), nullable=False)
+
+    # Feature snapshot used for the score (kept for the dashboard / counselling)
+    attendance_rate = db.Column(db.Float)
+    attendance_trend = db.Column(db.Float)
+    marks_avg = db.Column(db.Float)
+    marks_trend = db.Column(db.Float)
+    outstanding_dues = db.Column(db.Numeric(10, 2))
+    days_since_payment = db.Column(db.Integer)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    student = db.relationship("User")
+
+    def __repr__(self):
+        return f"<DropoutRiskScore student={self.student_id} score={self.score:.2f} level={self.risk_level}>"
+
+
+class AnalyticsWatermark(db.Model):
+    """High-water mark per source table for the incremental analytics job."""
+    __tablename__ = "analytics_watermarks"
+
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), unique=True, nullable=False)
+    last_id = db.Column(db.Integer, default=0, nullable=False)
+    last_updated_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<AnalyticsWatermark {self.table_name} id={self.last_id} ts={self.last_updated_at}>"
+
+class JobLock(db.Model):
+    """
+    One row per batch job. A run claims the job by stamping ``locked_at`` with
+    a conditional UPDATE (only when unlocked or stale); the row lock serialises
+    concurrent claims, so at most one of them sees rowcount 1.
+    """
+    __tablename__ = "job_locks"
+
+    job = db.Column(db.String(50), primary_key=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    run_id = db.Column(db.Integer, nullable=True)
+
+    def __repr__(self):
+        return f"<JobLock {self.job} locked_at={self.locked_at} run={self.run_id}>"
+
+class AnalyticsRun(db.Model):
+    __tablename__ = "analytics_runs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    job = db.Column(db.String(50), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default="running")
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime)
+    duration_ms = db.Column(db.Integer)
+    timings = db.Column(db.JSON)
+    error = db.Column(db.Text)
+
+    def __repr__(self):
+        return f"<AnalyticsRun id={self.id} job={self.job} status={self.status} ms={self.duration_ms}>"
+
+class AttendanceAlert(db.Model):
+    """
+    A low-attendance notification for one student and course (course NULL = day
+    sheets). ``dedupe_key`` stops a student being alerted twice for the same
+    course inside the cooldown window, even if two runs overlap.
+    """
+    __tablename__ = "attendance_alerts"
+    __table_args__ = (
+        db.Index("ix_attendance_alerts_status", "status", "id"),
+        db.Index("ix_attendance_alerts_created", "created_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey("courses.id"), nullable=True)
+    percentage = db.Column(db.Float, nullable=False)
+    threshold = db.Column(db.Float, nullable=False)
+    total = db.Column(db.Integer, nullable=False)
+    present = db.Column(db.Integer, nullable=False)
+    window_start = db.Column(db.Date, nullable=False)
+    window_end = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued / sending / sent / failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    dedupe_key = db.Column(db.String(100), nullable=False, unique=True)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<AttendanceAlert student={self.student_id} course={self.course_id} {self.percentage}% {self.status}>"
+
+class DailyAttendanceSummary(db.Model):
+    __tablename__ = "daily_attendance_summary"
+    __table_args__ = (
+        db.UniqueConstraint("college_id", "date", "branch", "class_name", name="uq_daily_attendance_bucket"),
+        db.Index("ix_daily_attendance_date", "date"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    college_id = db.Column(db.Integer, db.ForeignKey("colleges.id"), nullable=True)
+    date = db.Column(db.Date, nullable=False)
+    branch = db.Column(db.String(50), nullable=False)
+    class_name = db.Column(db.String(50), nullable=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    present = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DailyAttendanceSummary {self.date} {self.branch}/{self.class_name} {self.present}/{self.total}>"
+
+class DailyFeeSummary(db.Model):
+    __tablename__ = "daily_fee_summary"
+    __table_args__ = (
+        db.UniqueConstraint("college_id", "date", "status", name="uq_daily_fee_bucket"),
+        db.Index("ix_daily_fee_date", "date"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    college_id = db.Column(db.Integer, db.ForeignKey("colleges.id"), nullable=True)
+    date = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    payment_count = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DailyFeeSummary {self.date} {self.status} n={self.payment_count} amount={self.amount}>"
+
+class ResultSummary(db.Model):
+    __tablename__ = "result_summary"
+    __table_args__ = (
+        db.UniqueConstraint("college_id", "course_id", "semester", name="uq_result_summary_bucket"),
+        db.Index("ix_result_summary_course", "course_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    college_id = db.Column(db.Integer, db.ForeignKey("colleges.id"), nullable=True)
+    course_id = db.Column(db.Integer, db.ForeignKey("courses.id"), nullable=False)
+    semester = db.Column(db.String(10), nullable=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    passed = db.Column(db.Integer, nullable=False, default=0)
+    approved = db.Column(db.Integer, nullable=False, default=0)
+    marks_sum = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ResultSummary course={self.course_id} sem={self.semester} passed={self.passed}/{self.total}>"
+
+class FeeDefaulter(db.Model):
+    """
+    Cached defaulter report: one row per student whose latest cohort fee is
+    past ``last_date`` and not fully paid. Rebuilt by ``flask fees defaulters``;
+    ``reminded_at`` survives rebuilds so reminders respect their cooldown.
+    """
+    __tablename__ = "fee_defaulters"
+    __table_args__ = (db.Index("ix_fee_defaulters_college", "college_id", "days_overdue"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, unique=True)
+    college_id = db.Column(db.Integer, db.ForeignKey("colleges.id"), nullable=True)
+    fee_config_id = db.Column(db.Integer, db.ForeignKey("fee_configs.id"), nullable=False)
+    fee_amount = db.Column(db.Numeric(10, 2), nullable=False)
+    paid_amount = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    amount_due = db.Column(db.Numeric(10, 2), nullable=False)
+    last_date = db.Column(db.Date, nullable=False)
+    days_overdue = db.Column(db.Integer, nullable=False)
+    generated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    reminded_at = db.Column(db.DateTime)
+    reminder_count = db.Column(db.Integer, nullable=False, default=0)
+    reminder_error = db.Column(db.Text)
+
+    student = db.relationship("User")
+
+    def __repr__(self):
+        return f"<FeeDefaulter student={self.student_id} due={self.amount_due} overdue={self.days_overdue}d>"
@@ -0,0 +1,272 @@
+"""
+Payment gateway integration: hosted checkout, signed webhooks, reconciliation
+and live status push.
+
+    python fake_gateway.py                          # local gateway stand-in on :5055
+    flask payments reconcile [--loop]               # apply received webhook events
+
+Request threads never wait on the gateway. An intent gets a locally minted
+order id and the student is redirected to the gateway's hosted checkout. The
+gateway reports the outcome by POSTing a signed event to /payments/webhook,
+which only verifies the signature and stores a PaymentEvent. The
+reconciliation worker applies stored events to FeePayment in batches (one
+transaction per batch) and bumps the students' FeeLedger versions.
+/payments/status then hands the new statuses to the fees page. It answers at
+once, never waiting inside the request: the page polls it every
+PAYMENT_POLL_INTERVAL seconds, backing off to PAYMENT_POLL_MAX_INTERVAL while
+nothing changes, and stops once the student has no Pending intent inside
+INTENT_TTL.
+
+PAYMENT_GATEWAY is "fake" (fake_gateway.py) or a "module:Class" path to a class
+with create_order(payment), checkout_url(payment, return_url),
+verify_webhook(body, headers) and parse_event(body) methods.
+"""
+import datetime
+import hashlib
+import hmac
+import importlib
+import json
+import logging
+import time
+import uuid
+from urllib.parse import urlencode
+
+import click
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import FeePayment, FeeLedger, PaymentEvent
+from payment_service import money, paid_total, bump_ledgers, open_intent
+
+payments_bp = Blueprint("payments", __name__, cli_group="payments")
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-Gateway-Signature"
+
+# Defaults, overridable through app.config
+DEFAULTS = {
+    "PAYMENT_GATEWAY": "fake",
+    "PAYMENT_GATEWAY_URL": "http://127.0.0.1:5055",
+    "PAYMENT_WEBHOOK_SECRET": "dev-webhook-secret",
+    "PAYMENT_RECONCILE_BATCH": 500,
+    "PAYMENT_POLL_INTERVAL": 2.0,       # seconds between the fees page's status polls
+    "PAYMENT_POLL_MAX_INTERVAL": 30.0,  # the page backs off to this while nothing changes
+}
+
+# Gateway event type → FeePayment status it settles to
+TRANSITIONS = {"payment.captured": "Paid", "payment.failed": "Failed"}
+
+
+def _config(key):
+    return current_app.config.get(key, DEFAULTS[key])
+
+
+def sign(secret, message):
+    """Hex HMAC-SHA256 of ``message`` (bytes)."""
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+# ===========================
+# Gateways
+# ===========================
+class FakeGateway:
+    """
+    Client for fake_gateway.py. Order ids are minted locally and the checkout
+    parameters are signed, so creating an order needs no round trip.
+    """
+
+    def __init__(self, config):
+        self.base_url = config.get("PAYMENT_GATEWAY_URL", DEFAULTS["PAYMENT_GATEWAY_URL"]).rstrip("/")
+        self.secret = config.get("PAYMENT_WEBHOOK_SECRET", DEFAULTS["PAYMENT_WEBHOOK_SECRET"])
+
+    def create_order(self, payment):
+        return f"order_{uuid.uuid4().hex[:20]}"
+
+    def checkout_url(self, payment, return_url):
+        params = {"order_id": payment.razorpay_order_id, "amount": str(money(payment.amount)),
+                  "currency": "INR", "return_url": return_url}
+        params["signature"] = sign(self.secret, urlencode(params).encode())
+        return f"{self.base_url}/checkout?{urlencode(params)}"
+
+    def verify_webhook(self, body, headers):
+        return hmac.compare_digest(sign(self.secret, body), headers.get(SIGNATURE_HEADER, ""))
+
+    def parse_event(self, body):
+        event = json.loads(body)
+        return {
+            "event_id": str(event["id"]),
+            "event_type": event["type"],
+            "order_id": event["order_id"],
+            "gateway_payment_id": event.get("payment_id"),
+            "amount": money(event["amount"]) if event.get("amount") is not None else None,
+            "payload": event,
+        }
+
+
+GATEWAYS = {"fake": FakeGateway}
+
+
+def get_gateway(name=None):
+    name = name or _config("PAYMENT_GATEWAY")
+    if name in GATEWAYS:
+        cls = GATEWAYS[name]
+    else:
+        module, _, attr = name.partition(":")
+        cls = getattr(importlib.import_module(module), attr)
+    return cls(current_app.config)
+
+
+def start_checkout(payment, return_url):
+    """Give ``payment`` a gateway order (once) and return the hosted checkout URL."""
+    gateway = get_gateway()
+    if not payment.razorpay_order_id:
+        payment.razorpay_order_id = gateway.create_order(payment)
+        db.session.commit()
+    return gateway.checkout_url(payment, return_url)
+
+
+# ===========================
+# Webhook
+# ===========================
+@payments_bp.route("/webhook", methods=["POST"])
+def gateway_webhook():
+    """Verify and store a gateway event; settlement happens in the reconciliation worker."""
+    gateway = get_gateway()
+    body = request.get_data()
+    if not gateway.verify_webhook(body, request.headers):
+        return jsonify({"error": "Invalid signature"}), 400
+    try:
+        event = gateway.parse_event(body)
+    except (ValueError, KeyError, TypeError):
+        return jsonify({"error": "Malformed event"}), 400
+
+    try:
+        db.session.add(PaymentEvent(**event))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # redelivery of an event we already have
+        return jsonify({"status": "duplicate"}), 200
+    return jsonify({"status": "accepted"}), 200
+
+
+# ===========================
+# Reconciliation
+# ===========================
+def _apply(event, payment):
+    """Settle one event against its payment. Returns (event status, error)."""
+    if payment is None:
+        return "rejected", "unknown order"
+    target = TRANSITIONS.get(event.event_type)
+    if target is None:
+        return "ignored", f"unhandled event type {event.event_type}"
+    if target == "Paid" and event.amount is not None and event.amount != money(payment.amount):
+        return "rejected", f"amount {event.amount} does not match payment amount {money(payment.amount)}"
+    if payment.status == "Paid" or payment.status == target:
+        return "ignored", f"payment already {payment.status}"
+    if target == "Failed" and payment.status != "Pending":
+        return "ignored", f"failure for a {payment.status} payment"
+
+    # A capture settles the payment even if the intent was cancelled meanwhile: the money was taken
+    payment.status = target
+    if event.gateway_payment_id:
+        payment.payment_id = event.gateway_payment_id
+    payment.updated_at = datetime.datetime.utcnow()
+    return "applied", None
+
+
+def reconcile_events(order_ids=None, batch_size=None):
+    """
+    Apply received events in arrival order, one transaction per batch.
+    ``order_ids`` limits the pass to those orders. Returns {status: count}.
+    """
+    batch_size = batch_size or _config("PAYMENT_RECONCILE_BATCH")
+    counts = {"applied": 0, "ignored": 0, "rejected": 0}
+    last_id = 0
+    while True:
+        query = PaymentEvent.query.filter(PaymentEvent.status == "received", PaymentEvent.id > last_id)
+        if order_ids is not None:
+            query = query.filter(PaymentEvent.order_id.in_(list(order_ids)))
+        events = query.order_by(PaymentEvent.id).limit(batch_size).all()
+        if not events:
+            break
+        last_id = events[-1].id
+
+        payments = {p.razorpay_order_id: p for p in FeePayment.query.filter(
+            FeePayment.razorpay_order_id.in_({e.order_id for e in events}))}
+        now = datetime.datetime.utcnow()
+        settled = set()
+        for event in events:
+            payment = payments.get(event.order_id)
+            event.status, event.error = _apply(event, payment)
+            event.processed_at = now
+            counts[event.status] += 1
+            if event.status == "applied":
+                settled.add(payment.student_id)
+        bump_ledgers(settled)
+        db.session.commit()
+    return counts
+
+
+@payments_bp.cli.command("reconcile")
+@click.option("--loop", is_flag=True, help="Keep running, checking for new events every --interval seconds.")
+@click.option("--interval", type=float, default=2.0, show_default=True)
+@click.option("--batch-size", type=int, help="Events per transaction (default PAYMENT_RECONCILE_BATCH).")
+def reconcile_command(loop, interval, batch_size):
+    """Apply received gateway events to fee payments."""
+    while True:
+        started = time.perf_counter()
+        counts = reconcile_events(batch_size=batch_size)
+        if any(counts.values()) or not loop:
+            click.echo(f"✅ {counts['applied']} applied, {counts['ignored']} ignored, {counts['rejected']} rejected "
+                       f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+        if not loop:
+            return
+        db.session.remove()
+        time.sleep(interval)
+
+
+# ===========================
+# Status polling
+# ===========================
+def payment_snapshot(student_id, limit=20):
+    """The student's recent payments and paid total, as pushed to the fees page."""
+    payments = db.session.query(FeePayment.id, FeePayment.status, FeePayment.amount).filter(
+        FeePayment.student_id == student_id
+    ).order_by(FeePayment.id.desc()).limit(limit).all()
+    return {
+        "payments": [{"id": pid, "status": status, "amount": str(money(amount))} for pid, status, amount in payments],
+        "total_paid": str(paid_total(student_id)),
+    }
+
+
+def _ledger_version(student_id):
+    return db.session.query(FeeLedger.version).filter_by(student_id=student_id).scalar() or 0
+
+
+@payments_bp.route("/status")
+@login_required
+def payment_status():
+    """
+    One status check, answered at once: ``changed`` is whether the student's
+    FeeLedger version differs from ``?version=`` (always true without it, with
+    the current snapshot). ``open`` is false once no Pending intent is inside
+    INTENT_TTL, which tells the page to stop polling; ``interval`` and
+    ``max_interval`` are its polling schedule.
+    """
+    if current_user.role != "Student":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    student_id = current_user.id
+    known = request.args.get("version", type=int)
+    version = _ledger_version(student_id)
+    state = {
+        "version": version,
+        "open": open_intent(student_id) is not None,
+        "interval": _config("PAYMENT_POLL_INTERVAL"),
+        "max_interval": _config("PAYMENT_POLL_MAX_INTERVAL"),
+    }
+    if version == known:
+        return jsonify({"changed": False, **state})
+    return jsonify({"changed": True, **state, **payment_snapshot(student_id)})
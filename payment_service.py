@@ -0,0 +1,187 @@
+"""
+Fee payment intents and dues.
+
+A payment intent is a "Pending" FeePayment. Creating one is idempotent per
+(student, idempotency key): replaying a key returns the intent it created.
+Every write that changes a student's dues bumps their FeeLedger version with a
+compare-and-swap in the same transaction, so concurrent requests (double
+clicks, parallel tabs) that read the same dues cannot both commit; the loser
+re-reads and reuses the intent that is now open.
+
+All amounts are Decimal, quantised to paise; totals are summed in SQL.
+"""
+import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import FeePayment, FeeLedger
+from fee_resolver import resolve_fee
+
+CENT = Decimal("0.01")
+# An unfinished intent is reused for this long, then a new one may be opened
+INTENT_TTL = datetime.timedelta(minutes=30)
+CAS_RETRIES = 5
+PAYMENT_STATUSES = ["Unpaid", "Pending", "Paid", "Failed", "Cancelled"]
+
+
+class PaymentError(Exception):
+    """A payment request that cannot be honoured; ``status_code`` is the HTTP status to return."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def money(value):
+    """Decimal rounded to paise; accepts Decimal, str, int or the float SQLite returns for SUM()."""
+    if value is None or value == "":
+        return Decimal("0.00")
+    try:
+        return Decimal(str(value)).quantize(CENT)
+    except InvalidOperation:
+        raise PaymentError("Invalid amount")
+
+
+# ===========================
+# Dues
+# ===========================
+def fee_config_for(student):
+    """The fee rule that applies to the student (see fee_resolver), or None."""
+    return resolve_fee(student)
+
+
+def paid_total(student_id):
+    return money(db.session.query(func.sum(FeePayment.amount)).filter(
+        FeePayment.student_id == student_id, FeePayment.status == "Paid"
+    ).scalar())
+
+
+def dues_for(student):
+    """(fee_config, paid, dues); dues is None when no fee is configured."""
+    fee_config = fee_config_for(student)
+    paid = paid_total(student.id)
+    if fee_config is None:
+        return None, paid, None
+    return fee_config, paid, max(money(fee_config.amount) - paid, Decimal("0.00"))
+
+
+def open_intent(student_id, now=None):
+    """The newest Pending intent still inside INTENT_TTL, if any."""
+    now = now or datetime.datetime.utcnow()
+    return FeePayment.query.filter(
+        FeePayment.student_id == student_id,
+        FeePayment.status == "Pending",
+        FeePayment.created_at > now - INTENT_TTL,
+    ).order_by(FeePayment.id.desc()).first()
+
+
+# ===========================
+# Ledger (compare-and-swap)
+# ===========================
+def _ledger_version(student_id):
+    version = db.session.query(FeeLedger.version).filter_by(student_id=student_id).scalar()
+    if version is not None:
+        return version
+    try:
+        with db.session.begin_nested():
+            db.session.add(FeeLedger(student_id=student_id, version=0))
+    except IntegrityError:
+        pass  # created concurrently by another request
+    return db.session.query(FeeLedger.version).filter_by(student_id=student_id).scalar()
+
+
+def _bump_ledger(student_id, expected_version):
+    """CAS the ledger forward; False if another transaction got there first."""
+    result = db.session.execute(
+        update(FeeLedger)
+        .where(FeeLedger.student_id == student_id, FeeLedger.version == expected_version)
+        .values(version=FeeLedger.version + 1, updated_at=datetime.datetime.utcnow())
+    )
+    return result.rowcount == 1
+
+
+def bump_ledgers(student_ids):
+    """Advance several ledgers inside the caller's transaction (batch settlement); does not commit."""
+    if student_ids:
+        db.session.execute(
+            update(FeeLedger)
+            .where(FeeLedger.student_id.in_(list(student_ids)))
+            .values(version=FeeLedger.version + 1, updated_at=datetime.datetime.utcnow())
+        )
+
+
+def set_payment_status(payment, status):
+    """Change a payment's status and bump the student's ledger; commits."""
+    if status not in PAYMENT_STATUSES:
+        raise PaymentError("Invalid status")
+    for _ in range(CAS_RETRIES):
+        version = _ledger_version(payment.student_id)
+        payment.status = status
+        payment.updated_at = datetime.datetime.utcnow()
+        if _bump_ledger(payment.student_id, version):
+            db.session.commit()
+            return payment
+        db.session.rollback()
+    raise PaymentError("The payment is being updated elsewhere; try again", 409)
+
+
+# ===========================
+# Intents
+# ===========================
+def create_intent(student, amount=None, method="UPI", idempotency_key=None):
+    """
+    Open a Pending payment for up to the student's outstanding dues. Returns
+    (payment, created); ``created`` is False when an existing intent is returned
+    (same idempotency key, or an open intent for the same method). An open intent
+    for a different method is cancelled and replaced.
+    """
+    key = (idempotency_key or "").strip()[:64] or None
+    requested = money(amount) if amount not in (None, "") else None
+    if requested is not None and requested <= 0:
+        raise PaymentError("Invalid amount")
+
+    for _ in range(CAS_RETRIES):
+        if key:
+            existing = FeePayment.query.filter_by(student_id=student.id, idempotency_key=key).first()
+            if existing:
+                return existing, False
+
+        version = _ledger_version(student.id)
+        fee_config, paid, dues = dues_for(student)
+        if fee_config is None:
+            raise PaymentError("Fee configuration not set by admin")
+
+        now = datetime.datetime.utcnow()
+        pending = open_intent(student.id, now)
+        if pending and pending.payment_method == method:
+            return pending, False
+        if dues <= 0:
+            raise PaymentError("No dues pending")
+
+        if pending:
+            pending.status = "Cancelled"
+            pending.updated_at = now
+        payment = FeePayment(
+            student_id=student.id,
+            college_id=student.college_id,
+            amount=min(requested, dues) if requested is not None else dues,
+            status="Pending",
+            payment_method=method,
+            idempotency_key=key,
+            created_at=now,
+            updated_at=now,
+        )
+        db.session.add(payment)
+        try:
+            if _bump_ledger(student.id, version):
+                db.session.commit()
+                return payment, True
+        except IntegrityError:
+            pass  # the same key was committed concurrently; the retry returns it
+        db.session.rollback()
+
+    raise PaymentError("Too many concurrent payment requests; try again", 409)
@@ -0,0 +1,236 @@
+"""
+Shared PDF rendering: compiled layout templates, cached resources and a page
+flow engine, used by every server-side PDF (receipts, student lists, the
+defaulter report, the course list).
+
+A layout is declared once, at import, as a Block of elements positioned
+relative to the block's top edge:
+
+    HEADER = Block([
+        Image("logo", x=40, dy=60, width=80, height=60),
+        Text(140, 20, "{college_name}", font=("Helvetica-Bold", 16), when="college_name"),
+    ], height=100)
+
+Compiling a Block binds every format string to str.format_map (literal text
+skips formatting) and groups consecutive text elements by font, so drawing a
+block is one text object with one setFont per run, placing each line with a
+relative cursor move (reportlab's public text-object API only). Flow stacks blocks down the
+page and starts a new page (redrawing a repeating header, e.g. table column
+titles) when the next block would cross the bottom margin, so no caller keeps
+its own ``y`` cursor.
+
+Standard fonts need no registration; TrueType fonts are registered once per
+process (register_font). Images are decoded once per process and reused by
+every page and document: files keyed on (path, mtime), in-memory logos keyed
+on their bytes.
+"""
+import io
+import os
+import string
+from functools import lru_cache
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+ELLIPSIS = "..."
+
+_formatter = string.Formatter()
+
+
+# ===========================
+# Resources
+# ===========================
+def register_font(name, path):
+    """Register a TrueType font under ``name`` (no-op if already registered)."""
+    if name not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(name, path))
+    return name
+
+
+@lru_cache(maxsize=64)
+def _image_file(path, mtime):
+    return ImageReader(path)
+
+
+def image(path):
+    """Decoded image for a file path, or None if it doesn't exist."""
+    if not path or not os.path.exists(path):
+        return None
+    return _image_file(path, os.path.getmtime(path))
+
+
+@lru_cache(maxsize=16)
+def image_from_bytes(data):
+    """Decoded image for in-memory bytes (e.g. a logo read by a parent process)."""
+    return ImageReader(io.BytesIO(data)) if data else None
+
+
+@lru_cache(maxsize=32)
+def _ascii_widths(font, size):
+    return [pdfmetrics.stringWidth(chr(c), font, size) for c in range(128)]
+
+
+def text_width(text, font, size):
+    """Width of ``text`` in points; ASCII is summed from a cached per-font table."""
+    if text.isascii():
+        return sum(map(_ascii_widths(font, size).__getitem__, text.encode("ascii")))
+    return pdfmetrics.stringWidth(text, font, size)
+
+
+def clip(text, font, size, width):
+    """``text`` shortened with an ellipsis to fit ``width`` points."""
+    if text_width(text, font, size) <= width:
+        return text
+    room = width - text_width(ELLIPSIS, font, size)
+    while text and text_width(text, font, size) > room:
+        text = text[:-1]
+    return text + ELLIPSIS
+
+
+# ===========================
+# Layout elements
+# ===========================
+class Text:
+    """
+    One line of text with its baseline ``dy`` points below the block top.
+    ``fmt`` is a str.format template over the values; ``when`` names a value
+    that must be truthy for the line to be drawn; ``width`` clips the text.
+    """
+
+    def __init__(self, x, dy, fmt, font=("Helvetica", 12), when=None, width=None):
+        self.x, self.dy, self.fmt, self.font, self.when, self.width = x, dy, fmt, font, when, width
+
+    def compile(self):
+        literal = not any(field for _, field, _, _ in _formatter.parse(self.fmt))
+        fmt, width, (font, size) = self.fmt, self.width, self.font
+        if literal:
+            render = lambda values: fmt
+        else:
+            render = fmt.format_map
+        if width is not None:
+            format_value = render
+            render = lambda values: clip(format_value(values), font, size, width)
+        return self.x, self.dy, render, self.when
+
+
+class Image:
+    """An image taken from ``values[key]`` (skipped when None), bottom edge ``dy`` below the block top."""
+
+    def __init__(self, key, x, dy, width, height):
+        self.key, self.x, self.dy, self.width, self.height = key, x, dy, width, height
+
+
+class Block:
+    """A compiled group of elements with a fixed height."""
+
+    def __init__(self, elements, height):
+        self.height = height
+        self.images = [e for e in elements if isinstance(e, Image)]
+        self.runs = []  # [(font, [(x, dy, render, when)])], consecutive texts sharing a font
+        for element in elements:
+            if isinstance(element, Image):
+                continue
+            if self.runs and self.runs[-1][0] == element.font:
+                self.runs[-1][1].append(element.compile())
+            else:
+                self.runs.append((element.font, [element.compile()]))
+
+    def draw(self, pdf, top, values):
+        for img in self.images:
+            reader = values.get(img.key)
+            if reader is not None:
+                pdf.drawImage(reader, img.x, top - img.dy, width=img.width, height=img.height,
+                              preserveAspectRatio=True, mask="auto")
+        # One text object per block: each line is a cursor move relative to the
+        # previous one plus a textOut, instead of a drawString (new text object) each.
+        text = pdf.beginText(0, top)
+        x = dy = 0
+        for font, lines in self.runs:
+            text.setFont(*font)
+            for line_x, line_dy, render, when in lines:
+                if when is None or values.get(when):
+                    text.moveCursor(line_x - x, line_dy - dy)
+                    x, dy = line_x, line_dy
+                    text.textOut(render(values))
+        pdf.drawText(text)
+
+
+def table_row(columns, font=("Helvetica", 10), header_font=("Helvetica-Bold", 10), height=15, x=40, gap=6):
+    """
+    Single-line Blocks for a table. ``columns`` is [(field, title, width)];
+    each cell is ``{field}`` clipped to its width. Returns (row, header).
+    """
+    cells, titles, left = [], [], x
+    for field, title, width in columns:
+        cells.append(Text(left, 0, "{%s}" % field, font=font, width=width))
+        titles.append(Text(left, 0, title, font=header_font, width=width))
+        left += width + gap
+    return Block(cells, height), Block(titles, height + 5)
+
+
+# ===========================
+# Page flow
+# ===========================
+class Flow:
+    """
+    Places blocks top to bottom, breaking pages at ``bottom``. ``repeat`` is a
+    (block, values) pair drawn at the top of every page after the first.
+    """
+
+    def __init__(self, pdf, top=PAGE_HEIGHT - 50, bottom=50, repeat=None):
+        self.pdf, self.top, self.bottom, self.repeat = pdf, top, bottom, repeat
+        self.y = top
+
+    def new_page(self):
+        self.pdf.showPage()
+        self.y = self.top
+        if self.repeat is not None:
+            block, values = self.repeat
+            block.draw(self.pdf, self.y, values)
+            self.y -= block.height
+
+    def place(self, block, values):
+        if self.y - block.height < self.bottom and self.y < self.top:
+            self.new_page()
+        block.draw(self.pdf, self.y, values)
+        self.y -= block.height
+
+    def skip(self, points):
+        self.y -= points
+
+
+class Document:
+    """A canvas over an in-memory buffer; ``finish()`` returns the PDF bytes."""
+
+    def __init__(self, pagesize=A4):
+        self.buffer = io.BytesIO()
+        self.pdf = canvas.Canvas(self.buffer, pagesize=pagesize)
+
+    def flow(self, **kwargs):
+        return Flow(self.pdf, **kwargs)
+
+    def end_page(self):
+        self.pdf.showPage()
+
+    def finish(self):
+        self.pdf.save()
+        return self.buffer.getvalue()
+
+
+def render_table(title, row, header, rows, title_values=None):
+    """
+    PDF bytes for a titled table: ``title`` block on the first page, the
+    column ``header`` on every page, one ``row`` per values dict in ``rows``
+    (any iterable, consumed once).
+    """
+    doc = Document()
+    flow = doc.flow(repeat=(header, {}))
+    flow.place(title, title_values or {})
+    flow.place(header, {})
+    for values in rows:
+        flow.place(row, values)
+    return doc.finish()
@@ -0,0 +1,124 @@
+"""
+Form → User diffing for the student profile screens.
+
+The admin profile form posts every field on every save. Rather than assigning
+all of them (which dirties every column, rewrites the search index row and
+drops every cached roster), the form is parsed once into the values it would
+set, compared with the student's current values, and only real changes are
+applied. Each save that changes anything writes one ProfileChange row with
+the ``{field: [old, new]}`` diff; a save that changes nothing writes nothing.
+
+Callers invalidate caches by what changed: rosters only when a roster column
+changed (ROSTER_FIELDS). The FTS search index follows ORM attribute history
+on its own (student_search), so unchanged identifiers are never reindexed.
+"""
+from datetime import date
+from decimal import Decimal
+
+from extensions import db
+from models import ProfileChange
+from utils import parse_string, parse_date, parse_decimal
+
+# (model column, form field, parser) in form order
+PROFILE_FIELDS = (
+    # Personal / academic
+    ("name", "name", parse_string),
+    ("enrollment_no", "enrollment_no", parse_string),
+    ("scholar_no", "scholar_no", parse_string),
+    ("roll_no", "roll_no", parse_string),
+    ("section", "section", parse_string),
+    ("program", "program", parse_string),
+    ("branch", "branch", parse_string),
+    ("year", "year", parse_string),
+    ("semester", "semester", parse_string),
+    ("dob", "dob", parse_date),
+    ("admission_date", "admission_date", parse_date),
+    # Contact & identity
+    ("gender", "gender", parse_string),
+    ("blood_group", "blood_group", parse_string),
+    ("nationality", "nationality", parse_string),
+    ("religion", "religion", parse_string),
+    ("marital_status", "marital_status", parse_string),
+    ("aadhaar_no", "aadhaar_no", parse_string),
+    ("contact", "mobile", parse_string),
+    ("email", "email", parse_string),
+    ("category", "category", parse_string),
+    ("mother_tongue", "mother_tongue", parse_string),
+    ("samagra_id", "samagra_id", parse_string),
+    ("domicile_state", "domicile_state", parse_string),
+    # Parents
+    ("father_name", "father_name", parse_string),
+    ("father_name_hindi", "father_name_hindi", parse_string),
+    ("father_mobile", "father_mobile", parse_string),
+    ("father_income", "father_income", parse_decimal),
+    ("mother_name", "mother_name", parse_string),
+    ("mother_name_hindi", "mother_name_hindi", parse_string),
+    ("mother_mobile", "mother_mobile", parse_string),
+    ("mother_income", "mother_income", parse_decimal),
+    # Address
+    ("permanent_address", "permanent_address", parse_string),
+    ("permanent_city", "permanent_city", parse_string),
+    ("permanent_state", "permanent_state", parse_string),
+    ("permanent_pin", "permanent_pin", parse_string),
+    ("local_address", "local_address", parse_string),
+    ("local_city", "local_city", parse_string),
+    ("local_state", "local_state", parse_string),
+    ("local_pin", "local_pin", parse_string),
+    # Bank
+    ("bank_name", "bank_name", parse_string),
+    ("bank_branch", "bank_branch", parse_string),
+    ("bank_account_no", "bank_account_no", parse_string),
+    ("bank_ifsc", "bank_ifsc", parse_string),
+)
+
+UPLOAD_FIELDS = ("photo", "signature", "id_card", "certificate", "transcript")
+
+# Columns that feed roster_service (roster entries and the class/branch dropdowns)
+ROSTER_FIELDS = frozenset({"name", "roll_no", "year", "branch", "role"})
+
+
+def _json_value(value):
+    if isinstance(value, (date, Decimal)):
+        return str(value)
+    return value
+
+
+# ===========================
+# Diffing
+# ===========================
+def diff_form(student, form, fields=PROFILE_FIELDS):
+    """
+    {column: (old, new)} for the form fields whose parsed value differs from
+    the student's current one. Decimals compare by value (50000 == 50000.00).
+    """
+    changes = {}
+    for column, field, parse in fields:
+        new = parse(form.get(field))
+        old = getattr(student, column)
+        if old != new:
+            changes[column] = (old, new)
+    return changes
+
+
+def diff_values(student, values):
+    """{column: (old, new)} for the ``{column: value}`` entries that differ (e.g. saved uploads)."""
+    return {column: (getattr(student, column), value)
+            for column, value in values.items() if getattr(student, column) != value}
+
+
+def apply_changes(student, changes, changed_by=None):
+    """
+    Assign ``changes`` to the student and add a ProfileChange row to the
+    session. Returns the set of changed columns (empty: nothing was added).
+    Caller commits.
+    """
+    if not changes:
+        return set()
+    for column, (_, new) in changes.items():
+        setattr(student, column, new)
+    db.session.add(ProfileChange(
+        student_id=student.id,
+        changed_by=changed_by,
+        changes={column: [_json_value(old), _json_value(new)] for column, (old, new) in changes.items()},
+    ))
+    return set(changes)
@@ -0,0 +1,108 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_required, current_user
+from extensions import db
+from models import User
+from utils import save_uploaded_file
+from profile_changes import diff_form, diff_values, apply_changes, UPLOAD_FIELDS, ROSTER_FIELDS
+from profile_service import invalidate_profile
+from roster_service import invalidate_rosters
+from student_search import search_students
+
+profile_bp = Blueprint("profile_bp", __name__)
+
+
+# ===========================
+# Admin → Student List
+# ===========================
+@profile_bp.route("/profile/admin/students")
+@login_required
+def admin_students():
+    if current_user.role != "Admin":
+        flash("❌ Unauthorized access.", "danger")
+        return redirect(url_for("dashboard"))
+
+    students = User.query.filter_by(role="Student").order_by(User.id.asc()).all()
+    return render_template("admin_students.html", students=students)
+
+
+# ===========================
+# Admin → Student Search (typeahead)
+# ===========================
+@profile_bp.route("/profile/admin/students/search")
+@login_required
+def search_students_api():
+    if current_user.role != "Admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    results = search_students(request.args.get("q", ""), college_id=current_user.college_id,
+                              limit=request.args.get("limit", 10, type=int))
+    for r in results:
+        r["url"] = url_for("profile_bp.set_student_profile", student_id=r["id"])
+    return jsonify({"results": results})
+
+
+# ===========================
+# Admin → Set Student Profile
+# ===========================
+@profile_bp.route("/profile/admin/set_student_profile/<int:student_id>", methods=["GET", "POST"])
+@login_required
+def set_student_profile(student_id):
+    if current_user.role != "Admin":
+        flash("❌ Unauthorized access.", "danger")
+        return redirect(url_for("dashboard"))
+
+    student = User.query.get_or_404(student_id)
+
+    if request.method == "POST":
+        changes = diff_form(student, request.form)
+
+        # File Uploads
+        owner = f"user{student.id}"
+        saved = {field: save_uploaded_file(field, owner_prefix=owner) for field in UPLOAD_FIELDS}
+        changes.update(diff_values(student, {field: path for field, path in saved.items() if path}))
+
+        changed = apply_changes(student, changes, changed_by=current_user.id)
+        if not changed:
+            flash("ℹ️ No changes to save.", "info")
+            return redirect(url_for("profile_bp.set_student_profile", student_id=student.id))
+
+        # Save to DB
+        db.session.commit()
+        invalidate_profile(student.id)
+        if changed & ROSTER_FIELDS:
+            invalidate_rosters()
+        flash("✅ Student profile updated successfully!", "success")
+        return redirect(url_for("profile_bp.set_student_profile", student_id=student.id))
+
+    return render_template("admin_setprofile.html", student=student)
+
+
+# ===========================
+# Student → Profile View/Edit
+# ===========================
+@profile_bp.route("/profile/student-profile/<int:student_id>", methods=["GET", "POST"])
+@login_required
+def student_profile(student_id):
+    student = User.query.get_or_404(student_id)
+
+    if current_user.role != "Admin" and current_user.id != student.id:
+        flash("❌ Unauthorized access.", "danger")
+        return redirect(url_for("dashboard"))
+
+    is_admin = current_user.role == "Admin"
+
+    if request.method == "POST" and not is_admin:
+        # Allow only photo upload for students (Year 1)
+        if str(student.year) == "1" and not student.photo:
+            saved = save_uploaded_file("photo", owner_prefix=f"user{student.id}")
+            if saved:
+                apply_changes(student, diff_values(student, {"photo": saved}), changed_by=current_user.id)
+                db.session.commit()
+                invalidate_profile(student.id)
+                flash("✅ Profile photo uploaded!", "success")
+        else:
+            flash("❌ You cannot edit profile details.", "danger")
+
+        return redirect(url_for("profile_bp.student_profile", student_id=student.id))
+
+    return render_template("student_profile.html", student=student, is_admin=is_admin)
\ No newline at end of file
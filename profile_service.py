@@ -0,0 +1,63 @@
+"""
+Cached read-only student profiles for the profile pages.
+
+A profile page needs every profile column of one user, and it is read far
+more often than it is edited. get_profile(user_id) returns an immutable
+Profile snapshot (a namedtuple of the User columns minus the password) and
+keeps it in process memory per user.
+
+Invalidation is versioned. Every user has a version counter, which
+invalidate_profile(user_id) bumps. A cached snapshot is served only while
+its version is still current. A reader that loaded the row before a
+concurrent edit therefore cannot store stale data over the invalidation:
+its snapshot carries the old version and is never served. Code that changes
+a user's profile columns must call invalidate_profile after committing.
+Entries also expire after PROFILE_CACHE_TTL seconds, which bounds staleness
+for other worker processes (as in roster_service).
+"""
+import threading
+import time
+from collections import namedtuple
+
+from extensions import db
+from models import User
+
+PROFILE_CACHE_TTL = 300
+PROFILE_CACHE_SIZE = 5000
+
+PROFILE_COLUMNS = tuple(c.key for c in User.__table__.columns if c.key != "password")
+
+Profile = namedtuple("Profile", PROFILE_COLUMNS)
+
+_cache = {}     # user_id -> (version, expires, Profile)
+_versions = {}  # user_id -> version
+_lock = threading.Lock()
+_select = [getattr(User, c) for c in PROFILE_COLUMNS]
+
+
+def get_profile(user_id):
+    """The user's Profile snapshot, or None if there is no such user. Shared; read-only."""
+    now = time.monotonic()
+    with _lock:
+        version = _versions.get(user_id, 0)
+        hit = _cache.get(user_id)
+        if hit and hit[0] == version and hit[1] > now:
+            return hit[2]
+
+    row = db.session.query(*_select).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    profile = Profile(*row)
+    with _lock:
+        if _versions.get(user_id, 0) == version:
+            if len(_cache) >= PROFILE_CACHE_SIZE:
+                _cache.clear()
+            _cache[user_id] = (version, now + PROFILE_CACHE_TTL, profile)
+    return profile
+
+
+def invalidate_profile(user_id):
+    """Retire the user's cached snapshot (and any snapshot being loaded right now)."""
+    with _lock:
+        _versions[user_id] = _versions.get(user_id, 0) + 1
+        _cache.pop(user_id, None)
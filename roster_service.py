@@ -0,0 +1,98 @@
+"""
+Cached student rosters for the faculty screens.
+
+Rosters only change when a student's profile or enrollment changes, so the
+(year, branch) → [(id, roll_no, name), ...] lists and the class/branch dropdown
+values are kept in process memory. Code that changes a student's name, roll
+number, year or branch (or their enrollments) must call invalidate_rosters().
+Entries also expire after ROSTER_CACHE_TTL seconds, which bounds staleness for
+other worker processes that did not see the invalidation. Keys come from
+request arguments, so the cache is capped at ROSTER_CACHE_SIZE entries: a full
+cache first drops its expired entries, and is cleared if that is not enough
+(as in profile_service).
+"""
+import threading
+import time
+from collections import namedtuple
+
+from extensions import db
+from models import User, StudentCourse
+
+ROSTER_CACHE_TTL = 300
+ROSTER_CACHE_SIZE = 1000
+
+RosterEntry = namedtuple("RosterEntry", ["id", "roll_no", "name", "year"])
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _cached(key, load):
+    now = time.monotonic()
+    with _lock:
+        hit = _cache.get(key)
+        if hit and hit[0] > now:
+            return hit[1]
+    value = load()
+    with _lock:
+        if len(_cache) >= ROSTER_CACHE_SIZE:
+            for stale in [k for k, (expires, _) in _cache.items() if expires <= now]:
+                del _cache[stale]
+            if len(_cache) >= ROSTER_CACHE_SIZE:
+                _cache.clear()
+        _cache[key] = (now + ROSTER_CACHE_TTL, value)
+    return value
+
+
+def invalidate_rosters():
+    """Drop every cached roster; call after any student profile/enrollment change."""
+    with _lock:
+        _cache.clear()
+
+
+# ===========================
+# Rosters
+# ===========================
+def get_roster(year=None, branch=None):
+    """
+    Students ordered by roll number as RosterEntry tuples, optionally narrowed to
+    a year and/or branch. The returned list is shared; do not mutate it.
+    """
+    def load():
+        query = db.session.query(User.id, User.roll_no, User.name, User.year).filter(User.role == "Student")
+        if year is not None:
+            query = query.filter(User.year == year)
+        if branch is not None:
+            query = query.filter(User.branch == branch)
+        return tuple(RosterEntry(*row) for row in query.order_by(User.roll_no, User.id))
+
+    return _cached(("roster", year, branch), load)
+
+
+def get_course_roster(faculty_course):
+    """
+    Students enrolled (via StudentCourse) in a FacultyCourse's course, limited to
+    the assignment's branch and year, ordered by roll number.
+    """
+    def load():
+        query = db.session.query(User.id, User.roll_no, User.name, User.year).join(
+            StudentCourse, StudentCourse.student_id == User.id
+        ).filter(StudentCourse.course_id == faculty_course.course_id, User.role == "Student")
+        if faculty_course.branch:
+            query = query.filter(StudentCourse.branch == faculty_course.branch)
+        if faculty_course.year:
+            query = query.filter(StudentCourse.year == faculty_course.year)
+        return tuple(RosterEntry(*row) for row in query.distinct().order_by(User.roll_no, User.id))
+
+    return _cached(("course", faculty_course.id), load)
+
+
+def roster_options():
+    """(classes, branches): the distinct non-empty student years and branches."""
+    def load():
+        pairs = db.session.query(User.year, User.branch).filter(User.role == "Student").distinct().all()
+        classes = sorted({y for y, _ in pairs if y})
+        branches = sorted({b for _, b in pairs if b})
+        return classes, branches
+
+    return _cached(("options",), load)
@@ -8,10 +8,8 @@ TEMPLATE_DIR = "templates"
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
 def collect_errors():
-    errors = ""
-    if os.path.exists(LOG_FILE):
-        with open(LOG_FILE, "r") as f:
-            errors += f.read()
+    """Return (errors, log_state); the log offset is saved once the errors are sent."""
+    errors, state = read_new_log_entries(LOG_FILE)
 
     # Scan templates for broken HTML (very basic check)
     for root, _, files in os.walk(TEMPLATE_DIR):
@@ -23,9 +21,9 @@ def collect_errors():
                     if "{{" in content and "}}" not in content:
                         errors += f"\n⚠️ Possible broken Jinja tag in {file}\n{content}\n"
 
-    return errors.strip()
+    return errors.strip(), state
 
-def generate_patch(errors):
+def generate_patch(errors, log_state=None):
     if not errors:
         print("✅ No errors detected. Skipping patch.")
         return
@@ -41,15 +39,24 @@ def generate_patch(errors):
     )
 
     patch = response["choices"][0]["message"]["content"]
+    if log_state:
+        save_log_offset(log_state)
 import os
+import re
+import json
 import openai
 
 # Get API key from environment
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
 LOG_FILE = "app.log"
+LOG_OFFSET_FILE = "app.log.offset"
 REQUEST_FILE = "ai_request.txt"
 PATCH_FILE = "ai_patch.diff"
+MIN_LOG_LEVEL = "WARNING"
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+ANSI = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
 
 def read_file_safe(path):
     """Read a file if it exists, else return empty string."""
@@ -58,11 +65,97 @@ def read_file_safe(path):
             return f.read().strip()
     return ""
 
+def _read_from(path, offset):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    # Only consume complete lines; a partially written line is picked up next run
+    end = data.rfind(b"\n") + 1
+    return data[:end].decode("utf-8", errors="ignore"), offset + end
+
+def _format_entry(line):
+    """Keep WARNING+ JSON records (and any non-JSON legacy line) as readable text."""
+    try:
+        rec = json.loads(line)
+    except ValueError:
+        return ANSI.sub("", line)
+    if LEVELS.get(rec.get("level"), 0) < LEVELS[MIN_LOG_LEVEL] and "exc_info" not in rec:
+        return None
+    where = f" [{rec['route']}]" if rec.get("route") else ""
+    text = f"{rec.get('ts')} {rec.get('level')} {rec.get('logger')}{where}: {rec.get('message')}"
+    if rec.get("exc_info"):
+        text += "\n" + rec["exc_info"]
+    return text
+
+def _rotated_sibling(path, inode):
+    """
+    The rotated copy of ``path`` with the given inode, else the newest rotated
+    sibling by mtime. Size rotation names it path + ".1", timed rotation
+    path + ".YYYY-MM-DD".
+    """
+    directory = os.path.dirname(path) or "."
+    prefix = os.path.basename(path) + "."
+    siblings = []
+    for name in os.listdir(directory):
+        sibling = os.path.join(directory, name)
+        if name.startswith(prefix) and os.path.abspath(sibling) != os.path.abspath(LOG_OFFSET_FILE) \
+                and os.path.isfile(sibling):
+            siblings.append((os.stat(sibling), sibling))
+    if not siblings:
+        return None
+    for stat, sibling in siblings:
+        if stat.st_ino == inode:
+            return sibling
+    return max(siblings, key=lambda s: s[0].st_mtime)[1]
+
+def read_new_log_entries(path):
+    """
+    Return (text, state) for log lines appended since the offset stored in
+    LOG_OFFSET_FILE. If the log was rotated, the rest of the rotated file
+    (see _rotated_sibling) is read first.
+    """
+    try:
+        with open(LOG_OFFSET_FILE, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        saved = {"inode": None, "offset": 0}
+
+    if not os.path.exists(path):
+        return "", saved
+
+    chunks = []
+    stat = os.stat(path)
+    offset = saved.get("offset", 0)
+    if saved.get("inode") != stat.st_ino or stat.st_size < offset:
+        rotated = _rotated_sibling(path, saved["inode"]) if saved.get("inode") else None
+        if rotated:
+            # The file we were tailing if its inode matches, else a later one to read whole
+            start = offset if os.stat(rotated).st_ino == saved["inode"] else 0
+            chunks.append(_read_from(rotated, start)[0])
+        offset = 0
+
+    text, offset = _read_from(path, offset)
+    chunks.append(text)
+
+    entries = []
+    for chunk in chunks:
+        for line in chunk.splitlines():
+            if line.strip():
+                entry = _format_entry(line)
+                if entry:
+                    entries.append(entry)
+    return "\n".join(entries), {"inode": stat.st_ino, "offset": offset}
+
+def save_log_offset(state):
+    with open(LOG_OFFSET_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
 def main():
-    errors = read_file_safe(LOG_FILE)
+    errors, log_state = read_new_log_entries(LOG_FILE)
     request = read_file_safe(REQUEST_FILE)
 
     if not errors and not request:
+        save_log_offset(log_state)
         print("✅ Nothing to fix or request.")
         return
 
@@ -90,6 +183,8 @@ Respond ONLY with a git diff patch.
     )
 
     patch = response.choices[0].message.content
+    # The log lines have been handed to the model; don't resend them next run
+    save_log_offset(log_state)
 
     if not patch or "diff" not in patch:
         print("❌ No valid patch generated.")
@@ -109,5 +204,5 @@ if __name__ == "__main__":
     print(f"✅ Patch saved to {PATCH_FILE}")
 
 if __name__ == "__main__":
-    errors = collect_errors()
-    generate_patch(errors)
+    errors, log_state = collect_errors()
+    generate_patch(errors, log_state)
@@ -1,10 +1,12 @@
 # student_att.py
 
-from flask import Blueprint, render_template, request, flash
+from flask import Blueprint, render_template, request, flash, jsonify
 from flask_login import login_required, current_user
 from datetime import datetime
+from sqlalchemy import func, case, or_, and_
 # ✅ ADDED Course and StudentCourse models to the import
-from models import Attendance, Course, StudentCourse
+from models import Attendance, Course, StudentCourse, db
+from attendance_service import student_course_summary, CODE_FOR_STATUS
 
 student_bp = Blueprint("student_bp", __name__, template_folder="templates")
 
@@ -15,6 +17,29 @@ def summarize_attendance(records):
     percentage = round((present / total) * 100, 2) if total > 0 else 0
     return total, present, absent, percentage
 
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+
+def _parse_day(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+    except ValueError:
+        return None
+
+
+def _filtered_attendance(query, course_id, start_date_obj, end_date_obj):
+    """Apply the page's course/date filters to a query over this student's Attendance."""
+    query = query.filter(Attendance.student_id == current_user.id)
+    if course_id:
+        query = query.filter(Attendance.course_id == course_id)
+    if start_date_obj:
+        query = query.filter(Attendance.date >= start_date_obj)
+    if end_date_obj:
+        query = query.filter(Attendance.date <= end_date_obj)
+    return query
+
 # 📌 Student Attendance
 @student_bp.route("/attendance", methods=["GET"])
 @login_required
@@ -48,30 +73,26 @@ def student_attendance():
         flash("Invalid end date format. Use YYYY-MM-DD.", "warning")
         end_date = ""
 
-    # Query only this student's attendance
-    query = Attendance.query.filter_by(student_id=current_user.id)
-    
-    # ✅ ADDED filter for selected course
-    if selected_course_id:
-        query = query.filter(Attendance.course_id == selected_course_id)
-    if start_date_obj:
-        query = query.filter(Attendance.date >= start_date_obj)
-    if end_date_obj:
-        query = query.filter(Attendance.date <= end_date_obj)
-
-    records = query.order_by(Attendance.date.desc()).all()
-    total, present, absent, percentage = summarize_attendance(records)
+    # Summary only; the history table is loaded page by page from student_attendance_history
+    total, present = _filtered_attendance(
+        db.session.query(
+            func.count(Attendance.id),
+            func.coalesce(func.sum(case((func.lower(Attendance.status) == "present", 1), else_=0)), 0),
+        ),
+        selected_course_id, start_date_obj, end_date_obj,
+    ).one()
+    absent = total - present
+    percentage = round((present / total) * 100, 2) if total > 0 else 0
 
     # ✅ STEP 2: Calculate the course-wise summary for the table
     course_summary = []
-    # Use all enrolled courses for the summary table, but calculations are based on filtered records
-    all_student_records = Attendance.query.filter_by(student_id=current_user.id).all()
+    # One grouped query over (student_id, course_id) instead of loading every record
+    counts = student_course_summary(current_user.id)
 
     for course in enrolled_courses:
-        # Filter records for the current course from the full list
-        records_for_course = [r for r in all_student_records if r.course_id == course.id]
-        total_c, present_c, _, percentage_c = summarize_attendance(records_for_course)
-        
+        total_c, present_c = counts.get(course.id, (0, 0))
+        percentage_c = round((present_c / total_c) * 100, 2) if total_c > 0 else 0
+
         if total_c > 0: # Only add courses with attendance records to the summary
             course_summary.append({
                 'course': course,
@@ -85,7 +106,6 @@ def student_attendance():
     return render_template(
         "student_attendance.html",
         # Original data
-        attendance_records=records,
         total_classes=total,
         present_count=present,
         absent_count=absent,
@@ -103,4 +123,54 @@ def student_attendance():
         start_date=start_date,
         end_date=end_date,
         selected_course_id=selected_course_id
-    )
\ No newline at end of file
+    )
+
+
+# 📌 Student Attendance History (JSON, keyset-paginated)
+@student_bp.route("/attendance/history", methods=["GET"])
+@login_required
+def student_attendance_history():
+    """
+    Newest first. ``cursor`` is the opaque ``next`` value of the previous page;
+    rows are [date, course_id, "P"/"A", remarks] with course labels in ``courses``.
+    """
+    if current_user.role.lower() != "student":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    limit = max(1, min(request.args.get("limit", HISTORY_PAGE_SIZE, type=int), HISTORY_MAX_PAGE_SIZE))
+    query = _filtered_attendance(
+        db.session.query(Attendance.id, Attendance.date, Attendance.course_id, Attendance.status, Attendance.remarks),
+        request.args.get("course_id", type=int),
+        _parse_day(request.args.get("start_date")),
+        _parse_day(request.args.get("end_date")),
+    )
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            cursor_day, cursor_id = cursor.split(":")
+            cursor_day, cursor_id = datetime.strptime(cursor_day, "%Y-%m-%d").date(), int(cursor_id)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        query = query.filter(or_(
+            Attendance.date < cursor_day,
+            and_(Attendance.date == cursor_day, Attendance.id < cursor_id),
+        ))
+
+    # One extra row tells us whether another page exists
+    rows = query.order_by(Attendance.date.desc(), Attendance.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    course_ids = {r.course_id for r in rows if r.course_id}
+    courses = {
+        cid: f"{name} ({code})"
+        for cid, name, code in db.session.query(Course.id, Course.course_name, Course.course_code).filter(Course.id.in_(course_ids))
+    } if course_ids else {}
+
+    return jsonify({
+        "columns": ["date", "course_id", "status", "remarks"],
+        "rows": [[r.date.isoformat(), r.course_id, CODE_FOR_STATUS.get(r.status, r.status), r.remarks] for r in rows],
+        "courses": courses,
+        "next": f"{rows[-1].date.isoformat()}:{rows[-1].id}" if has_more else None,
+    })
@@ -1,11 +1,14 @@
 import datetime
 import io
-import os
 from decimal import Decimal
 from flask import Blueprint, render_template, request, redirect, url_for, jsonify, flash, send_file
 from flask_login import login_required, current_user
 from extensions import db
-from models import FeePayment, FeeConfig, College
+from models import FeePayment, College
+from payment_service import PaymentError, create_intent, dues_for, set_payment_status
+from payment_gateway import start_checkout, payment_snapshot
+from fee_resolver import upsert_rule, invalidate_fee_rules
+from fee_receipts import render_payment_receipt
 
 student_fee_bp = Blueprint("student_fee", __name__, url_prefix="/student/fees")
 
@@ -18,14 +21,7 @@ student_fee_bp = Blueprint("student_fee", __name__, url_prefix="/student/fees")
 def student_fees():
     """Student view of their fee records, current fee config, and dues"""
     payments = FeePayment.query.filter_by(student_id=current_user.id).order_by(FeePayment.created_at.desc()).all()
-
-    fee_config = FeeConfig.query.filter_by(
-        program=current_user.program.strip().upper() if current_user.program else None,
-        branch=current_user.branch.strip().upper() if current_user.branch else None,
-        year=str(current_user.year).strip() if current_user.year else None
-    ).order_by(FeeConfig.updated_at.desc()).first()
-
-    total_paid = sum(float(p.amount) for p in payments if p.status == "Paid")
+    fee_config, total_paid, dues = dues_for(current_user)
 
     if not fee_config:
         return render_template(
@@ -37,9 +33,6 @@ def student_fees():
             error_msg="⚠️ Fee configuration has not been set by the admin for your program/branch/year."
         )
 
-    total_fee = float(fee_config.amount)
-    dues = max(total_fee - total_paid, 0)
-
     return render_template(
         "student_fees.html",
         payments=payments,
@@ -53,72 +46,49 @@ def student_fees():
 @student_fee_bp.route("/create", methods=["POST"])
 @login_required
 def create_fee():
-    """Student initiates a fee payment (UPI / NetBanking)"""
-    fee_config = FeeConfig.query.filter_by(
-        program=current_user.program,
-        branch=current_user.branch,
-        year=current_user.year
-    ).order_by(FeeConfig.updated_at.desc()).first()
-
-    if not fee_config:
-        return jsonify({"error": "Fee configuration not set by admin"}), 400
-
-    payments = FeePayment.query.filter_by(student_id=current_user.id).all()
-    total_paid = sum(float(p.amount) for p in payments if p.status == "Paid")
-    dues = max(float(fee_config.amount) - total_paid, 0)
-
-    if dues <= 0:
-        return jsonify({"error": "No dues pending"}), 400
-
-    amount = request.form.get("amount", type=Decimal, default=Decimal(dues))
+    """
+    Student initiates a fee payment (UPI / NetBanking). Send the same
+    Idempotency-Key header (or idempotency_key field) when retrying: the intent
+    created by the first request is returned instead of a new one.
+    """
     method = request.form.get("method", "UPI")
+    if method not in ("UPI", "NetBanking"):
+        return jsonify({"error": "Unsupported payment method"}), 400
+
+    try:
+        payment, created = create_intent(
+            current_user,
+            amount=request.form.get("amount"),
+            method=method,
+            idempotency_key=request.headers.get("Idempotency-Key") or request.form.get("idempotency_key"),
+        )
+    except PaymentError as e:
+        return jsonify({"error": e.message}), e.status_code
 
-    if not amount or amount <= 0:
-        return jsonify({"error": "Invalid amount"}), 400
-    if float(amount) > dues:
-        amount = Decimal(dues)
-
-    new_payment = FeePayment(
-        student_id=current_user.id,
-        college_id=current_user.college_id,
-        amount=float(amount),
-        status="Pending",
-        payment_method=method,
-        created_at=datetime.datetime.utcnow(),
-        updated_at=datetime.datetime.utcnow()
-    )
-    db.session.add(new_payment)
-    db.session.commit()
-
-    if method == "UPI":
+    body = {"method": payment.payment_method, "payment_id": payment.id, "amount": str(payment.amount),
+            "status": payment.status, "replayed": not created}
+    if payment.payment_method == "UPI":
         upi_id = "9685527886@ybl"
         payee_name = "College Fees"
         note = f"Fee Payment - {current_user.name}"
-        upi_url = f"upi://pay?pa={upi_id}&pn={payee_name}&am={amount}&cu=INR&tn={note}"
-        return jsonify({"method": "UPI", "upi_url": upi_url})
-
-    elif method == "NetBanking":
-        redirect_url = url_for("student_fee.mock_netbanking", payment_id=new_payment.id, _external=True)
-        return jsonify({"method": "NetBanking", "redirect_url": redirect_url})
+        body["upi_url"] = f"upi://pay?pa={upi_id}&pn={payee_name}&am={payment.amount}&cu=INR&tn={note}"
+    else:
+        # Settled later by the gateway webhook + reconciliation worker, not in this request
+        body["redirect_url"] = start_checkout(payment, url_for("student_fee.student_fees", _external=True))
+    return jsonify(body), 201 if created else 200
 
-    return jsonify({"error": "Unsupported payment method"}), 400
 
-
-@student_fee_bp.route("/mock_netbanking/<int:payment_id>")
+@student_fee_bp.route("/verify")
 @login_required
-def mock_netbanking(payment_id):
-    """Simulate a NetBanking flow: mark payment as Paid"""
-    payment = FeePayment.query.get_or_404(payment_id)
-    if payment.student_id != current_user.id:
-        flash("Unauthorized", "danger")
-        return redirect(url_for("student_fee.student_fees"))
-
-    payment.status = "Paid"
-    payment.updated_at = datetime.datetime.utcnow()
-    db.session.commit()
-
-    flash("✅ NetBanking payment successful!", "success")
-    return redirect(url_for("student_fee.student_fees"))
+def verify_payments():
+    """Report this student's payment statuses (events are applied by the reconciliation worker, not here)"""
+    snapshot = payment_snapshot(current_user.id)
+    pending = sum(p["status"] == "Pending" for p in snapshot["payments"])
+    if pending:
+        message = "⏳ Still waiting for the bank to confirm your payment."
+    else:
+        message = "No payments awaiting confirmation."
+    return jsonify({"message": message, **snapshot})
 
 
 @student_fee_bp.route("/receipt/<int:payment_id>")
@@ -132,42 +102,9 @@ def download_receipt(payment_id):
 
     college = payment.college or College.query.first()
     student = payment.student
-
-    output = io.BytesIO()
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import A4
-    pdf = canvas.Canvas(output, pagesize=A4)
-    width, height = A4
-    y = height - 50
-
-    if college and college.logo and os.path.exists(college.logo):
-        pdf.drawImage(college.logo, 40, y - 60, width=80, height=60, preserveAspectRatio=True, mask="auto")
-    if college:
-        pdf.setFont("Helvetica-Bold", 16)
-        pdf.drawString(140, y - 20, college.name)
-
-    y -= 100
-    pdf.setFont("Helvetica", 12)
-    pdf.drawString(50, y, f"Student Name: {student.name}")
-    pdf.drawString(50, y - 20, f"Roll No: {student.roll_no}")
-    pdf.drawString(50, y - 40, f"Program: {student.program} | Branch: {student.branch} | Year: {student.year}")
-    pdf.drawString(50, y - 60, f"Email: {student.email}")
-
-    y -= 100
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawString(50, y, "Fee Payment Receipt")
-
-    y -= 30
-    pdf.setFont("Helvetica", 12)
-    pdf.drawString(60, y, f"Payment ID: {payment.id}")
-    pdf.drawString(60, y - 20, f"Method: {payment.payment_method}")
-    pdf.drawString(60, y - 40, f"Amount: {payment.amount}")
-    pdf.drawString(60, y - 60, f"Status: {payment.status}")
-    pdf.drawString(60, y - 80, f"Date: {payment.created_at.strftime('%Y-%m-%d')}")
-
-    pdf.save()
-    output.seek(0)
-    return send_file(output, mimetype="application/pdf", as_attachment=True, download_name=f"receipt_{student.roll_no}.pdf")
+    pdf = render_payment_receipt(college, student, payment)
+    return send_file(io.BytesIO(pdf), mimetype="application/pdf", as_attachment=True,
+                     download_name=f"receipt_{student.roll_no}.pdf")
 
 
 # ============================
@@ -180,10 +117,8 @@ def admin_fee_dashboard():
     if current_user.role != "Admin":
         flash("Unauthorized access", "danger")
         return redirect(url_for("student_fee.student_fees"))
-
-    payments = FeePayment.query.order_by(FeePayment.updated_at.desc()).all()
-    configs = FeeConfig.query.order_by(FeeConfig.updated_at.desc()).all()
-    return render_template("admin_fee.html", payments=payments, configs=configs)
+    # The admin fee screen loads its data incrementally from admin_fee's JSON API
+    return redirect(url_for("admin_fee.admin_fees"))
 
 
 @student_fee_bp.route("/admin/config", methods=["POST"])
@@ -203,17 +138,10 @@ def admin_fee_config():
         flash("All fields are required", "danger")
         return redirect(url_for("student_fee.admin_fee_dashboard"))
 
-    config = FeeConfig(
-        program=program,
-        branch=branch,
-        year=year,
-        amount=float(amount),
-        last_date=datetime.datetime.strptime(last_date, "%Y-%m-%d").date(),
-        created_at=datetime.datetime.utcnow(),
-        updated_at=datetime.datetime.utcnow()
-    )
-    db.session.add(config)
+    upsert_rule(program, branch, year, request.form.get("section"), amount,
+                datetime.datetime.strptime(last_date, "%Y-%m-%d").date())
     db.session.commit()
+    invalidate_fee_rules()
 
     flash("✅ Fee configuration saved successfully", "success")
     return redirect(url_for("student_fee.admin_fee_dashboard"))
@@ -229,13 +157,11 @@ def admin_update_payment(payment_id):
     payment = FeePayment.query.get_or_404(payment_id)
     new_status = request.form.get("status")
 
-    if new_status not in ["Unpaid", "Pending", "Paid", "Failed"]:
-        flash("Invalid status", "danger")
+    try:
+        set_payment_status(payment, new_status)
+    except PaymentError as e:
+        flash(e.message, "danger")
         return redirect(url_for("student_fee.admin_fee_dashboard"))
 
-    payment.status = new_status
-    payment.updated_at = datetime.datetime.utcnow()
-    db.session.commit()
-
     flash("✅ Payment status updated", "success")
     return redirect(url_for("student_fee.admin_fee_dashboard"))
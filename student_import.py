@@ -0,0 +1,416 @@
+"""
+Bulk student onboarding from admission spreadsheets.
+
+    flask students import admissions.xlsx [--college-id 1] [--errors errors.csv] [--batch-size 1000]
+
+or upload the same file at /students/import. One row per student, CSV or XLSX
+(first sheet), with a header naming User columns as on the profile form:
+
+    name,email,enrollment_no,roll_no,program,branch,year,dob,father_name,...
+
+``name`` and ``email`` are required; ``mobile`` is accepted for ``contact``.
+The initial password is the ``password`` column if present, else the
+enrollment number, else the roll number; students change it after first login.
+
+The file is read as a stream and handled BATCH_SIZE rows at a time, column by
+column: each date column's format is detected once (utils.parse_date_column),
+decimals are parsed once per distinct value, and enrollment_no / roll_no /
+email are checked against sets preloaded from the database plus the rows
+accepted so far. Password hashing (deliberately slow) runs across a process
+pool for large files. Each batch is one Core INSERT and its own transaction;
+if another writer took a key meanwhile, the batch is retried row by row so
+only the conflicting rows are rejected.
+Rejected rows are written to an error report CSV: the original columns plus
+the line number and the reasons, so it can be fixed and re-imported as is.
+"""
+import csv
+import datetime
+import io
+import logging
+import os
+import re
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+import click
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, send_file, abort
+from flask_login import login_required, current_user
+from sqlalchemy import Date, Numeric, String, func, insert, or_
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+
+from attendance_import import ImportStats
+from extensions import db
+from models import User
+from roster_service import invalidate_rosters
+from student_search import reindex_students
+from utils import parse_date_column, parse_decimal_column, parse_string
+
+student_import_bp = Blueprint("student_import", __name__, cli_group="students")
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+# Defaults, overridable through app.config
+DEFAULTS = {
+    "STUDENT_IMPORT_WORKERS": min(os.cpu_count() or 1, 4),
+    "STUDENT_IMPORT_POOL_MIN": 200,     # smaller batches are hashed in-process
+}
+
+# Profile columns an admission sheet may fill (as on admin_setprofile.html)
+FIELDS = (
+    "name", "email", "enrollment_no", "scholar_no", "roll_no", "section", "program", "branch", "year",
+    "semester", "class_name", "admission_date", "dob", "gender", "blood_group", "nationality", "religion",
+    "marital_status", "aadhaar_no", "contact", "category", "mother_tongue", "samagra_id", "domicile_state",
+    "father_name", "father_name_hindi", "father_mobile", "father_income",
+    "mother_name", "mother_name_hindi", "mother_mobile", "mother_income",
+    "permanent_address", "permanent_city", "permanent_state", "permanent_pin",
+    "local_address", "local_city", "local_state", "local_pin",
+    "bank_name", "bank_branch", "bank_account_no", "bank_ifsc",
+)
+ALIASES = {"mobile": "contact", "full_name": "name", "student_name": "name", "email_id": "email",
+           "enrollment": "enrollment_no", "roll": "roll_no", "date_of_birth": "dob"}
+REQUIRED = ("name", "email")
+UNIQUE = ("email", "enrollment_no", "roll_no")
+PASSWORD_SOURCES = ("password", "enrollment_no", "roll_no")
+
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_HASH = partial(generate_password_hash, method="pbkdf2:sha256")
+
+
+def _config(key):
+    return current_app.config.get(key, DEFAULTS[key])
+
+
+class StudentImportStats(ImportStats):
+    def summary(self):
+        return (f"{self.rows:,} rows: {self.inserted:,} students created, "
+                f"{self.errors:,} rejected in {self.elapsed:.1f}s")
+
+
+def _kinds():
+    """{field: ("date" | "decimal" | "str", max length or None)} from the User columns."""
+    kinds = {}
+    for field in FIELDS:
+        column_type = User.__table__.c[field].type
+        if isinstance(column_type, Date):
+            kinds[field] = ("date", None)
+        elif isinstance(column_type, Numeric):
+            kinds[field] = ("decimal", None)
+        else:
+            kinds[field] = ("str", column_type.length if isinstance(column_type, String) else None)
+    return kinds
+
+
+def _normalise(name):
+    key = re.sub(r"[\s\-]+", "_", str(name or "").strip().lower())
+    return ALIASES.get(key, key)
+
+
+# ===========================
+# Readers: (header, row iterator)
+# ===========================
+def read_csv(stream):
+    reader = csv.reader(stream)
+    return next(reader, []), reader
+
+
+def read_xlsx(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("XLSX import needs openpyxl (pip install openpyxl); or save the sheet as CSV")
+    sheet = load_workbook(fileobj, read_only=True, data_only=True).worksheets[0]
+    rows = sheet.iter_rows(values_only=True)
+    header = [str(h) if h is not None else "" for h in next(rows, ())]
+    return header, (_xlsx_row(row) for row in rows)
+
+
+def _xlsx_row(row):
+    # Dates stay date objects; numbers typed into ID columns become "12345", not "12345.0"
+    out = []
+    for value in row:
+        if value is None or isinstance(value, (datetime.date, str)):
+            out.append(value if value is not None else "")
+        elif isinstance(value, float) and value.is_integer():
+            out.append(str(int(value)))
+        else:
+            out.append(str(value))
+    return out
+
+
+# ===========================
+# Import
+# ===========================
+def _existing_keys():
+    """Preloaded unique values (the columns are unique across all colleges)."""
+    keys = {field: set() for field in UNIQUE}
+    for email, enrollment_no, roll_no in db.session.query(User.email, User.enrollment_no, User.roll_no):
+        keys["email"].add(email.strip().lower())
+        if enrollment_no:
+            keys["enrollment_no"].add(enrollment_no.strip().upper())
+        if roll_no:
+            keys["roll_no"].add(roll_no.strip().upper())
+    return keys
+
+
+def import_students(header, rows, college_id=None, error_stream=None, batch_size=BATCH_SIZE, progress=None):
+    """
+    Create students from spreadsheet rows. ``error_stream`` (text) receives the
+    rejected rows as CSV. Each batch is committed on its own; ``progress(stats)``
+    runs after every batch. Returns StudentImportStats.
+    """
+    names = [_normalise(h) for h in header]
+    columns = {name: i for i, name in reversed(list(enumerate(names))) if name in FIELDS or name == "password"}
+    missing = [f for f in REQUIRED if f not in columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+    if not any(source in columns for source in PASSWORD_SOURCES):
+        raise ValueError(f"Need a column for the initial password: one of {', '.join(PASSWORD_SOURCES)}")
+
+    kinds = _kinds()
+    seen = _existing_keys()
+    db.session.rollback()  # end the preload's read transaction before any worker forks
+    stats = StudentImportStats()
+    errors = csv.writer(error_stream) if error_stream is not None else None
+    if errors:
+        errors.writerow(["line", *header, "errors"])
+
+    workers = _config("STUDENT_IMPORT_WORKERS")
+    pool = None
+    try:
+        line_no = 2
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            width = len(header)
+            batch = [list(row[:width]) + [""] * (width - len(row)) for row in batch]
+            lines = range(line_no, line_no + len(batch))
+            line_no += len(batch)
+
+            records, problems = _validate(batch, columns, kinds, seen, college_id)
+            blank = {i for i, row in enumerate(batch) if not any(str(v).strip() for v in row if v is not None)}
+            stats.rows += len(batch) - len(blank)
+
+            accepted = [i for i in range(len(batch)) if i not in blank and not problems.get(i)]
+            if len(accepted) >= _config("STUDENT_IMPORT_POOL_MIN") and workers > 1:
+                if pool is None:
+                    pool = ProcessPoolExecutor(max_workers=workers)
+                hashes = list(pool.map(_HASH, [records[i].pop("_password") for i in accepted], chunksize=64))
+            else:
+                hashes = [_HASH(records[i].pop("_password")) for i in accepted]
+            for i, hashed in zip(accepted, hashes):
+                records[i]["password"] = hashed
+
+            if accepted:
+                try:
+                    ids = db.session.execute(insert(User).returning(User.id), [records[i] for i in accepted]).scalars().all()
+                    reindex_students(ids)
+                    db.session.commit()
+                    stats.inserted += len(ids)
+                except IntegrityError:
+                    # Another writer took some of the keys since they were preloaded: retry row by
+                    # row so only the rows that really conflict are rejected
+                    db.session.rollback()
+                    ids = []
+                    for i in accepted:
+                        try:
+                            with db.session.begin_nested():
+                                ids.append(db.session.execute(insert(User).returning(User.id), records[i]).scalar_one())
+                        except IntegrityError as e:
+                            problems.setdefault(i, []).append(f"conflicts with an existing student ({e.orig})")
+                            _release_keys(seen, records[i])
+                    reindex_students(ids)
+                    db.session.commit()
+                    stats.inserted += len(ids)
+
+            for i, messages in sorted(problems.items()):
+                if i in blank or not messages:
+                    continue
+                stats.error(lines[i], "; ".join(messages))
+                if errors:
+                    errors.writerow([lines[i], *batch[i], "; ".join(messages)])
+            if progress:
+                progress(stats)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if stats.inserted:
+        invalidate_rosters()
+    return stats
+
+
+def _validate(batch, columns, kinds, seen, college_id):
+    """
+    Column-wise validation of one batch. Returns (records, problems): a
+    User insert dict per row (with "_password") and {row index: [messages]}.
+    """
+    records = [{"role": "Student", "verified": True, "college_id": college_id} for _ in batch]
+    problems = {}
+
+    def problem(i, message):
+        problems.setdefault(i, []).append(message)
+
+    for field, col in columns.items():
+        raw = [row[col] for row in batch]
+        kind, max_length = kinds.get(field, ("str", None))
+        if kind == "date":
+            values = parse_date_column([v if isinstance(v, datetime.date) else (v or None) for v in raw])
+        elif kind == "decimal":
+            values = parse_decimal_column(raw)
+        else:
+            values = [parse_string(v) for v in raw]
+        for i, (original, value) in enumerate(zip(raw, values)):
+            if value is None and str(original or "").strip():
+                problem(i, f"invalid {field} {original!r}")
+            elif max_length and value is not None and len(value) > max_length:
+                problem(i, f"{field} longer than {max_length} characters")
+            elif field == "password":
+                records[i]["_password"] = value
+            else:
+                records[i][field] = value
+
+    for i, record in enumerate(records):
+        for field in REQUIRED:
+            if not record.get(field):
+                problem(i, f"{field} is required")
+        if record.get("email") and not _EMAIL.match(record["email"]):
+            problem(i, f"invalid email {record['email']!r}")
+        record.setdefault("_password", None)
+        record["_password"] = record["_password"] or record.get("enrollment_no") or record.get("roll_no")
+        if not record["_password"]:
+            problem(i, "no password, enrollment_no or roll_no for the initial password")
+        if problems.get(i):
+            continue
+        # Unique keys last, so a rejected row does not reserve its keys
+        keys = _keys(record)
+        clashes = [field for field, key in keys.items() if key and key in seen[field]]
+        if clashes:
+            problem(i, "duplicate " + ", ".join(clashes))
+            continue
+        for field, key in keys.items():
+            if key:
+                seen[field].add(key)
+        record["email"] = record["email"].lower()
+    return records, problems
+
+
+def _keys(record):
+    return {"email": record["email"].lower(),
+            "enrollment_no": (record.get("enrollment_no") or "").upper(),
+            "roll_no": (record.get("roll_no") or "").upper()}
+
+
+def _release_keys(seen, record):
+    """Un-reserve a rejected row's keys, keeping those the database now holds."""
+    keys = _keys(record)
+    for field, key in keys.items():
+        seen[field].discard(key)
+    taken = db.session.query(User.email, User.enrollment_no, User.roll_no).filter(or_(
+        func.lower(User.email) == keys["email"],
+        func.upper(User.enrollment_no) == keys["enrollment_no"],
+        func.upper(User.roll_no) == keys["roll_no"],
+    ))
+    for email, enrollment_no, roll_no in taken:
+        for field, value in (("email", (email or "").strip().lower()),
+                             ("enrollment_no", (enrollment_no or "").strip().upper()),
+                             ("roll_no", (roll_no or "").strip().upper())):
+            if value and value == keys[field]:
+                seen[field].add(value)
+
+
+def _reader_for(filename, fileobj):
+    if filename.lower().endswith(".xlsx"):
+        return read_xlsx(fileobj)
+    if filename.lower().endswith(".csv"):
+        return read_csv(io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline=""))
+    raise ValueError("Choose a .csv or .xlsx file")
+
+
+# ===========================
+# CLI: flask students import
+# ===========================
+@student_import_bp.cli.command("import")
+@click.argument("sheet", type=click.Path(exists=True, dir_okay=False))
+@click.option("--college-id", type=int, help="College the students belong to.")
+@click.option("--errors", "errors_path", type=click.Path(dir_okay=False), help="Write rejected rows to this CSV.")
+@click.option("--batch-size", default=BATCH_SIZE, show_default=True)
+def import_command(sheet, college_id, errors_path, batch_size):
+    """Create students from an admission CSV / XLSX sheet."""
+    def report(stats):
+        click.echo(f"  … {stats.rows:,} rows read, {stats.inserted:,} created ({stats.elapsed:.1f}s)")
+
+    error_file = open(errors_path, "w", newline="", encoding="utf-8") if errors_path else None
+    try:
+        with open(sheet, "rb") as f:
+            header, rows = _reader_for(sheet, f)
+            stats = import_students(header, rows, college_id, error_file, batch_size, progress=report)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    finally:
+        if error_file:
+            error_file.close()
+    click.echo(f"✅ {stats.summary()}")
+    for message in stats.error_samples:
+        click.echo(f"  ⚠ {message}")
+
+
+# ===========================
+# Upload
+# ===========================
+def _report_path(token):
+    return os.path.join(tempfile.gettempdir(), "student_import_errors", f"{token}.csv")
+
+
+@student_import_bp.route("/import", methods=["GET", "POST"])
+@login_required
+def upload_students():
+    if current_user.role != "Admin":
+        flash("⛔ Access Denied.", "danger")
+        return redirect(url_for("dashboard"))
+
+    stats, report_token = None, None
+    if request.method == "POST":
+        file = request.files.get("file")
+        if not file or not file.filename:
+            flash("Please choose a .csv or .xlsx file.", "warning")
+            return redirect(url_for("student_import.upload_students"))
+
+        token = uuid.uuid4().hex
+        os.makedirs(os.path.dirname(_report_path(token)), exist_ok=True)
+        try:
+            with open(_report_path(token), "w", newline="", encoding="utf-8") as error_file:
+                # openpyxl needs a seekable file; the upload stream is one
+                header, rows = _reader_for(file.filename, file.stream)
+                stats = import_students(
+                    header, rows, current_user.college_id, error_file,
+                    progress=lambda s: logger.info("student import: %s", s.summary()),
+                )
+        except (ValueError, UnicodeDecodeError) as e:
+            db.session.rollback()
+            flash(f"❌ Import failed: {e}", "danger")
+            return redirect(url_for("student_import.upload_students"))
+        logger.info("student import by user %s finished: %s", current_user.id, stats.summary())
+        flash(f"✅ {stats.summary()}", "success" if not stats.errors else "warning")
+        if stats.errors:
+            report_token = token
+        else:
+            os.remove(_report_path(token))
+
+    return render_template("student_import.html", stats=stats, report_token=report_token)
+
+
+@student_import_bp.route("/import/errors/<token>")
+@login_required
+def download_errors(token):
+    if current_user.role != "Admin":
+        abort(403)
+    if not re.fullmatch(r"[0-9a-f]{32}", token) or not os.path.exists(_report_path(token)):
+        abort(404)
+    return send_file(_report_path(token), mimetype="text/csv", as_attachment=True,
+                     download_name="student_import_errors.csv")
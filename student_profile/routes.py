@@ -1,48 +1,46 @@
-from flask import Blueprint, render_template, request, redirect, url_for
-from werkzeug.utils import secure_filename
-import os
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+
+from extensions import db
+from models import User
+from utils import save_uploaded_file, parse_string, parse_date
+from profile_changes import diff_form, diff_values, apply_changes, ROSTER_FIELDS
+from profile_service import get_profile, invalidate_profile
+from roster_service import invalidate_rosters
 
 profile_bp = Blueprint('profile', __name__, template_folder='../templates', static_folder='../static')
 
-UPLOAD_FOLDER = 'static/uploads'
-
-user_data = {
-    'name': 'HIMESH RINCHHODIYA',
-    'dob': '2005-08-30',
-    'contact': '9685527886',
-    'program': 'BTECH',
-    'year': '2',
-    'branch': 'CSBS',
-    'roll_no': '25',
-    'admission_date': '2023-07-01',
-    'photo': '',
-    'id_card': '',
-    'certificate': '',
-    'transcript': ''
-}
+# (model column, form field, parser) editable on the self-service page
+EDITABLE_FIELDS = (
+    ('dob', 'dob', parse_date),
+    ('contact', 'contact', parse_string),
+    ('program', 'program', parse_string),
+    ('year', 'year', parse_string),
+    ('branch', 'branch', parse_string),
+    ('roll_no', 'roll_no', parse_string),
+    ('admission_date', 'admission_date', parse_date),
+)
+UPLOAD_FIELDS = ('photo', 'id_card', 'certificate', 'transcript')
+
 
 @profile_bp.route('/profile', methods=['GET', 'POST'])
+@login_required
 def profile():
-    global user_data
-
     if request.method == 'POST':
-        user_data['name'] = request.form.get('name')
-        user_data['dob'] = request.form.get('dob')
-        user_data['contact'] = request.form.get('contact')
-        user_data['program'] = request.form.get('program')
-        user_data['year'] = request.form.get('year')
-        user_data['branch'] = request.form.get('branch')
-        user_data['roll_no'] = request.form.get('roll_no')
-        user_data['admission_date'] = request.form.get('admission_date')
-
-        for field in ['photo', 'id_card', 'certificate', 'transcript']:
-            file = request.files.get(field)
-            if file and file.filename:
-                filename = secure_filename(file.filename)
-                filepath = os.path.join(UPLOAD_FOLDER, filename)
-                file.save(filepath)
-                user_data[field] = filepath
-
+        user = db.session.get(User, current_user.id)
+        changes = diff_form(user, request.form, EDITABLE_FIELDS)
+
+        owner = f"user{user.id}"
+        saved = {field: save_uploaded_file(field, owner_prefix=owner) for field in UPLOAD_FIELDS}
+        changes.update(diff_values(user, {field: path for field, path in saved.items() if path}))
+
+        changed = apply_changes(user, changes, changed_by=user.id)
+        if changed:
+            db.session.commit()
+            invalidate_profile(user.id)
+            if changed & ROSTER_FIELDS:
+                invalidate_rosters()
+            flash("Profile updated successfully!", "success")
         return redirect(url_for('profile.profile'))
 
-    return render_template('profile.html', user=user_data)
+    return render_template('profile.html', user=get_profile(current_user.id))
@@ -0,0 +1,218 @@
+"""
+Student search for the admin typeahead: prefix matching over name, roll_no,
+enrollment_no, scholar_no and email.
+
+On SQLite the index is an FTS5 table, ``student_search`` (rowid = users.id),
+with 2- and 3-character prefix indexes so short typeahead prefixes are index
+lookups rather than scans. Every word of the query must match the start of a
+token in some indexed column (``"ra"* "cs2"*``). FTS5 ranking (bm25) has to
+score every match, which costs ~90 ms for a two-letter prefix over 50k
+students. The index is therefore read unranked, which stops after the first
+SEARCH_CANDIDATES rows (well under a millisecond). Those rows are ranked in
+Python: exact identifier, then identifier prefix, then name prefix, then name.
+A very broad prefix can miss a better match beyond the candidates, which the
+next keystroke brings in. Other databases fall back to prefix LIKE over the
+same columns (on Postgres, back them with pg_trgm / text_pattern_ops indexes).
+
+The index is kept in sync from the ORM: an after_flush hook rewrites the rows
+of students that were added, deleted, or had an indexed column, role or
+college changed, in the same transaction. Core bulk inserts (bench.seed, bulk
+imports) bypass the ORM and must call reindex_students(ids), or rebuild:
+
+    flask student-search rebuild
+"""
+import logging
+import re
+import time
+
+import click
+from flask import Blueprint
+from sqlalchemy import event, inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import User
+
+student_search_bp = Blueprint("student_search", __name__, cli_group="student-search")
+logger = logging.getLogger(__name__)
+
+TABLE = "student_search"
+COLUMNS = ("name", "roll_no", "enrollment_no", "scholar_no", "email")
+IDENTIFIERS = ("roll_no", "enrollment_no", "scholar_no", "email")
+SEARCH_CANDIDATES = 200
+MAX_TERMS = 6
+MAX_LIMIT = 25
+REINDEX_BATCH = 500
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+_ready = set()  # engine URLs whose FTS table exists (see ensure_search_index)
+
+_CREATE = text(
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+    f"{', '.join(COLUMNS)}, college_id UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+_DELETE = text(f"DELETE FROM {TABLE} WHERE rowid = :id")
+_INSERT = text(
+    f"INSERT INTO {TABLE} (rowid, {', '.join(COLUMNS)}, college_id) "
+    f"VALUES (:id, {', '.join(':' + c for c in COLUMNS)}, :college_id)"
+)
+_SEARCH = text(
+    f"SELECT rowid AS id, {', '.join(COLUMNS)} FROM {TABLE} "
+    f"WHERE {TABLE} MATCH :match AND (:college_id IS NULL OR college_id = :college_id) LIMIT :limit"
+)
+
+
+def _uses_fts(bind):
+    return bind.dialect.name == "sqlite" and str(bind.engine.url) in _ready
+
+
+def ensure_search_index():
+    """Create the FTS table if it is missing (filling it from users); call at startup."""
+    engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return
+    exists = db.session.execute(text("SELECT 1 FROM sqlite_master WHERE name = :t"), {"t": TABLE}).first()
+    if not exists:
+        try:
+            db.session.execute(_CREATE)
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to LIKE
+            db.session.rollback()
+            logger.warning("SQLite has no FTS5; student search will scan the users table")
+            return
+    _ready.add(str(engine.url))
+    if not exists:
+        rebuild_index()
+    db.session.commit()
+
+
+# ===========================
+# Writes
+# ===========================
+def _row(user):
+    return {"id": user.id, "college_id": user.college_id, **{c: getattr(user, c) for c in COLUMNS}}
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_after_flush(session, flush_context):
+    """Rewrite the index rows of students touched by this flush."""
+    if not _uses_fts(session.get_bind()):
+        return
+    changed = ("role", "college_id") + COLUMNS
+    upserts, deletes = {}, set()
+    for user in session.new:
+        if isinstance(user, User) and user.role == "Student":
+            upserts[user.id] = user
+    for user in session.dirty:
+        if isinstance(user, User):
+            state = inspect(user)
+            if any(state.attrs[c].history.has_changes() for c in changed):
+                if user.role == "Student":
+                    upserts[user.id] = user
+                else:
+                    deletes.add(user.id)
+    for user in session.deleted:
+        if isinstance(user, User):
+            deletes.add(user.id)
+
+    if not upserts and not deletes:
+        return
+    connection = session.connection()
+    ids = deletes | set(upserts)
+    connection.execute(_DELETE, [{"id": i} for i in ids])
+    if upserts:
+        connection.execute(_INSERT, [_row(u) for u in upserts.values()])
+
+
+def reindex_students(ids):
+    """Refresh the index rows for these user ids (after Core inserts/updates). Caller commits."""
+    if not _uses_fts(db.engine):
+        return
+    ids = list(ids)
+    columns = ", ".join(COLUMNS)
+    for i in range(0, len(ids), REINDEX_BATCH):
+        batch = ids[i:i + REINDEX_BATCH]
+        params = {f"i{n}": v for n, v in enumerate(batch)}
+        in_list = ", ".join(f":i{n}" for n in range(len(batch)))
+        db.session.execute(text(f"DELETE FROM {TABLE} WHERE rowid IN ({in_list})"), params)
+        db.session.execute(text(
+            f"INSERT INTO {TABLE} (rowid, {columns}, college_id) SELECT id, {columns}, college_id "
+            f"FROM users WHERE role = 'Student' AND id IN ({in_list})"
+        ), params)
+
+
+def rebuild_index():
+    """Refill the whole index from users in one statement. Returns the row count."""
+    columns = ", ".join(COLUMNS)
+    db.session.execute(text(f"DELETE FROM {TABLE}"))
+    db.session.execute(text(
+        f"INSERT INTO {TABLE} (rowid, {columns}, college_id) "
+        f"SELECT id, {columns}, college_id FROM users WHERE role = 'Student'"
+    ))
+    db.session.execute(text(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')"))
+    return db.session.execute(text(f"SELECT COUNT(*) FROM {TABLE}")).scalar()
+
+
+# ===========================
+# Queries
+# ===========================
+def _rank(query):
+    def key(row):
+        identifiers = [(getattr(row, c) or "").lower() for c in IDENTIFIERS]
+        name = (row.name or "").lower()
+        if query in identifiers:
+            tier = 0
+        elif any(value.startswith(query) for value in identifiers):
+            tier = 1
+        elif name.startswith(query):
+            tier = 2
+        else:
+            tier = 3
+        return tier, name, row.id
+    return key
+
+
+def search_students(query, college_id=None, limit=10):
+    """
+    Up to ``limit`` students whose indexed columns start with every word of
+    ``query``, best match first, as dicts (id, name, roll_no, enrollment_no, email).
+    """
+    terms = _TERM.findall((query or "").lower())[:MAX_TERMS]
+    if not terms:
+        return []
+    limit = max(1, min(int(limit), MAX_LIMIT))
+
+    if _uses_fts(db.engine):
+        match = " ".join(f'"{term}"*' for term in terms)
+        rows = db.session.execute(_SEARCH, {"match": match, "college_id": college_id,
+                                            "limit": SEARCH_CANDIDATES}).all()
+    else:
+        q = db.session.query(User.id, *(getattr(User, c) for c in COLUMNS)).filter(User.role == "Student")
+        if college_id is not None:
+            q = q.filter(User.college_id == college_id)
+        for term in terms:
+            q = q.filter(db.or_(*(getattr(User, c).ilike(f"{term}%") for c in COLUMNS)))
+        rows = q.limit(SEARCH_CANDIDATES).all()
+
+    rows.sort(key=_rank(query.strip().lower()))
+    return [{"id": r.id, "name": r.name, "roll_no": r.roll_no, "enrollment_no": r.enrollment_no,
+             "email": r.email} for r in rows[:limit]]
+
+
+# ===========================
+# CLI
+# ===========================
+@student_search_bp.cli.command("rebuild")
+def rebuild_command():
+    """Rebuild the student search index from the users table."""
+    if db.engine.dialect.name != "sqlite":
+        click.echo("Only the SQLite FTS5 index needs rebuilding; other databases search users directly.")
+        return
+    started = time.perf_counter()
+    db.session.execute(_CREATE)
+    _ready.add(str(db.engine.url))
+    count = rebuild_index()
+    db.session.commit()
+    click.echo(f"Indexed {count:,} students in {time.perf_counter() - started:.2f}s")
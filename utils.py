@@ -4,8 +4,9 @@ from functools import wraps
 from werkzeug.utils import secure_filename
 from flask import request, abort
 from flask_login import current_user, login_manager
-from decimal import Decimal, InvalidOperation
-from datetime import datetime
+
+import parsing
+from parsing import DATE_FORMATS
 
 
 # ===========================
@@ -66,16 +67,7 @@ def parse_decimal(value, default=None):
     - strips commas (e.g. "1,234.56")
     - returns default when value is None or empty string
     """
-    if value is None:
-        return default
-    s = str(value).strip()
-    if s == "":
-        return default
-    try:
-        s = s.replace(",", "")
-        return Decimal(s)
-    except (InvalidOperation, ValueError):
-        return default
+    return parsing.parse_decimal(value, default)
 
 
 def parse_string(value):
@@ -91,15 +83,22 @@ def parse_date(value):
     Attempt to parse common date formats returned by forms.
     Returns a date object or None.
     """
-    if not value:
-        return None
-    s = str(value).strip()
-    if s == "":
-        return None
-    formats = ["%Y-%m-%d", "%d-%b-%Y", "%d-%m-%Y", "%d/%m/%Y"]
-    for fmt in formats:
-        try:
-            return datetime.strptime(s, fmt).date()
-        except ValueError:
-            continue
-    return None
+    return parsing.parse_date(value)
+
+
+# ===========================
+# Column Helpers (bulk imports)
+# ===========================
+def detect_date_format(values, sample=50):
+    """The first of DATE_FORMATS that parses every non-blank string in a sample, or None."""
+    return parsing.infer_date_format(values, sample)
+
+
+def parse_date_column(values):
+    """parse_date over a whole column, detecting the format once (see parsing.parse_dates)."""
+    return parsing.parse_dates(values)
+
+
+def parse_decimal_column(values):
+    """parse_decimal over a column (repeated strings parsed once). Returns Decimal or None per value."""
+    return parsing.parse_decimals(values)